@@ -1,29 +1,17 @@
-import os
-import re
 import imageio
+from src.gif_magic import list_frames, to_image
+import numpy as np
 
 
 def create_timelapse(directory_path):
-    # Get a list of all PNG files in the directory
-    png_files = [file for file in os.listdir(directory_path) if file.endswith(".png")]
-
-    # Sort the files numerically using a regular expression to extract numbers
-    png_files.sort(
-        key=lambda x: int(re.search(r"\d+", x).group())
-        if re.search(r"\d+", x)
-        else float("inf")
-    )
-
-    # Create a list to store the images
-    images = []
-
-    # Read each image and append it to the list
-    for png_file in png_files:
-        image_path = os.path.join(directory_path, png_file)
-        images.append(imageio.imread(image_path))
-
-    # Save the images as a video (you can adjust the fps parameter)
-    imageio.mimsave(f"{directory_path}/animation.mp4", images, fps=30)
+    # Get the numbered frames in the directory, sorted by iteration
+    frames = list_frames(directory_path)
+
+    # Stream each image into the video (you can adjust the fps parameter) so
+    # only one frame is held in memory at a time
+    with imageio.get_writer(f"{directory_path}/animation.mp4", fps=30) as writer:
+        for _, png_file in frames:
+            writer.append_data(np.asarray(to_image(png_file)))
 
 
 if __name__ == "__main__":
@@ -17,7 +17,7 @@ in mkShell {
       ps.scipy
       ps.matplotlib
       ps.pyyaml
+      ps.pillow
     ]))
-    imagemagick
   ];
 }
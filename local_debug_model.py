@@ -6,22 +6,24 @@ import logging
 import time
 
 
-# Create the simulation environment folder
-START_TIME = "-".join(time.ctime().split()[1:4]).replace(":", ".")
-simulation_data_folder = src.log_trace.mk_folder_path(
-    folder_name="playground", sub_fldr_name=str(START_TIME)
-)
-
-logger = logging.getLogger(__name__)
-logger = src.log_trace.setup_logger(
-    logger,
-    name="/".join([simulation_data_folder, "simulation"]),
-    debug_level=False,
-    mode=False,
-)
+def main() -> Simulation:
+    """
+    Run a fixed debugging configuration of the simulation
+    """
+    # Create the simulation environment folder
+    START_TIME = "-".join(time.ctime().split()[1:4]).replace(":", ".")
+    simulation_data_folder = src.log_trace.mk_folder_path(
+        folder_name="playground", sub_fldr_name=str(START_TIME)
+    )
 
+    logger = logging.getLogger("__main__")
+    logger = src.log_trace.setup_logger(
+        logger,
+        name="/".join([simulation_data_folder, "simulation"]),
+        debug_level=False,
+        mode=False,
+    )
 
-if __name__ == "__main__":
     small_test_sim = Simulation(
         folder_path=simulation_data_folder,
         b_image="img/1.png",
@@ -36,3 +38,8 @@ if __name__ == "__main__":
     small_test_sim.run()
 
     small_test_sim.write_results()
+    return small_test_sim
+
+
+if __name__ == "__main__":
+    main()
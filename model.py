@@ -1,46 +1,74 @@
 from src.simulation import Simulation
+from src.config import RunConfig
+from src.api import ReconstructionResult
+from src.image_cache import load_image
+from src.output import FolderOutput
+from src.result_cache import ResultCache
 import src.log_trace
 import logging
-from src.arg_parse import args
+from src.arg_parse import parse_args
 import time
 
 
-# Create the simulation environment folder
-START_TIME = "-".join(time.ctime().split()[1:4]).replace(":", ".")
-simulation_data_folder = src.log_trace.mk_folder_path(
-    folder_name="playground", sub_fldr_name=str(START_TIME)
-)
+def main(argv: list[str] | None = None) -> ReconstructionResult:
+    """
+    Parse the arguments, then run and save a simulation (or return the cached
+    result of an identical run)
+    """
+    args = parse_args(argv)
 
-logger = logging.getLogger(__name__)
-logger = src.log_trace.setup_logger(
-    logger,
-    name="/".join([simulation_data_folder, "simulation"]),
-    debug_level=args.debug,
-    mode=args.stream_mode,
-)
+    # Create the simulation environment folder
+    START_TIME = "-".join(time.ctime().split()[1:4]).replace(":", ".")
+    simulation_data_folder = src.log_trace.mk_folder_path(
+        folder_name="playground", sub_fldr_name=str(START_TIME), unique=True
+    )
 
+    # NOTE: the loggers in src/ are children of "__main__"
+    logger = logging.getLogger("__main__")
+    logger = src.log_trace.setup_logger(
+        logger,
+        name="/".join([simulation_data_folder, "simulation"]),
+        debug_level=args.debug,
+        mode=args.stream_mode,
+    )
 
-logger.debug(
-    f"""Max Generations: {args.max_polygons}
-Max Evaluations: {args.max_evaluations}
-Stagnation Limits: {args.stagnation_limit}
-Min Save: {args.min_save}
-Debug State: {args.debug}"""
-)
+    config = RunConfig.from_args(args)
+    logger.debug(f"Config: {config.to_json()}, Debug State: {args.debug}")
 
+    base_image = load_image(args.base_image)
+    init_genome = args.init_genome
+    cache = None
+    if args.result_cache is not None:
+        cache = ResultCache(args.result_cache)
+        result = cache.get(base_image, config)
+        if result is not None:
+            logger.info("Returning cached result")
+            FolderOutput(simulation_data_folder).save_image("output", result.canvas())
+            for name in ("genome.bin", "output.svg"):
+                result.save(f"{simulation_data_folder}/{name}")
+            return result
+        if args.warm_start and init_genome is None:
+            nearest = cache.nearest(base_image, config)
+            if nearest is not None:
+                init_genome = nearest.genome
 
-if __name__ == "__main__":
     small_test_sim = Simulation(
         folder_path=simulation_data_folder,
-        b_image=args.base_image,
+        config=config,
+        b_image=base_image,
         o_image=args.output_image,
-        m_poly=args.max_polygons,
-        stag_lim=args.stagnation_limit,
-        n_evals=args.max_evaluations,
-        min_save=args.min_save,
+        init_genome=init_genome,
     )
     # run simulation
     logger.info("running sim")
     small_test_sim.run()
 
     small_test_sim.write_results()
+    result = ReconstructionResult.from_simulation(small_test_sim)
+    if cache is not None:
+        cache.put(base_image, result)
+    return result
+
+
+if __name__ == "__main__":
+    main()
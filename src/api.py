@@ -0,0 +1,99 @@
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.config import RunConfig
+from src.custom_types import Canvas
+from src.genome import canvas_to_genome, genome_to_canvas
+from src.genome_io import save_genome
+from src.loss import percent_of
+from src.render import rasterize
+from src.replay import Trajectory
+from src.simulation import Simulation
+
+# NOTE: the loggers in src/ are children of "__main__"; without a handler
+# their warnings would be printed by logging's last resort handler when the
+# library is embedded
+logging.getLogger("__main__").addHandler(logging.NullHandler())
+
+
+@dataclass
+class ReconstructionResult:
+    """
+    Outcome of a reconstruction: the final genome and its metrics
+    """
+
+    config: RunConfig
+    genome: np.ndarray
+    width: int
+    height: int
+    loss: float
+    complete_percent: float
+    iterations: int
+    elapsed: float
+    stop_reason: str | None
+    trajectory: Trajectory | None = None
+
+    @classmethod
+    def from_simulation(cls, simulation: Simulation) -> "ReconstructionResult":
+        """
+        Collect the result of a finished simulation
+        """
+        loss = float(simulation.eval_loss(simulation.canvas))
+        blank_loss = float(np.sum(simulation.base_image))
+        return cls(
+            config=simulation.config,
+            genome=canvas_to_genome(simulation.canvas, simulation.n_vertices),
+            width=simulation.width,
+            height=simulation.height,
+            loss=loss,
+            complete_percent=percent_of(loss, blank_loss),
+            iterations=simulation.iterations,
+            elapsed=simulation.stopping.elapsed,
+            stop_reason=simulation.stop_reason,
+            trajectory=simulation.trajectory,
+        )
+
+    def canvas(self) -> Canvas:
+        """
+        Rebuild the final canvas
+        """
+        return genome_to_canvas(self.genome, self.width, self.height)
+
+    def save(self, path: str, precision: int = 2) -> None:
+        """
+        Write the final genome, see `src.genome_io.save_genome`
+        """
+        save_genome(path, self.genome, self.width, self.height, precision)
+
+    def image(self, width: int | None = None, height: int | None = None):
+        """
+        Render the final genome, at the source resolution by default
+        """
+        return rasterize(self.genome, self.width, self.height, width, height)
+
+
+def reconstruct(
+    image: np.ndarray, config: RunConfig | None = None, output=None
+) -> ReconstructionResult:
+    """
+    Reconstruct an in-memory image with polygons.
+
+    Nothing is written to disk unless an `output` (e.g. a `FolderOutput`) is
+    given.
+
+    Args:
+        image (np.ndarray): (H, W, C) image array.
+        config (RunConfig | None): Run parameters. Defaults to `RunConfig()`.
+        output: Optional object receiving frames and results.
+
+    Returns:
+        ReconstructionResult: Final genome and metrics of the run.
+    """
+    if config is None:
+        config = RunConfig()
+    simulation = Simulation(config=config, output=output, b_image=image)
+    simulation.run()
+    simulation.write_results()
+    return ReconstructionResult.from_simulation(simulation)
@@ -1,6 +1,7 @@
-from argparse import ArgumentParser
-import src.log_trace
-import logging
+from argparse import ArgumentParser, Namespace
+from src.image_cache import COLOR_MODES
+from src.memory import parse_size
+from src.stopping import parse_duration
 
 
 parser = ArgumentParser(
@@ -15,14 +16,14 @@ parser.add_argument(
 
 # NOTE: could also look at implementing HSBA too
 
-# parser.add_argument(
-#     "-c",
-#     "--color-mode",
-#     type=str,
-#     choices=["GRAY", "RGBA"],
-#     default="GRAY",
-#     help="Specify the color-mode that will be used",
-# )
+parser.add_argument(
+    "-c",
+    "--color-mode",
+    type=str,
+    choices=COLOR_MODES,
+    default="rgb",
+    help="Color mode of the reconstruction, 'gray' fits gray polygons to the luma of the base image, rendering and comparing a single channel (default=rgb)",
+)
 
 
 parser.add_argument(
@@ -49,6 +50,35 @@ parser.add_argument(
     help="Max number of iterations allowed before a solution is considered 'stagnate'",
 )
 
+parser.add_argument(
+    "-t",
+    "--time-limit",
+    type=parse_duration,
+    default=None,
+    help="Wall-clock budget in seconds or HH:MM:SS, e.g. a little under the job's h_rt (default=None)",
+)
+
+parser.add_argument(
+    "--target-percent",
+    type=float,
+    default=None,
+    help="Stop once the complete percentage reaches this value (default=None)",
+)
+
+parser.add_argument(
+    "--plateau-window",
+    type=int,
+    default=None,
+    help="Once all polygons are placed, stop if the complete percentage improved by less than --plateau-threshold over this many iterations (default=None)",
+)
+
+parser.add_argument(
+    "--plateau-threshold",
+    type=float,
+    default=0.01,
+    help="Minimum complete percentage gained over --plateau-window iterations (default=0.01)",
+)
+
 parser.add_argument(
     "-m",
     "--min-save",
@@ -57,6 +87,142 @@ parser.add_argument(
     help="Save only images that are improving the current generation's fitness score (default=False)",
 )
 
+parser.add_argument(
+    "-a",
+    "--adaptive-mutation",
+    action="store_true",
+    default=False,
+    help="Adapt the mutation operator choice and step sizes to their measured acceptance rates (default=False)",
+)
+
+parser.add_argument(
+    "--no-frames",
+    action="store_true",
+    default=False,
+    help="Do not write a PNG per iteration; frames can be rendered later from the saved trajectory (default=False)",
+)
+
+parser.add_argument(
+    "--renderer",
+    type=str,
+    choices=("agg", "numpy", "numba"),
+    default="agg",
+    help="Renderer of the loss evaluations, matplotlib's anti-aliased 'agg', the tiled 'numpy' rasterizer, or 'numba' fusing the numpy rasterizer and the loss into one compiled pass, if numba is installed (default=agg)",
+)
+
+parser.add_argument(
+    "--threads",
+    type=int,
+    default=1,
+    help="Threads per evaluation with the numpy renderer, 0 uses every core (default=1)",
+)
+
+parser.add_argument(
+    "--optimizer",
+    type=str,
+    choices=("hill_climb", "es"),
+    default="hill_climb",
+    help="Optimizer engine, the paper's (1+1) hill climber or a (parents+offspring) evolution strategy scoring whole generations in parallel (default=hill_climb)",
+)
+
+parser.add_argument(
+    "--parents",
+    type=int,
+    default=4,
+    help="Parents kept every generation with --optimizer es (default=4)",
+)
+
+parser.add_argument(
+    "--offspring",
+    type=int,
+    default=16,
+    help="Children scored every generation with --optimizer es (default=16)",
+)
+
+parser.add_argument(
+    "--polish-interval",
+    type=int,
+    default=None,
+    help="Every this many evaluations, set every polygon's color to its loss optimal value for its alpha in one pass (default=None, never)",
+)
+
+parser.add_argument(
+    "--prune-interval",
+    type=int,
+    default=None,
+    help="Every this many evaluations, remove the degenerate, transparent and fully occluded polygons; the freed slots are refilled with energy map polygons (default=None, never)",
+)
+
+parser.add_argument(
+    "--insert-candidates",
+    type=int,
+    default=1,
+    help="Energy map polygons sampled per insertion or reinit; with more than 1, each gets its optimal color and only the best is inserted (default=1, a single polygon with a random color)",
+)
+
+parser.add_argument(
+    "--metrics-file",
+    type=str,
+    default=None,
+    help="Prometheus textfile rewritten with the live metrics of the run, e.g. for the node exporter's textfile collector (default=None)",
+)
+
+parser.add_argument(
+    "--metrics-port",
+    type=int,
+    default=None,
+    help="Serve the live metrics of the run at http://127.0.0.1:PORT/metrics (default=None)",
+)
+
+parser.add_argument(
+    "--metrics-interval",
+    type=float,
+    default=5.0,
+    help="Seconds between two updates of the live metrics (default=5.0)",
+)
+
+parser.add_argument(
+    "--mask-cache",
+    type=parse_size,
+    default=64 * 2**20,
+    help="Memory cap of the numpy renderer's cache of polygon coverage masks, e.g. 256M, 0 to disable it (default=64M)",
+)
+
+parser.add_argument(
+    "--memory-budget",
+    type=parse_size,
+    default=None,
+    help="Memory budget of the run, e.g. 8G: past 80%% of it the generations and trajectory are spilled to disk, past all of it the run stops and writes its results (default=None)",
+)
+
+parser.add_argument(
+    "--seed",
+    type=int,
+    default=None,
+    help="Seed of the random number generator, for reproducible runs (default=None)",
+)
+
+parser.add_argument(
+    "--init-genome",
+    type=str,
+    default=None,
+    help="Continue from a saved genome (e.g. the genome.bin of a run with fewer polygons), resized to the base image (default=None)",
+)
+
+parser.add_argument(
+    "--result-cache",
+    type=str,
+    default=None,
+    help="Directory of the result cache; a run with the same image and parameters returns the cached result (default=None, no cache)",
+)
+
+parser.add_argument(
+    "--warm-start",
+    action="store_true",
+    default=False,
+    help="On a result cache miss, start from the nearest cached result of the same image with at most as many polygons (default=False)",
+)
+
 parser.add_argument(
     "--stream-mode",
     action="store_true",
@@ -72,8 +238,13 @@ parser.add_argument(
     help="Toggle the debug flag, this directly controls the minimum logging level of the logging handler (default=False)",
 )
 
-args = parser.parse_args()
 
 
-# HACK: this allows for global flags to be passed onto other files
-FLAGS = {"debug": args.debug}
+def parse_args(argv: list[str] | None = None) -> Namespace:
+    """
+    Parse the arguments of model.py, from sys.argv unless argv is given.
+
+    NOTE: nothing is parsed at import time, so the library can be imported by
+    batch drivers and worker processes regardless of their command line.
+    """
+    return parser.parse_args(argv)
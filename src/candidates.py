@@ -0,0 +1,93 @@
+import logging
+
+import numpy as np
+
+from src.render import polygon_mask
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+ALPHAS = (0.25, 0.5, 0.75, 1.0)  # alphas tried for every candidate
+
+
+def sample_vertices(energy: np.ndarray, count: int, n_vertices: int) -> np.ndarray:
+    """
+    Sample the vertices of `count` polygons from a cumulative energy map.
+
+    Every vertex is the first pixel whose cumulative probability exceeds a
+    uniform random value (the paper's rule), placed at the pixel center in
+    data coordinates (origin at the bottom left).
+
+    Args:
+        energy (np.ndarray): (H, W) cumulative energy map, see
+          `src.simulation.get_energy_map`.
+        count (int): Number of polygons.
+        n_vertices (int): Vertices per polygon.
+
+    Returns:
+        np.ndarray: (count, 2 * n_vertices) rows of [x_0 .. x_n-1, y_0 .. y_n-1].
+    """
+    height, width = energy.shape
+    thresholds = np.random.rand(count, n_vertices)
+    index = np.searchsorted(energy.ravel(), thresholds, side="right")
+    rows, cols = np.divmod(np.minimum(index, energy.size - 1), width)
+    return np.concatenate([cols + 0.5, height - rows - 0.5], axis=1)
+
+
+def best_candidate(
+    target: np.ndarray,
+    below: np.ndarray,
+    energy: np.ndarray,
+    n_vertices: int,
+    count: int,
+    alphas: tuple[float, ...] = ALPHAS,
+) -> tuple[np.ndarray, float] | None:
+    """
+    Best of `count` energy map polygons to draw on top of a rendering.
+
+    The candidates are sampled in one batch. Each one gets the SAD optimal
+    color for every alpha in `alphas` (the per channel median of what the
+    covered pixels need, `(target - (1 - a) * below) / a`), and is scored by
+    compositing it over `below` within its bounding box only.
+
+    Args:
+        target (np.ndarray): (H, W, C) uint8 target image.
+        below (np.ndarray): (H, W, C) uint8 rendering the polygon goes on.
+        energy (np.ndarray): (H, W) cumulative energy map of the two.
+        n_vertices (int): Vertices per polygon.
+        count (int): Number of candidates.
+        alphas (tuple[float, ...]): Alphas tried for every candidate.
+
+    Returns:
+        tuple[np.ndarray, float] | None: Genome row of the best candidate and
+          the change of the SAD it brings, or None if no candidate covers a
+          pixel.
+    """
+    height, width, channels = target.shape
+    best, best_delta = None, np.inf
+    for vertices in sample_vertices(energy, count, n_vertices):
+        gene = np.zeros(2 * n_vertices + 4, dtype=np.float32)
+        gene[: 2 * n_vertices] = vertices
+        covered = polygon_mask(gene, (1.0, 1.0), (width, height))
+        if covered is None or not covered[2].any():
+            continue
+        r0, c0, mask = covered
+        window = (slice(r0, r0 + mask.shape[0]), slice(c0, c0 + mask.shape[1]))
+        wanted = target[window][mask].astype(np.float32)
+        under = below[window][mask][:, :channels].astype(np.float32)
+        before = np.abs(under - wanted).sum()
+
+        for alpha in alphas:
+            color = np.median((wanted - (1 - alpha) * under) / alpha, axis=0)
+            color = np.clip(color, 0, 255)
+            drawn = np.rint((1 - alpha) * under + alpha * color)
+            delta = float(np.abs(drawn - wanted).sum() - before)
+            if delta < best_delta:
+                gene[-4:-1] = color / 255  # NOTE: a gray value fills all three
+                gene[-1] = alpha
+                best, best_delta = gene.copy(), delta
+
+    if best is None:
+        return None
+    logger.debug(f"Best of {count} candidates: SAD change {best_delta}")
+    return best, best_delta
@@ -0,0 +1,109 @@
+import json
+from argparse import Namespace
+from dataclasses import asdict, dataclass, fields
+
+
+@dataclass
+class RunConfig:
+    """
+    Parameters of one simulation run.
+
+    Every field is a plain JSON value, so a config can be logged, stored next
+    to a result and sent to worker processes as is.
+    """
+
+    max_polygons: int = 10
+    stagnation_limit: int = 100
+    max_evaluations: int = 50000
+    n_vertices: int = 3
+    color_mode: str = "rgb"
+    min_save: bool = True
+    save_frames: bool = True
+    adaptive_mutation: bool = False
+    time_limit: float | None = None
+    target_percent: float | None = None
+    plateau_window: int | None = None
+    plateau_threshold: float = 0.01
+    stats_interval: int = 1000
+    renderer: str = "agg"
+    threads: int = 1
+    mask_cache: int = 64 * 2**20
+    optimizer: str = "hill_climb"
+    parents: int = 4
+    offspring: int = 16
+    polish_interval: int | None = None
+    prune_interval: int | None = None
+    insert_candidates: int = 1
+    metrics_file: str | None = None
+    metrics_port: int | None = None
+    metrics_interval: float = 5.0
+    memory_budget: int | None = None
+    seed: int | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def to_json(self) -> str:
+        """
+        Canonical JSON form (sorted keys), stable across runs
+        """
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RunConfig":
+        """
+        Build a config from a dict, ignoring unknown keys
+        """
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+    @classmethod
+    def from_json(cls, text: str) -> "RunConfig":
+        return cls.from_dict(json.loads(text))
+
+    @classmethod
+    def from_args(cls, args: Namespace) -> "RunConfig":
+        """
+        Build a config from the parsed arguments of model.py
+        """
+        return cls(
+            max_polygons=args.max_polygons,
+            stagnation_limit=args.stagnation_limit,
+            max_evaluations=args.max_evaluations,
+            color_mode=args.color_mode,
+            min_save=args.min_save,
+            save_frames=not args.no_frames,
+            adaptive_mutation=args.adaptive_mutation,
+            time_limit=args.time_limit,
+            target_percent=args.target_percent,
+            plateau_window=args.plateau_window,
+            plateau_threshold=args.plateau_threshold,
+            seed=args.seed,
+            renderer=args.renderer,
+            threads=args.threads,
+            mask_cache=args.mask_cache,
+            optimizer=args.optimizer,
+            parents=args.parents,
+            offspring=args.offspring,
+            polish_interval=args.polish_interval,
+            prune_interval=args.prune_interval,
+            insert_candidates=args.insert_candidates,
+            metrics_file=args.metrics_file,
+            metrics_port=args.metrics_port,
+            metrics_interval=args.metrics_interval,
+            memory_budget=args.memory_budget,
+        )
+
+    @classmethod
+    def from_kwargs(cls, kwargs: dict) -> "RunConfig":
+        """
+        Build a config from the legacy `Simulation(**kwargs)` keywords
+        """
+        legacy = {
+            "m_poly": "max_polygons",
+            "stag_lim": "stagnation_limit",
+            "n_evals": "max_evaluations",
+            "n_vert": "n_vertices",
+            "adaptive": "adaptive_mutation",
+        }
+        return cls.from_dict({legacy.get(k, k): v for k, v in kwargs.items()})
@@ -1,16 +1,12 @@
 from numpy import array, float32, ndarray
 import numpy as np
-import matplotlib.patches
-import matplotlib.collections
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_agg import FigureCanvasAgg
 from typing import Iterator, Tuple
 
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from numpy.typing import ArrayLike
 
-# FIXME: import flags from argparse for colormode
+from src.spatial import Box, GridIndex
 
 DIMS = (64, 64)  # Default dimensions of the canvas
 
@@ -50,18 +46,24 @@ class Vertices:
 
 
 @dataclass
-class Polygon(matplotlib.patches.Polygon):
+class Polygon:
     """
     Datatype representing a single solution / polygon
+
+    Keeps the parts of the `matplotlib.patches.Polygon` interface used by the
+    simulation (a closed `xy` array and the facecolor / alpha accessors, with
+    the same semantics) without importing matplotlib; `to_patch` builds the
+    matplotlib patch when a figure is drawn.
     """
 
     def __init__(self, vertices: Vertices, color: RGBA, _id: int):
-        super().__init__(
-            xy=np.c_[vertices.x, vertices.y],
-            color=color.get_all(),
-            closed=True,
-            linewidth=0,
-        )
+        xy = np.asarray(np.c_[vertices.x, vertices.y], dtype=float)
+        # NOTE: closed polygons repeat their first vertex at the end
+        if len(xy) and not np.array_equal(xy[0], xy[-1]):
+            xy = np.concatenate([xy, xy[:1]])
+        self.xy: ndarray = xy
+        self._color: tuple = tuple(float(c) for c in color.get_all())
+        self._alpha: float | None = None
         self._id: int = _id
 
     @property
@@ -69,6 +71,47 @@ class Polygon(matplotlib.patches.Polygon):
         """id of the polygon"""
         return self._id
 
+    def get_facecolor(self) -> tuple[float, float, float, float]:
+        """
+        RGBA face color, with the alpha overridden by `set_alpha` if it was set
+        """
+        r, g, b, a = self._color
+        return (r, g, b, a if self._alpha is None else self._alpha)
+
+    def set_facecolor(self, color) -> None:
+        """
+        Set the face color from an RGB or RGBA sequence
+
+        NOTE: like matplotlib, an RGB color gets alpha 1 unless `set_alpha` was
+        called before.
+        """
+        color = tuple(float(c) for c in color)
+        self._color = color if len(color) == 4 else color + (1.0,)
+
+    def bounds(self) -> Box:
+        """
+        Bounding box of the vertices, (x_min, y_min, x_max, y_max)
+        """
+        x_min, y_min = self.xy.min(axis=0)
+        x_max, y_max = self.xy.max(axis=0)
+        return (float(x_min), float(y_min), float(x_max), float(y_max))
+
+    def set_alpha(self, alpha: float) -> None:
+        """
+        Override the alpha of the face color
+        """
+        self._alpha = float(alpha)
+
+    def to_patch(self):
+        """
+        Build the equivalent `matplotlib.patches.Polygon`
+        """
+        import matplotlib.patches
+
+        return matplotlib.patches.Polygon(
+            xy=self.xy, color=self.get_facecolor(), closed=True, linewidth=0
+        )
+
 
 @dataclass
 class Canvas:
@@ -79,6 +122,25 @@ class Canvas:
     sequence: list[Polygon]
     width: int
     height: int
+    # NOTE: "agg" renders with matplotlib, "numpy" with the threaded tiled
+    # rasterizer in src/render.py; "numba" fuses rendering into the loss
+    # (src/render_jit.py) and renders images like "numpy"
+    renderer: str = "agg"
+    threads: int = 1
+    # NOTE: the spatial index is built by the first overlap query and then
+    # kept up to date by append / swap / replace_polygon, so canvases that are
+    # never queried (and their deep copies) don't pay for it
+    _index: GridIndex | None = field(default=None, repr=False, compare=False)
+    _positions: dict[int, int] = field(default_factory=dict, repr=False, compare=False)
+
+    def append(self, polygon: Polygon) -> None:
+        """
+        add a polygon on top of the sequence
+        """
+        self.sequence.append(polygon)
+        if self._index is not None:
+            self._index.insert(polygon.id, polygon.bounds())
+            self._positions[polygon.id] = len(self.sequence) - 1
 
     def swap(self, ind_1: int, ind_2: int) -> None:
         """
@@ -89,6 +151,10 @@ class Canvas:
             self.sequence[ind_2],
             self.sequence[ind_1],
         )
+        if self._index is not None:
+            n = len(self.sequence)
+            self._positions[self.sequence[ind_1].id] = ind_1 % n
+            self._positions[self.sequence[ind_2].id] = ind_2 % n
 
     def how_many(self) -> int:
         """
@@ -111,7 +177,48 @@ class Canvas:
         """
         update the polygon at the given index with an updated polygon
         """
-        self.sequence[self.get_index(updated_polygon.id)] = updated_polygon
+        index = self.get_index(updated_polygon.id)
+        old_polygon = self.sequence[index]
+        self.sequence[index] = updated_polygon
+        if self._index is not None:
+            if old_polygon.id != updated_polygon.id:
+                self._index.remove(old_polygon.id)
+                del self._positions[old_polygon.id]
+            self._index.update(updated_polygon.id, updated_polygon.bounds())
+            self._positions[updated_polygon.id] = index % len(self.sequence)
+
+    def remove(self, positions: list[int]) -> None:
+        """
+        remove the polygons at the given positions; the others keep their
+        z-order and get ids following it, so new polygons can take
+        `how_many()` as their id again
+        """
+        drop = set(positions)
+        self.sequence = [p for i, p in enumerate(self.sequence) if i not in drop]
+        for position, polygon in enumerate(self.sequence):
+            polygon._id = position
+        # NOTE: every id changed, the index is rebuilt by the next query
+        self._index = None
+        self._positions = {}
+
+    def spatial_index(self) -> GridIndex:
+        """
+        grid index over the polygon bounding boxes, built on first use
+        """
+        if self._index is None:
+            self._index = GridIndex(self.width, self.height)
+            for position, polygon in enumerate(self.sequence):
+                self._index.insert(polygon.id, polygon.bounds())
+                self._positions[polygon.id] = position
+        return self._index
+
+    def overlapping(self, rect: Box) -> list[Polygon]:
+        """
+        get the polygons whose bounding box overlaps rect, (x_min, y_min,
+        x_max, y_max), in z-order (back to front)
+        """
+        ids = self.spatial_index().query(rect)
+        return [self.sequence[i] for i in sorted(self._positions[_id] for _id in ids)]
 
     # def mut_prob(self, _id):
     #    """
@@ -131,15 +238,31 @@ class Canvas:
         """
         Composite all polygons into an image
         """
+        if self.renderer in ("numpy", "numba"):
+            from src.genome import canvas_to_genome
+            from src.render import rasterize
+
+            n_vert = max((len(p.xy) - 1 for p in self.sequence), default=3)
+            genome = canvas_to_genome(self, n_vert)
+            return rasterize(genome, self.width, self.height, threads=self.threads)
+
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.collections import PatchCollection
+
         fig = Figure(figsize=(self.width / 100, self.height / 100), dpi=100)
         canvas_agg = FigureCanvasAgg(fig)
 
-        ax = fig.add_subplot()
+        # NOTE: the axes fill the whole figure so data coords map 1:1 to pixels
+        ax = fig.add_axes((0, 0, 1, 1))
         ax.axis("off")
         ax.set_xlim(0, self.width)
         ax.set_ylim(0, self.height)
         ax.add_collection(
-            matplotlib.collections.PatchCollection(self.sequence, match_original=True)
+            PatchCollection(
+                [polygon.to_patch() for polygon in self.sequence],
+                match_original=True,
+            )
         )
         canvas_agg.draw()
         rgba = np.asarray(canvas_agg.buffer_rgba())
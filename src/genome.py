@@ -0,0 +1,86 @@
+import numpy as np
+
+from src.custom_types import RGBA, Canvas, Polygon, Vertices
+
+N_VERTICES_TRI = 3
+
+
+def n_vertices(genome: np.ndarray) -> int:
+    """
+    Number of vertices per polygon encoded in a genome
+    """
+    return (genome.shape[1] - 4) // 2
+
+
+def canvas_to_genome(canvas: Canvas, n_vert: int = N_VERTICES_TRI) -> np.ndarray:
+    """
+    Flatten the polygon sequence of a canvas into a genome array.
+
+    Each row is one polygon in z-order (back to front):
+    [x_0 .. x_n-1, y_0 .. y_n-1, r, g, b, a].
+
+    Args:
+        canvas (Canvas): Canvas to flatten.
+        n_vert (int): Number of vertices per polygon. Defaults to 3.
+
+    Returns:
+        np.ndarray: (n_polygons, 2 * n_vert + 4) float32 array.
+    """
+    return polygons_to_genome(canvas.sequence, n_vert)
+
+
+def polygons_to_genome(
+    polygons: list[Polygon], n_vert: int = N_VERTICES_TRI
+) -> np.ndarray:
+    """
+    Genome array of a list of polygons, e.g. `Canvas.overlapping` results
+    """
+    genome = np.empty((len(polygons), 2 * n_vert + 4), dtype=np.float32)
+    for row, polygon in zip(genome, polygons):
+        # NOTE: xy is closed, the last vertex repeats the first one
+        vertices = polygon.xy[:-1][:n_vert]
+        if len(vertices) < n_vert:
+            pad = np.repeat(vertices[-1:], n_vert - len(vertices), axis=0)
+            vertices = np.concatenate([vertices, pad])
+        row[:n_vert] = vertices[:, 0]
+        row[n_vert : 2 * n_vert] = vertices[:, 1]
+        row[-4:] = polygon.get_facecolor()
+    return genome
+
+
+def genome_to_canvas(genome: np.ndarray, width: int, height: int) -> Canvas:
+    """
+    Rebuild a canvas from a genome array, polygon ids follow the z-order.
+
+    Args:
+        genome (np.ndarray): (n_polygons, 2 * n_vertices + 4) genome array.
+        width (int): Width of the canvas.
+        height (int): Height of the canvas.
+
+    Returns:
+        Canvas: Canvas holding one Polygon per genome row.
+    """
+    n = n_vertices(genome)
+    sequence = [
+        Polygon(
+            Vertices(gene[:n].astype(float), gene[n : 2 * n].astype(float)),
+            RGBA(*gene[-4:]),
+            _id=i,
+        )
+        for i, gene in enumerate(genome)
+    ]
+    return Canvas(sequence=sequence, width=width, height=height)
+
+
+def resize_genome(
+    genome: np.ndarray, width: int, height: int, new_width: int, new_height: int
+) -> np.ndarray:
+    """
+    Scale the vertices of a genome from a width x height canvas to a
+    new_width x new_height one, colors are unchanged.
+    """
+    n = n_vertices(genome)
+    resized = genome.astype(np.float32, copy=True)
+    resized[:, :n] *= new_width / width
+    resized[:, n : 2 * n] *= new_height / height
+    return resized
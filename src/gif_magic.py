@@ -1,6 +1,14 @@
+import logging
 import os
-import subprocess
+import re
 from argparse import ArgumentParser
+from typing import Iterable, Iterator
+
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
 
 parser = ArgumentParser(description="A script to make gifs")
 
@@ -9,7 +17,7 @@ parser.add_argument(
     "--input-dir",
     default=".",
     type=str,
-    help="The path of the input images (will assume all files in this directory are to be used for the gif)",
+    help="The path of the input images (the numbered frames written by the simulation, or its trajectory.npz)",
 )
 
 parser.add_argument(
@@ -21,53 +29,294 @@ parser.add_argument(
 )
 
 parser.add_argument(
-    "-d", "--delay", default=1, type=str, help="the delay between frames of the gif"
+    "-d",
+    "--delay",
+    default=1,
+    type=float,
+    help="the delay between frames of the gif, in hundredths of a second",
 )
 
-args = parser.parse_args()
+parser.add_argument(
+    "-l",
+    "--length",
+    default=None,
+    type=float,
+    help="Fixed length of the animation in seconds; frames are sampled evenly over the run's iterations (default=all frames)",
+)
+
+parser.add_argument(
+    "-f",
+    "--format",
+    default="gif",
+    choices=["gif", "webp"],
+    help="Format of the animation (default=gif)",
+)
+
+FRAME_PATTERN = re.compile(r"^(\d+)\.png$")
+
+
+def list_frames(input_dir: str) -> list[tuple[int, str]]:
+    """
+    Find the frames written by `Simulation.save_image` in a folder.
+
+    Args:
+        input_dir (str): Folder of a simulation run.
+
+    Returns:
+        list[tuple[int, str]]: (iteration, path) pairs sorted by iteration,
+        with the final 'output.png' (if any) last.
+    """
+    frames = []
+    for name in os.listdir(input_dir):
+        match = FRAME_PATTERN.match(name)
+        if match:
+            frames.append((int(match.group(1)), os.path.join(input_dir, name)))
+    frames.sort()
+
+    output = os.path.join(input_dir, "output.png")
+    if os.path.exists(output):
+        last = frames[-1][0] + 1 if frames else 0
+        frames.append((last, output))
+    return frames
+
+
+def sample_frames(iterations: list[int], n_frames: int) -> list[int]:
+    """
+    Pick frames evenly spaced in iterations, for a fixed-length animation.
+
+    Each sample shows the latest frame at or before its iteration, so runs
+    that only saved improving frames still play back at a constant rate.
+
+    Args:
+        iterations (list[int]): Sorted iterations of the available frames.
+        n_frames (int): Number of frames in the animation.
+
+    Returns:
+        list[int]: Indices into `iterations` (repeats mean a still frame).
+    """
+    targets = np.linspace(iterations[0], iterations[-1], n_frames)
+    return list(np.searchsorted(iterations, targets, side="right") - 1)
+
+
+def to_image(frame: np.ndarray | Image.Image | str) -> Image.Image:
+    """
+    Load a frame given as an array, an image or a path, as RGB
+    """
+    if isinstance(frame, str):
+        with Image.open(frame) as image:
+            return image.convert("RGB")
+    if isinstance(frame, np.ndarray):
+        return Image.fromarray(frame[:, :, :3])
+    return frame.convert("RGB")
+
+
+def write_gif(
+    frames: Iterable[np.ndarray | Image.Image | str],
+    output_file: str,
+    duration: int = 100,
+    palette: Image.Image | None = None,
+    loop: int = 0,
+) -> int:
+    """
+    Stream frames into an animated GIF, one frame in memory at a time.
+
+    Every frame is quantized to one shared palette (without dithering, so
+    unchanged regions keep the same indices), and only the bounding box of the
+    pixels that changed since the previous frame is written. Identical frames
+    are merged into a longer delay.
+
+    Args:
+        frames (Iterable): Frames as arrays, images or paths.
+        output_file (str): Path of the GIF.
+        duration (int): Delay of each frame in milliseconds.
+        palette (Image.Image | None): Image whose colors make up the shared
+          palette, e.g. the final result. Defaults to the first frame.
+        loop (int): Number of loops, 0 to loop forever.
+
+    Returns:
+        int: Number of frames written.
+    """
+    frames = iter(frames)
+    first = to_image(next(frames))
+    if palette is None:
+        palette = first
+    palette = to_image(palette).quantize(colors=256, dither=Image.Dither.NONE)
+
+    def quantize(image: Image.Image) -> Image.Image:
+        return image.quantize(palette=palette, dither=Image.Dither.NONE)
 
+    written = 0
+    with open(output_file, "wb") as file:
+        previous = quantize(first)
+        header, _ = GifImagePlugin.getheader(
+            previous, info={"loop": loop, "optimize": False}
+        )
+        file.write(b"".join(header))
 
-def create_gif(input_dir, output_file, delay=0.1):
+        # hold back one frame so identical successors can extend its delay
+        pending, pending_offset, pending_duration = previous, (0, 0), duration
+        previous_indices = np.asarray(previous)
+
+        for frame in frames:
+            current = quantize(to_image(frame))
+            indices = np.asarray(current)
+            rows, cols = np.nonzero(indices != previous_indices)
+            if rows.size == 0:
+                pending_duration += duration
+                continue
+
+            file.write(
+                b"".join(
+                    GifImagePlugin.getdata(
+                        pending, offset=pending_offset, duration=pending_duration
+                    )
+                )
+            )
+            written += 1
+
+            box = (cols.min(), rows.min(), cols.max() + 1, rows.max() + 1)
+            pending = current.crop(box)
+            pending_offset, pending_duration = box[:2], duration
+            previous_indices = indices
+
+        file.write(
+            b"".join(
+                GifImagePlugin.getdata(
+                    pending, offset=pending_offset, duration=pending_duration
+                )
+            )
+        )
+        written += 1
+        file.write(b";")
+
+    logger.info(f"GIF created: {output_file} ({written} frames)")
+    return written
+
+
+def write_webp(
+    frames: Iterable[np.ndarray | Image.Image | str],
+    output_file: str,
+    duration: int = 100,
+    loop: int = 0,
+) -> int:
+    """
+    Write frames into an animated WebP.
+
+    NOTE: Pillow's WebP encoder takes all frames at once, use `sample_frames`
+    to keep their number (and memory) bounded.
+
+    Args:
+        frames (Iterable): Frames as arrays, images or paths.
+        output_file (str): Path of the WebP.
+        duration (int): Delay of each frame in milliseconds.
+        loop (int): Number of loops, 0 to loop forever.
+
+    Returns:
+        int: Number of frames written.
+    """
+    images = [to_image(frame) for frame in frames]
+    images[0].save(
+        output_file,
+        save_all=True,
+        append_images=images[1:],
+        duration=duration,
+        loop=loop,
+        minimize_size=True,
+    )
+    logger.info(f"WebP created: {output_file} ({len(images)} frames)")
+    return len(images)
+
+
+def iter_sampled(
+    frames: list[tuple[int, str]], length: float | None, duration: int
+) -> Iterator[str]:
+    """
+    Yield the paths of the frames that make up an animation of `length` seconds
+    """
+    if length is None:
+        yield from (path for _, path in frames)
+        return
+    n_frames = max(int(length * 1000 / duration), 1)
+    for index in sample_frames([it for it, _ in frames], n_frames):
+        yield frames[index][1]
+
+
+def replay_frames(
+    trajectory_file: str, length: float | None, duration: int
+) -> tuple[Iterator[np.ndarray], np.ndarray]:
+    """
+    Render the frames of an animation from a saved trajectory
+
+    Returns:
+        tuple[Iterator[np.ndarray], np.ndarray]: The frames, and the final
+        frame to build the palette on.
+    """
+    from src.replay import Replay
+
+    replay = Replay(trajectory_file)
+    if length is None:
+        iterations = replay.trajectory.iterations
+    else:
+        n_frames = max(int(length * 1000 / duration), 1)
+        iterations = np.linspace(0, replay.last_iteration, n_frames).astype(int)
+    return replay.frames(iterations), replay.frame(replay.last_iteration)
+
+
+def create_gif(
+    input_dir: str,
+    output_file: str,
+    delay: float = 10,
+    *,
+    length: float | None = None,
+    fmt: str = "gif",
+):
+    """
+    Turn the frames of a simulation run into an animation.
+
+    Args:
+        input_dir (str): Folder of the simulation run.
+        output_file (str): Path of the animation.
+        delay (float): Delay between frames in hundredths of a second.
+        length (float | None): Fixed length of the animation in seconds.
+          Defaults to one animation frame per saved frame.
+        fmt (str): "gif" or "webp".
+    """
     # Check if the input directory exists
     if not os.path.exists(input_dir):
         print(f"Error: Input directory '{input_dir}' does not exist.")
         return
 
-    # Get a list of image files in the input directory
-    image_files = sorted(
-        [
-            f
-            for f in os.listdir(input_dir)
-            if f.lower().endswith((".png", ".jpg", ".jpeg", ".gif", ".bmp"))
-        ]
-    )
-
-    if not image_files:
+    duration = max(int(delay * 10), 10)
+    frames = list_frames(input_dir)
+    trajectory_file = os.path.join(input_dir, "trajectory.npz")
+    if frames:
+        sampled = iter_sampled(frames, length, duration)
+        # the final frame holds the most detail, build the shared palette on it
+        palette = frames[-1][1]
+    elif os.path.exists(trajectory_file):
+        # no frames were saved, render them from the genome snapshots instead
+        sampled, palette = replay_frames(trajectory_file, length, duration)
+    else:
         print(f"No image files found in '{input_dir}'.")
         return
 
-    # Construct the ImageMagick command
-    convert_command = [
-        "convert",  # The ImageMagick command
-        "-delay",
-        str(delay),  # Set the delay between frames in milliseconds
-        os.path.join(input_dir, "*"),  # Input image files path
-        output_file,  # Output GIF file
-    ]
-
-    try:
-        # Run the ImageMagick command
-        subprocess.run(convert_command, check=True)
-        print(f"GIF created: {output_file}")
-    except subprocess.CalledProcessError as e:
-        print(f"Error creating GIF: {e}")
+    if fmt == "webp":
+        write_webp(sampled, output_file, duration)
+    else:
+        write_gif(sampled, output_file, duration, palette=palette)
+    print(f"{fmt.upper()} created: {output_file}")
 
 
 if __name__ == "__main__":
-    input_directory = args.input_dir  # Replace with your input directory
-    output_filename = "/".join(
-        [args.output_dir, "output.gif"]
-    )  # Replace with your output GIF filename
-    frame_delay = args.delay  # Delay between frames in milliseconds
+    args = parser.parse_args()
+    output_filename = os.path.join(
+        os.path.expanduser(args.output_dir), f"output.{args.format}"
+    )
 
-    create_gif(input_directory, output_filename, frame_delay)
+    create_gif(
+        args.input_dir,
+        output_filename,
+        args.delay,
+        length=args.length,
+        fmt=args.format,
+    )
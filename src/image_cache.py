@@ -0,0 +1,184 @@
+import hashlib
+import logging
+import os
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+COLOR_MODES = ("rgb", "gray")
+LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)  # ITU-R BT.601
+
+
+def prepare_image(image: np.ndarray) -> np.ndarray:
+    """
+    Convert a decoded image into the layout the simulation works on.
+
+    The alpha channel (if any) is dropped, and odd heights / widths are cropped
+    by one pixel so the canvas dimensions are even.
+
+    Args:
+        image (np.ndarray): Decoded image as an (H, W) or (H, W, C) array.
+
+    Returns:
+        np.ndarray: Contiguous (H, W, 3) uint8 array.
+    """
+    if image.ndim == 2:
+        image = np.repeat(image[:, :, None], 3, axis=2)
+    height = image.shape[0] - image.shape[0] % 2
+    width = image.shape[1] - image.shape[1] % 2
+    return np.ascontiguousarray(image[:height, :width, :3], dtype=np.uint8)
+
+
+def convert_color(image: np.ndarray, color_mode: str = "rgb") -> np.ndarray:
+    """
+    Convert a preprocessed image to the channels of a color mode: (H, W, 3)
+    for "rgb", the (H, W, 1) luma for "gray"
+    """
+    if color_mode not in COLOR_MODES:
+        raise ValueError(f"Unknown color mode '{color_mode}', expected {COLOR_MODES}")
+    if color_mode == "rgb" or image.shape[2] == 1:
+        return image
+    gray = np.rint(image[:, :, :3] @ LUMA)
+    return np.ascontiguousarray(gray[:, :, None], dtype=np.uint8)
+
+
+def load_image(path: str) -> np.ndarray:
+    """
+    Decode, convert and crop an image from disk.
+
+    Args:
+        path (str): Path of the source image.
+
+    Returns:
+        np.ndarray: Preprocessed (H, W, 3) uint8 array.
+    """
+    from PIL import Image
+
+    with Image.open(path) as image:
+        return prepare_image(np.asarray(image.convert("RGB")))
+
+
+class SharedImage:
+    """
+    A preprocessed image stored in `multiprocessing.shared_memory`.
+
+    The creating process owns the block and must `unlink()` it once every
+    worker is done. Workers receive `handle` (a small picklable tuple) and
+    `attach()` to it, getting a read-only view without copying the pixels.
+    The view is only valid while the `SharedImage` is referenced: dropping it
+    closes the mapping under the array.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape, dtype, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        self.array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        self.array.flags.writeable = False
+
+    @classmethod
+    def create(cls, image: np.ndarray) -> "SharedImage":
+        """
+        Copy an array into a new shared memory block
+        """
+        shm = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+        view = np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)
+        view[...] = image
+        logger.debug(f"Shared image created: {shm.name}, {image.shape}")
+        return cls(shm, image.shape, image.dtype, owner=True)
+
+    @classmethod
+    def attach(cls, handle: tuple[str, tuple[int, ...], str]) -> "SharedImage":
+        """
+        Attach to a shared image created by another process
+        """
+        name, shape, dtype = handle
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # NOTE: python < 3.13 registers attached blocks with the resource
+            # tracker, which would unlink them when the worker exits; forked
+            # workers share the owner's tracker, so unregistering afterwards
+            # would drop the owner's entry instead
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        return cls(shm, tuple(shape), dtype, owner=False)
+
+    @property
+    def handle(self) -> tuple[str, tuple[int, ...], str]:
+        """Picklable description used by workers to attach"""
+        return (self._shm.name, self.array.shape, self.array.dtype.str)
+
+    def close(self) -> None:
+        """
+        Release this process' mapping; the owner also frees the block
+        """
+        self.array = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ImageCache:
+    """
+    Cache of preprocessed source images.
+
+    Every image is decoded, cropped and converted once. With a `cache_dir` the
+    result is written as a `.npy` file and handed out memory-mapped, so every
+    process using the same directory shares the page cache instead of holding
+    its own copy.
+    """
+
+    def __init__(self, cache_dir: str | None = None):
+        self.cache_dir = cache_dir
+        self._images: dict[str, np.ndarray] = {}
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _npy_path(self, path: str) -> str:
+        stat = os.stat(path)
+        key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}.npy")
+
+    def get(self, path: str) -> np.ndarray:
+        """
+        Get the preprocessed (read-only) image for a path
+        """
+        if path in self._images:
+            return self._images[path]
+
+        if self.cache_dir is None:
+            image = load_image(path)
+            image.flags.writeable = False
+        else:
+            npy_path = self._npy_path(path)
+            if not os.path.exists(npy_path):
+                logger.info(f"Caching '{path}' to '{npy_path}'")
+                # write then rename so concurrent workers never see a partial file
+                tmp_path = f"{npy_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as file:
+                    np.save(file, load_image(path))
+                os.replace(tmp_path, npy_path)
+            image = np.load(npy_path, mmap_mode="r")
+
+        self._images[path] = image
+        return image
+
+    def share(self, path: str) -> SharedImage:
+        """
+        Put the preprocessed image for a path into shared memory
+        """
+        return SharedImage.create(self.get(path))
@@ -35,20 +35,34 @@ def setup_logger(
 
 
 def mk_folder_path(
-    folder_name, *, sub_fldr_name: str = "-".join(time.ctime().split()[1:4])
+    folder_name, *, sub_fldr_name: str | None = None, unique: bool = False
 ) -> str:
     """
     Check to see if the folder exists, if not, make the folder.
+    The sub folder defaults to the current time (not the import time).
+    With unique, an existing folder is never reused: a numbered suffix is
+    added instead, so runs started in the same second don't collide.
     @return str The abs. path to the folder
     """
+    if sub_fldr_name is None:
+        sub_fldr_name = "-".join(time.ctime().split()[1:4]).replace(":", ".")
 
     script_loc = os.path.dirname(os.path.abspath(sys.argv[0]))
     folder_path = os.path.join(script_loc, f"{folder_name}", sub_fldr_name)
 
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
+    if not unique:
+        os.makedirs(folder_path, exist_ok=True)
+        return folder_path
 
-    return folder_path
+    os.makedirs(os.path.dirname(folder_path), exist_ok=True)
+    candidate, suffix = folder_path, 1
+    while True:
+        try:
+            os.mkdir(candidate)
+            return candidate
+        except FileExistsError:
+            suffix += 1
+            candidate = f"{folder_path}-{suffix}"
 
 
 if __name__ == "__main__":
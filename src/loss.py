@@ -1,6 +1,4 @@
-from numpy import ndarray, absolute, count_nonzero, zeros, ones, sum
-import matplotlib.pyplot as plt
-import matplotlib.image as img
+from numpy import ndarray, absolute, count_nonzero, zeros, ones, sum, int16, int64
 
 
 def image_diff(image1: ndarray, image2: ndarray) -> float:
@@ -16,6 +14,15 @@ def image_diff(image1: ndarray, image2: ndarray) -> float:
     return percentage
 
 
+def _signed(image: ndarray) -> ndarray:
+    """
+    Widen unsigned integer images to a signed type that holds their differences
+    """
+    if image.dtype.kind != "u":
+        return image
+    return image.astype(int16 if image.itemsize == 1 else int64)
+
+
 def sad(image1: ndarray, image2: ndarray):
     """
     Sum of all absolute pixel differences into one value, as defined in the paper
@@ -32,9 +39,22 @@ def sad(image1: ndarray, image2: ndarray):
                for pos in range(len(img1))]
     """
 
-    diff = absolute(image1 - image2)
+    # NOTE: unsigned images (uint8 renders) would wrap around on subtraction
+    diff = absolute(_signed(image1) - _signed(image2))
+
+    return sum(diff, dtype=int64) if diff.dtype.kind == "i" else sum(diff)
 
-    return sum(diff)
+
+def percent_of(loss: float, blank_loss: float) -> float:
+    """
+    Complete percentage of a loss, given the loss of a blank canvas.
+
+    A black target has a blank loss of 0: the blank canvas is then already
+    complete, and any other rendering is 0% complete.
+    """
+    if blank_loss == 0:
+        return 100.0 if loss == 0 else 0.0
+    return (blank_loss - loss) / blank_loss * 100
 
 
 def complete_percent(base_image: ndarray, comp_image: ndarray, l_func=sad) -> float:
@@ -62,6 +82,8 @@ def complete_percent(base_image: ndarray, comp_image: ndarray, l_func=sad) -> fl
 
 
 if __name__ == "__main__":
+    import matplotlib.image as img
+
     # test case of comparing two images
     one = img.imread("../img/1.png")
     diamond = img.imread("../img/diamond.png")
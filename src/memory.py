@@ -0,0 +1,237 @@
+import logging
+import os
+import pickle
+import re
+import sys
+import tempfile
+from typing import Iterator
+
+import numpy as np
+
+from src.custom_types import Canvas
+from src.metrics import rss_bytes
+from src.render import MASKS
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+SPILL_CHUNK = 1000  # keyframes gathered before a spilled trajectory writes them out
+MASK_CACHE_FLOOR = 4 * 2**20  # the mask cache is not shrunk below this
+
+
+def parse_size(value: str) -> int:
+    """
+    Parse a memory size given in bytes or with a K/M/G/T suffix ('512M',
+    '8G', '1.5GB')
+    """
+    match = re.fullmatch(
+        r"\s*(\d+\.?\d*|\.\d+)\s*(?:([KMGT])i?)?B?\s*", str(value), re.IGNORECASE
+    )
+    if match is None:
+        raise ValueError(f"Invalid memory size '{value}'")
+    return int(float(match.group(1)) * UNITS[(match.group(2) or "").upper()])
+
+
+def deep_sizeof(obj, seen: set | None = None) -> int:
+    """
+    Approximate bytes held by an object and everything it references
+    (arrays count their buffer, shared objects are counted once)
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        # NOTE: views count their base, e.g. a slice of the source image
+        size = sys.getsizeof(obj) - (obj.nbytes if obj.base is None else 0)
+        return size + (obj.nbytes if obj.base is None else deep_sizeof(obj.base, seen))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        return size + sum(
+            deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+class GenerationStore:
+    """
+    The canvases saved at every polygon addition (`Simulation.generations`).
+
+    Behaves like the list it replaces. Once `spill` is called, every canvas
+    but the last one (the only one the optimizer reads) is pickled to a
+    temporary directory and read back on access, so the memory held no longer
+    grows with the number of polygons.
+    """
+
+    def __init__(self, canvases: list[Canvas] | None = None):
+        self._canvases: list[Canvas | None] = list(canvases or [])
+        self._dir: tempfile.TemporaryDirectory | None = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._dir is not None
+
+    def _path(self, index: int) -> str:
+        return os.path.join(self._dir.name, f"{index}.pkl")
+
+    def _evict(self, index: int) -> None:
+        if self._canvases[index] is None:
+            return
+        with open(self._path(index), "wb") as file:
+            pickle.dump(self._canvases[index], file, pickle.HIGHEST_PROTOCOL)
+        self._canvases[index] = None
+
+    def spill(self, directory: str | None = None) -> None:
+        """
+        Move every canvas but the last one to disk, now and from now on
+        """
+        if self._dir is None:
+            # NOTE: removed with the store, the spilled canvases are only
+            # needed as long as the simulation is
+            self._dir = tempfile.TemporaryDirectory(prefix="generations-", dir=directory)
+        for index in range(len(self._canvases) - 1):
+            self._evict(index)
+        logger.info(f"Generations spilled to '{self._dir.name}'")
+
+    def append(self, canvas: Canvas) -> None:
+        self._canvases.append(canvas)
+        if self.spilled and len(self._canvases) > 1:
+            self._evict(len(self._canvases) - 2)
+
+    def __setitem__(self, index: int, canvas: Canvas) -> None:
+        index = range(len(self))[index]
+        self._canvases[index] = canvas
+        if self.spilled and index < len(self._canvases) - 1:
+            self._evict(index)
+
+    def __getitem__(self, index: int) -> Canvas:
+        canvas = self._canvases[index]
+        if canvas is None:
+            with open(self._path(range(len(self))[index]), "rb") as file:
+                canvas = pickle.load(file)
+        return canvas
+
+    def __len__(self) -> int:
+        return len(self._canvases)
+
+    def __iter__(self) -> Iterator[Canvas]:
+        return (self[i] for i in range(len(self)))
+
+    def nbytes(self) -> int:
+        """
+        Approximate bytes held in memory
+        """
+        return deep_sizeof(self._canvases)
+
+
+def account(simulation) -> dict[str, int]:
+    """
+    Attribute the memory of a simulation to its parts (approximate bytes),
+    next to the RSS of the whole process
+    """
+    return {
+        "rss": rss_bytes(),
+        "base_image": simulation.base_image.nbytes,
+        "canvas": deep_sizeof(simulation.canvas),
+        "generations": simulation.generations.nbytes(),
+        "trajectory": simulation.trajectory.nbytes(),
+        # NOTE: process wide, shared by every simulation of the process
+        "mask_cache": MASKS.nbytes,
+    }
+
+
+def describe(simulation) -> str:
+    """
+    One line memory attribution of a simulation, for the run summary
+    """
+    parts = account(simulation)
+    spilled = [
+        name
+        for name in ("generations", "trajectory")
+        if getattr(simulation, name).spilled
+    ]
+    return ", ".join(f"{name} {format_bytes(size)}" for name, size in parts.items()) + (
+        f" (spilled: {', '.join(spilled)})" if spilled else ""
+    )
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class MemoryBudget:
+    """
+    Keeps a simulation under a memory budget (RSS in bytes).
+
+    Every `interval` iterations the RSS is sampled. Past `soft` of the budget
+    the simulation degrades instead of growing: first the mask cache is cut
+    to a quarter (down to `MASK_CACHE_FLOOR`), then the generations, then the
+    trajectory keyframes are spilled to disk. If the RSS still exceeds
+    the whole budget, `check` returns a stop reason so the run ends cleanly
+    (and writes its results) instead of being OOM-killed.
+    """
+
+    def __init__(
+        self,
+        budget: int,
+        interval: int = 100,
+        soft: float = 0.8,
+        spill_dir: str | None = None,
+    ):
+        self.budget = budget
+        self.interval = interval
+        self.soft = soft
+        self.spill_dir = spill_dir
+        self.peak = 0
+        self._next = 0
+
+    def check(self, simulation, t: int) -> str | None:
+        """
+        Sample the RSS after `t` iterations, degrade if needed; returns a
+        stop reason once the budget is exceeded
+        """
+        if t < self._next:
+            return None
+        self._next = t + self.interval
+        rss = rss_bytes()
+        self.peak = max(self.peak, rss)
+        if rss < self.soft * self.budget:
+            return None
+
+        if MASKS.max_bytes > MASK_CACHE_FLOOR:
+            cap = max(min(MASKS.max_bytes, MASKS.nbytes) // 4, MASK_CACHE_FLOOR)
+            logger.warning(
+                f"RSS {format_bytes(rss)} near the memory budget, shrinking the "
+                f"mask cache to {format_bytes(cap)}"
+            )
+            MASKS.resize(cap)
+        elif not simulation.generations.spilled:
+            logger.warning(
+                f"RSS {format_bytes(rss)} near the memory budget, spilling generations"
+            )
+            simulation.generations.spill(self.spill_dir)
+        elif not simulation.trajectory.spilled:
+            logger.warning(
+                f"RSS {format_bytes(rss)} near the memory budget, spilling trajectory"
+            )
+            simulation.trajectory.spill(self.spill_dir)
+        elif len(simulation.trajectory.genomes) >= SPILL_CHUNK:
+            # NOTE: keyframes keep coming, move them out as they pile up
+            simulation.trajectory.spill(self.spill_dir)
+
+        if rss > self.budget:
+            rss = rss_bytes()
+            if rss > self.budget:
+                return f"memory budget ({format_bytes(self.budget)}) exceeded"
+        return None
@@ -0,0 +1,168 @@
+import logging
+import os
+import resource
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from src.loss import percent_of
+from src.render import MASKS
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+PREFIX = "prohc"
+# name, help, type of every published metric
+METRICS = (
+    ("iteration", "Completed iterations (loss evaluations)", "counter"),
+    ("iterations_per_second", "Iterations per second since the last update", "gauge"),
+    ("elapsed_seconds", "Wall time since the start of the run", "gauge"),
+    ("loss", "SAD of the current solution", "gauge"),
+    ("complete_percent", "Complete percentage of the current solution", "gauge"),
+    ("polygons", "Polygons on the canvas", "gauge"),
+    ("culled_polygons", "Polygons removed by pruning", "counter"),
+    ("stagnation_counter", "Iterations without improvement", "gauge"),
+    ("accept_rate", "Fraction of accepted mutations", "gauge"),
+    ("rss_bytes", "Resident set size of the process", "gauge"),
+    ("mask_cache_hits", "Coverage masks found in the renderer's cache", "counter"),
+    ("mask_cache_misses", "Coverage masks rasterized", "counter"),
+    ("mask_cache_bytes", "Memory held by the renderer's mask cache", "gauge"),
+)
+
+
+def rss_bytes() -> int:
+    """
+    Current resident set size, or the peak one where /proc is missing
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # NOTE: ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def summary(simulation) -> str:
+    """
+    One line summary of a finished run
+    """
+    elapsed = simulation.stopping.elapsed
+    scheduler = simulation.scheduler
+    trials = int(np.sum(scheduler.trials))
+    accepted = int(np.sum(scheduler.accepted))
+    blank_loss = float(np.sum(simulation.base_image))
+    loss = float(simulation.loss)
+    return (
+        f"{simulation.iterations} iterations in {elapsed:.1f}s "
+        f"({simulation.iterations / elapsed if elapsed else 0:.1f} it/s), "
+        f"loss {loss:.0f} ({percent_of(loss, blank_loss):.2f}%), "
+        f"{simulation.canvas.how_many()} polygons ({simulation.culled} culled), "
+        f"accept rate {accepted / trials if trials else 0:.3f}, "
+        f"mask cache hit rate {MASKS.hit_rate:.3f}, "
+        f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
+    )
+
+
+class MetricsPublisher:
+    """
+    Publishes live metrics of a simulation, at most every `interval` seconds.
+
+    Metrics are written as a Prometheus textfile (rewritten atomically, for
+    the node exporter's textfile collector) and/or served over HTTP at
+    `http://127.0.0.1:<port>/metrics`.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        port: int | None = None,
+        interval: float = 5.0,
+        run: str | None = None,
+    ):
+        self.path = path
+        self.interval = interval
+        self.labels = f'{{run="{run}"}}' if run else ""
+        self.values: dict[str, float] = {}
+        self._text = ""
+        self._last_time: float | None = None
+        self._last_t = 0
+        self._server = None
+        if port is not None:
+            self._serve(port)
+
+    def _serve(self, port: int) -> None:
+        publisher = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = publisher._text.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logger.info(f"Serving metrics on port {self._server.server_address[1]}")
+
+    def update(self, simulation, t: int, loss: float, force: bool = False) -> None:
+        """
+        Collect and publish the metrics, if `interval` seconds have passed
+        """
+        now = time.perf_counter()
+        if self._last_time is None:
+            self._last_time = now
+        if not force and now - self._last_time < self.interval:
+            return
+
+        scheduler = simulation.scheduler
+        trials = int(np.sum(scheduler.trials))
+        blank_loss = float(np.sum(simulation.base_image))
+        window = now - self._last_time
+        self.values = {
+            "iteration": t,
+            "iterations_per_second": (t - self._last_t) / window if window else 0.0,
+            "elapsed_seconds": simulation.stopping.elapsed,
+            "loss": float(loss),
+            "complete_percent": percent_of(float(loss), blank_loss),
+            "polygons": simulation.canvas.how_many(),
+            "culled_polygons": simulation.culled,
+            "stagnation_counter": simulation.counter,
+            "accept_rate": int(np.sum(scheduler.accepted)) / trials if trials else 0.0,
+            "rss_bytes": rss_bytes(),
+            "mask_cache_hits": MASKS.hits,
+            "mask_cache_misses": MASKS.misses,
+            "mask_cache_bytes": MASKS.nbytes,
+        }
+        self._last_time, self._last_t = now, t
+        self._text = self.render()
+        if self.path is not None:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as file:
+                file.write(self._text)
+            os.replace(tmp_path, self.path)
+
+    def render(self) -> str:
+        """
+        Metrics in the Prometheus text exposition format
+        """
+        lines = []
+        for name, help_text, kind in METRICS:
+            if name not in self.values:
+                continue
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            lines.append(f"{PREFIX}_{name}{self.labels} {self.values[name]}")
+        return "\n".join(lines) + "\n"
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,85 @@
+import logging
+
+from src.custom_types import Canvas
+from src.genome import canvas_to_genome
+from src.genome_io import save_genome
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+
+class FolderOutput:
+    """
+    Writes the frames and results of a simulation run to a folder.
+
+    Any object with the same `frame` / `progress` / `save_image` / `results`
+    methods can be given to `Simulation(output=...)` instead, e.g. to push
+    results to a service; with no output at all a run has no filesystem side
+    effects.
+    """
+
+    def __init__(self, folder_path: str, num_evals: int = 50000):
+        self.folder_path = folder_path
+        # frame names are zero padded to the width of the last iteration
+        self.digits = len(str(num_evals))
+
+    def frame(self, t: int, canvas: Canvas) -> None:
+        """
+        Save the frame of iteration t
+        """
+        self.save_image(t, canvas)
+
+    def progress(self, simulation, t: int, loss: float) -> None:
+        """
+        Called every `stats_interval` iterations, nothing to do for a folder
+        """
+
+    def save_image(self, t: int | str, canvas: Canvas) -> None:
+        """
+        Render a canvas with matplotlib and save it as '<t>.png'
+        """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.collections import PatchCollection
+
+        # NOTE: this is for debugging purposes
+        fig = Figure(figsize=(canvas.width / 100, canvas.height / 100), dpi=100)
+        canvas_agg = FigureCanvasAgg(fig)
+
+        # NOTE: the axes fill the whole figure so data coords map 1:1 to pixels
+        ax = fig.add_axes((0, 0, 1, 1))
+        ax.axis("off")
+        ax.set_xlim(0, canvas.width)
+        ax.set_ylim(0, canvas.height)
+        ax.add_collection(
+            PatchCollection(
+                [polygon.to_patch() for polygon in canvas.sequence],
+                match_original=True,
+            )
+        )
+        canvas_agg.draw()
+        path = f"{self.folder_path}/{str(t).zfill(self.digits)}.png"
+        logger.info(f"Writing image to disc, '{path}'")
+        canvas_agg.print_figure(path)
+
+    def results(self, simulation, include_generations: bool = False) -> None:
+        """
+        Save the final image, genome (binary and SVG) and trajectory of a
+        simulation; if generations is made true, save all the saved generations
+        up to the final result
+        """
+        self.save_image("output", simulation.canvas)
+        genome = canvas_to_genome(simulation.canvas, simulation.n_vertices)
+        for name in ("genome.bin", "output.svg"):
+            save_genome(
+                f"{self.folder_path}/{name}",
+                genome,
+                simulation.width,
+                simulation.height,
+            )
+        simulation.trajectory.save(f"{self.folder_path}/trajectory.npz")
+        # visualize_canvas(self.canvas)
+        logger.debug(f"Include generations: {include_generations}")
+        if include_generations:
+            for num, generation in enumerate(simulation.generations):
+                self.save_image(f"generation_{num}", generation)
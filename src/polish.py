@@ -0,0 +1,129 @@
+import logging
+from typing import Iterable
+
+import numpy as np
+
+from src.render import BACKGROUND, MASKS
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+
+def weighted_median(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Per column weighted median of a (pixels, channels) array
+    """
+    order = np.argsort(values, axis=0)
+    sorted_values = np.take_along_axis(values, order, axis=0)
+    cumulative = np.cumsum(weights[order], axis=0)
+    half = cumulative[-1] / 2
+    index = np.argmax(cumulative >= half, axis=0)
+    return sorted_values[index, np.arange(values.shape[1])]
+
+
+def effect_above(
+    genome: np.ndarray,
+    masks: list,
+    ys: np.ndarray,
+    xs: np.ndarray,
+    channels: int = 3,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Affine effect of compositing polygons over the pixels (ys, xs): every
+    pixel value p ends up as `k * p + b`.
+
+    Args:
+        genome (np.ndarray): Genome rows of the polygons, back to front.
+        masks (list): Their `polygon_mask` results.
+        ys (np.ndarray): Rows of the pixels.
+        xs (np.ndarray): Columns of the pixels.
+        channels (int): 3 for RGB, 1 for gray genomes. Defaults to 3.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (pixels,) k and (pixels, channels) b.
+    """
+    k = np.ones(len(ys), dtype=np.float32)
+    b = np.zeros((len(ys), channels), dtype=np.float32)
+    if not len(ys):
+        return k, b
+    y_min, y_max, x_min, x_max = ys.min(), ys.max(), xs.min(), xs.max()
+    for gene, covered in zip(genome, masks):
+        if covered is None or gene[-1] <= 0:
+            continue
+        r0, c0, mask = covered
+        r1, c1 = r0 + mask.shape[0], c0 + mask.shape[1]
+        if r0 > y_max or r1 <= y_min or c0 > x_max or c1 <= x_min:
+            continue
+        inside = (ys >= r0) & (ys < r1) & (xs >= c0) & (xs < c1)
+        inside[inside] = mask[ys[inside] - r0, xs[inside] - c0]
+        if not inside.any():
+            continue
+        k[inside] *= 1 - gene[-1]
+        b[inside] += gene[-1] * (gene[-4 : -4 + channels] - b[inside])
+    return k, b
+
+
+def optimal_colors(
+    genome: np.ndarray, target: np.ndarray, rows: Iterable[int] | None = None
+) -> np.ndarray:
+    """
+    Set the RGB of every polygon to the SAD optimal fill for its alpha.
+
+    The renderer composites with "over" blending, so a pixel covered by
+    polygon i ends up as `k * ((1 - a) * below + a * c) + b`: `below` is the
+    composite of the polygons under it, `k` and `b` the (per pixel) affine
+    effect of the polygons above it. The SAD over the polygon's pixels is then
+    a weighted sum of `|z - c|` with `z = (target - b - k (1 - a) below) /
+    (k a)` and weights `k a`, which is minimized by the weighted median of `z`
+    (clipped to [0, 1]), one channel at a time.
+
+    Polygons are visited back to front and each one uses the already updated
+    colors beneath it; alphas, vertices and order are left as they are. With
+    a single channel (gray) target the gray value is fit and written to all
+    three color columns.
+
+    Args:
+        genome (np.ndarray): (n, 2 * n_vertices + 4) genome array.
+        target (np.ndarray): (H, W, 3) or (H, W, 1) uint8 target image.
+        rows (Iterable[int] | None): Polygons to recolor, the others keep
+          their color. Defaults to every polygon.
+
+    Returns:
+        np.ndarray: Copy of the genome with updated colors.
+    """
+    height, width = target.shape[:2]
+    out_size = (width, height)
+    genome = genome.astype(np.float32, copy=True)
+    target = target[:, :, :3].astype(np.float32) / 255
+    channels = target.shape[2]
+
+    rows = set(range(len(genome)) if rows is None else rows)
+    masks = [MASKS.mask(gene, (1.0, 1.0), out_size) for gene in genome]
+    below = np.full((height, width, channels), BACKGROUND, dtype=np.float32)
+
+    for i, gene in enumerate(genome):
+        alpha = float(gene[-1])
+        if masks[i] is None or alpha <= 0:
+            continue
+        r0, c0, mask = masks[i]
+
+        if i in rows:
+            ys, xs = np.nonzero(mask)
+            ys += r0
+            xs += c0
+            k, b = effect_above(genome[i + 1 :], masks[i + 1 :], ys, xs, channels)
+            weights = k * alpha
+            visible = weights > 0
+            if visible.any():
+                ys, xs, k, b, weights = (v[visible] for v in (ys, xs, k, b, weights))
+                under = below[ys, xs]
+                seen = target[ys, xs] - b - (k * (1 - alpha))[:, None] * under
+                z = seen / weights[:, None]
+                # NOTE: a gray value is broadcast to the three color columns
+                gene[-4:-1] = np.clip(weighted_median(z, weights), 0, 1)
+
+        # composite the polygon with its new color for the ones above it
+        region = below[r0 : r0 + mask.shape[0], c0 : c0 + mask.shape[1]]
+        region[mask] += alpha * (gene[-4 : -4 + channels] - region[mask])
+
+    return genome
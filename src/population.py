@@ -0,0 +1,260 @@
+import logging
+import time
+
+import numpy as np
+
+from src.custom_types import Canvas
+from src.genome import canvas_to_genome, genome_to_canvas, n_vertices
+from src.render import render_sad_batch
+from src.scheduler import OPERATORS
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+
+def change_value(value: float, bound: float, step: float) -> float:
+    """
+    The paper's value mutation: a scaled increment (reflected at the bounds)
+    or a new random value in [0, bound], with equal probability
+    """
+    if np.random.randint(low=0, high=2):
+        increment = np.random.uniform(-step, step) * bound
+        if not 0 <= value + increment <= bound:
+            increment = -increment
+        return value + increment
+    return np.random.uniform(0, bound)
+
+
+def mutate_genome(
+    genome: np.ndarray,
+    row: int,
+    operator: int,
+    bounds: tuple[int, int],
+    step: float,
+    color_mode: str = "rgb",
+) -> np.ndarray:
+    """
+    Copy of a genome with one row mutated, the array counterpart of
+    `polygon_mutate`.
+
+    Args:
+        genome (np.ndarray): (n, 2 * n_vertices + 4) genome array.
+        row (int): Row (polygon) to mutate.
+        operator (int): Index into `OPERATORS`: vertex, color or swap.
+        bounds (tuple[int, int]): Size of the canvas in (x, y).
+        step (float): Largest scaled increment, relative to the value range.
+        color_mode (str): "rgb", or "gray" to mutate the gray value (all three
+          color columns) or the alpha. Defaults to "rgb".
+
+    Returns:
+        np.ndarray: Mutated copy of the genome.
+    """
+    child = genome.copy()
+    n = n_vertices(genome)
+    if OPERATORS[operator] == "vertex":
+        col = np.random.randint(low=0, high=2 * n)
+        bound = bounds[0] if col < n else bounds[1]
+        child[row, col] = change_value(child[row, col], bound, step)
+    elif OPERATORS[operator] == "color" and color_mode == "gray":
+        # NOTE: the gray value lives in all three color columns
+        if np.random.randint(low=0, high=2):
+            child[row, -1] = change_value(child[row, -1], 1.0, step)
+        else:
+            child[row, 2 * n : 2 * n + 3] = change_value(child[row, 2 * n], 1.0, step)
+    elif OPERATORS[operator] == "color":
+        col = 2 * n + np.random.randint(low=0, high=4)
+        child[row, col] = change_value(child[row, col], 1.0, step)
+    else:
+        other = np.random.randint(low=0, high=len(child))
+        child[[row, other]] = child[[other, row]]
+    return child
+
+
+class PopulationEngine:
+    """
+    (mu + lambda) evolution strategy over genome arrays, an alternative to the
+    (1+1) hill climber of `Simulation._run_loop`.
+
+    Every generation `offspring` children are mutated from random parents
+    with the paper's operators and scored as one batch (spread over the
+    thread pool with the numpy renderer); the best `parents` of parents and
+    children survive. Losses of the survivors are kept, so unlike the hill
+    climber no evaluation is spent re-scoring a parent.
+
+    Polygons are added progressively like in the hill climber: once the best
+    loss stagnates for `stagnation_limit` evaluations, a new energy map polygon
+    is added to the best genome if it improved on the loss of the last
+    addition, otherwise the newest polygon is re-initialized from the energy
+    map of the polygons below it.
+    """
+
+    def __init__(self, simulation, parents: int = 4, offspring: int = 16):
+        self.simulation = simulation
+        self.parents = parents
+        self.offspring = offspring
+
+    def canvas(self, genome: np.ndarray) -> Canvas:
+        sim = self.simulation
+        canvas = genome_to_canvas(genome, sim.width, sim.height)
+        canvas.renderer = sim.renderer
+        canvas.threads = sim.threads
+        return canvas
+
+    def score(self, genomes: list[np.ndarray]) -> list[float]:
+        """
+        Loss of every genome of a batch
+        """
+        sim = self.simulation
+        if sim.renderer == "numpy":
+            losses = render_sad_batch(genomes, sim.base_image, sim.threads)
+        elif sim.renderer == "numba":
+            from src import render_jit
+
+            # NOTE: the kernel already spreads each genome's rows over threads
+            losses = [
+                render_jit.render_sad(genome, sim.base_image, sim.threads)
+                for genome in genomes
+            ]
+        else:
+            # NOTE: matplotlib holds the GIL, agg batches are scored serially
+            losses = [sim.eval_loss(self.canvas(genome)) for genome in genomes]
+        return [float(loss) for loss in losses]
+
+    def insert(self, genome: np.ndarray) -> np.ndarray:
+        """
+        Genome plus a new polygon placed with the simulation's energy map
+        """
+        sim = self.simulation
+        # NOTE: the energy map is computed from the simulation's canvas
+        sim.canvas = self.canvas(genome)
+        sim.canvas = sim.create_polygon(sim.canvas)
+        return canvas_to_genome(sim.canvas, sim.n_vertices)
+
+    def run(self, t: int, v_k: float, blank_loss: float) -> None:
+        """
+        Evolve the simulation's canvas until a stopping criterion is met, see
+        `Simulation.run`
+        """
+        sim = self.simulation
+        bounds = (sim.width, sim.height)
+        population = [(float(v_k), canvas_to_genome(sim.canvas, sim.n_vertices))]
+        counter = 0
+        next_stats = sim.stats_interval
+
+        while True:
+            best_loss = population[0][0]
+            children, trials = [], []
+            for _ in range(self.offspring):
+                parent = np.random.randint(low=0, high=len(population))
+                operator = sim.scheduler.choose()
+                rows = len(population[parent][1])
+                row = np.random.choice(rows, p=sim.probabilities)
+                children.append(
+                    mutate_genome(
+                        population[parent][1],
+                        row,
+                        operator,
+                        bounds,
+                        sim.scheduler.step(operator),
+                        sim.color_mode,
+                    )
+                )
+                trials.append((parent, operator))
+
+            start = time.perf_counter()
+            losses = self.score(children)
+            elapsed = (time.perf_counter() - start) / len(children)
+            for (parent, operator), loss in zip(trials, losses):
+                parent_loss = population[parent][0]
+                sim.scheduler.report(
+                    operator, loss < parent_loss, parent_loss - loss, elapsed
+                )
+            t += len(children)
+
+            # NOTE: the sort is stable, parents win ties like in the hill climber
+            population = sorted(
+                population + list(zip(losses, children)), key=lambda p: p[0]
+            )[: self.parents]
+            interval = sim.polish_interval
+            if interval and t // interval > (t - len(children)) // interval:
+                canvas, polished_loss = sim.polish_colors(
+                    self.canvas(population[0][1]), population[0][0]
+                )
+                population[0] = (
+                    polished_loss,
+                    canvas_to_genome(canvas, sim.n_vertices),
+                )
+            interval = sim.prune_interval
+            if interval and t // interval > (t - len(children)) // interval:
+                canvas, pruned_loss = sim.prune(
+                    self.canvas(population[0][1]), population[0][0]
+                )
+                if canvas.how_many() < len(population[0][1]):
+                    # NOTE: parents have to match the rows of the probabilities
+                    population = [
+                        (pruned_loss, canvas_to_genome(canvas, sim.n_vertices))
+                    ]
+            loss, best = population[0]
+            logger.debug(f"time:{t}, Polygons: {len(best)}, best loss {loss}")
+
+            if loss < best_loss:
+                counter = 0
+                sim.canvas = self.canvas(best)
+                sim.save_frame(t)
+            else:
+                counter += len(children)
+            sim.trajectory.record(t, best)
+            sim.counter = counter
+            if sim.metrics is not None:
+                sim.metrics.update(sim, t, loss)
+
+            if t >= next_stats:
+                next_stats += sim.stats_interval
+                logger.info(
+                    f"time:{t}, Polygons: {len(best)}, loss {loss}, "
+                    f"baseline loss {v_k}"
+                )
+                logger.info(f"Operator stats: {sim.scheduler.summary()}")
+                if sim.output is not None:
+                    sim.output.progress(sim, t, loss)
+
+            if counter > sim.stagnation_limit and len(best) < sim.max_polygons:
+                logger.info("Stagnation counter over threshold")
+                if loss < v_k:
+                    logger.warning("Best solution improves on baseline, adding polygon")
+                    sim.generations.append(self.canvas(best))
+                    genome = self.insert(best)
+                    v_k = loss
+                    population = [(self.score([genome])[0], genome)]
+                    t += 1
+                else:
+                    logger.info("Best solution does not improve, reinit. polygon")
+                    genome = self.insert(best[:-1])
+                    # NOTE: same rows, the survivors stay and the reinit child
+                    # joins them until the next selection (survivors win ties)
+                    population = sorted(
+                        population + [(self.score([genome])[0], genome)],
+                        key=lambda p: p[0],
+                    )
+                    t += 1
+                counter = 0
+            elif counter > sim.stagnation_limit:
+                # NOTE: all polygons placed, optimize them all uniformly
+                sim.norm_opti_probs()
+
+            if sim._stop_signal is not None:
+                sim.stop_reason = f"signal {sim._stop_signal}"
+            else:
+                sim.stop_reason = sim.stopping.check(
+                    t,
+                    population[0][0],
+                    blank_loss,
+                    optimizing=len(population[0][1]) == sim.max_polygons,
+                )
+            if sim.stop_reason is None and sim.memory is not None:
+                sim.stop_reason = sim.memory.check(sim, t)
+            if sim.stop_reason is not None:
+                sim.canvas = self.canvas(population[0][1])
+                sim.iterations = t
+                sim.loss = population[0][0]
+                return
@@ -0,0 +1,79 @@
+import logging
+
+import numpy as np
+
+from src.render import MASKS
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+# NOTE: below half a level of the 8 bit output a change can't survive rounding
+THRESHOLD = 0.5 / 255
+
+
+def visibility(
+    genome: np.ndarray, width: int, height: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    How much of every polygon can reach the rendering.
+
+    Polygons are visited front to back with a transmittance map (the fraction
+    of a pixel still visible through the polygons above it): a polygon can
+    change a pixel by at most `alpha * transmittance` of the value range.
+
+    Args:
+        genome (np.ndarray): (n, 2 * n_vertices + 4) genome array.
+        width (int): Width of the canvas.
+        height (int): Height of the canvas.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (n,) largest visible weight of every
+          polygon over the pixels it covers, and (n,) whether it covers any
+          pixel center at all.
+    """
+    transmittance = np.ones((height, width), dtype=np.float32)
+    visible = np.zeros(len(genome), dtype=np.float32)
+    covers = np.zeros(len(genome), dtype=bool)
+    for i in range(len(genome) - 1, -1, -1):
+        covered = MASKS.mask(genome[i], (1.0, 1.0), (width, height))
+        if covered is None or not covered[2].any():
+            continue
+        r0, c0, mask = covered
+        covers[i] = True
+        region = transmittance[r0 : r0 + mask.shape[0], c0 : c0 + mask.shape[1]]
+        alpha = max(float(genome[i, -1]), 0.0)
+        visible[i] = alpha * float(region[mask].max())
+        region[mask] *= 1 - alpha
+    return visible, covers
+
+
+def negligible(
+    genome: np.ndarray, width: int, height: int, threshold: float = THRESHOLD
+) -> dict[str, list[int]]:
+    """
+    Polygons that (next to) do not contribute to the rendering, by cause:
+
+    - "degenerate": covers no pixel center (zero area, or off the canvas)
+    - "transparent": its alpha alone is under the threshold
+    - "occluded": the polygons above it let less than the threshold through
+
+    Args:
+        genome (np.ndarray): (n, 2 * n_vertices + 4) genome array.
+        width (int): Width of the canvas.
+        height (int): Height of the canvas.
+        threshold (float): Largest negligible change of a pixel, as a
+          fraction of the value range. Defaults to half an 8 bit level.
+
+    Returns:
+        dict[str, list[int]]: Rows of the negligible polygons, per cause.
+    """
+    visible, covers = visibility(genome, width, height)
+    culled = {"degenerate": [], "transparent": [], "occluded": []}
+    for i, gene in enumerate(genome):
+        if not covers[i]:
+            culled["degenerate"].append(i)
+        elif gene[-1] < threshold:
+            culled["transparent"].append(i)
+        elif visible[i] < threshold:
+            culled["occluded"].append(i)
+    return culled
@@ -1,5 +1,4 @@
 import numpy as np
-from matplotlib.patches import Polygon
 import logging
 import src.log_trace
 from src.custom_types import Canvas, Polygon, Vertices, RGBA
@@ -7,11 +6,28 @@ from copy import deepcopy, copy
 
 DIMS = (64, 64)
 N_VERTICES_TRI = 3
+MAX_STEP = 0.1  # NOTE: up to 10% change per increment, from the paper
 
 _logger = logging.getLogger("__main__")
 logger = _logger.getChild(__name__)
 
 
+def random_color(color_mode: str = "rgb") -> RGBA:
+    """
+    Uniformly random color of a new polygon; gray polygons get one value for
+    all three channels
+    """
+    if color_mode == "gray":
+        gray = np.random.rand()
+        return RGBA(gray, gray, gray, np.random.rand())
+    return RGBA(
+        np.random.rand(),
+        np.random.rand(),
+        np.random.rand(),
+        np.random.rand(),
+    )
+
+
 def polygon_init(
     id: int, n_vertices: int = N_VERTICES_TRI, bounds: tuple[int, int] = DIMS
 ) -> Polygon:
@@ -34,18 +50,19 @@ def polygon_init(
             np.random.rand(n_vertices, 1) * bounds[0],
             np.random.rand(n_vertices, 1) * bounds[1],
         ),
-        RGBA(
-            np.random.rand(),
-            np.random.rand(),
-            np.random.rand(),
-            np.random.rand(),
-        ),
+        random_color(),
         _id=id,
     )
     return polygon
 
 
-def polygon_mutate(canvas: Canvas, polygon: Polygon) -> Canvas:
+def polygon_mutate(
+    canvas: Canvas,
+    polygon: Polygon,
+    mode: int | None = None,
+    step: float = MAX_STEP,
+    color_mode: str = "rgb",
+) -> Canvas:
     """
     Mutate a Polygon object.
 
@@ -56,18 +73,28 @@ def polygon_mutate(canvas: Canvas, polygon: Polygon) -> Canvas:
 
     Args:
         polygon: Polygon object to mutate.
+        mode (int | None): Mutation mechanism to use (0, 1 or 2). Defaults to
+          a uniformly random choice.
+        step (float): Largest scaled increment, relative to the value range.
+          Defaults to 0.1.
+        color_mode (str): "rgb", or "gray" to keep the three color channels
+          equal. Defaults to "rgb".
 
     Returns:
         Canvas: Copy of the canvas object with the mutated polygon object.
     """
-    mode = np.random.randint(low=0, high=3)
+    if mode is None:
+        mode = np.random.randint(low=0, high=3)
     canvas_copy = deepcopy(canvas)
     polygon_copy = deepcopy(polygon)
     if mode == 0:
-        polygon_copy = mutate_vertex(polygon_copy)
+        # NOTE: vertices move within the whole canvas, not the 64x64 default
+        polygon_copy = mutate_vertex(
+            polygon_copy, bounds=(canvas.width, canvas.height), step=step
+        )
         canvas_copy.replace_polygon(polygon_copy)
     elif mode == 1:
-        polygon_copy = mutate_color(polygon_copy)
+        polygon_copy = mutate_color(polygon_copy, step=step, color_mode=color_mode)
         canvas_copy.replace_polygon(polygon_copy)
     else:
         # Mutate the sequence of polygons
@@ -82,7 +109,9 @@ def polygon_mutate(canvas: Canvas, polygon: Polygon) -> Canvas:
     return canvas_copy
 
 
-def mutate_vertex(polygon: Polygon, bounds: tuple[int, int] = DIMS) -> Polygon:
+def mutate_vertex(
+    polygon: Polygon, bounds: tuple[int, int] = DIMS, step: float = MAX_STEP
+) -> Polygon:
     """
     Mutate a vertex of a Polygon object.
 
@@ -96,6 +125,9 @@ def mutate_vertex(polygon: Polygon, bounds: tuple[int, int] = DIMS) -> Polygon:
 
     Args:
         polygon: Polygon object to mutate.
+        bounds (tuple[int, int]): Size of the canvas in (x, y). Defaults to
+          (64, 64).
+        step (float): Largest scaled increment as a fraction of the bound.
 
     Returns:
         Polygon: Mutated Polygon object.
@@ -105,7 +137,7 @@ def mutate_vertex(polygon: Polygon, bounds: tuple[int, int] = DIMS) -> Polygon:
         mode = np.random.randint(low=0, high=2)
         if mode:
             logger.debug("small increment")
-            increment = np.random.uniform(0, 0.1) * bound
+            increment = np.random.uniform(0, step) * bound
             if np.random.rand() < 0.5:
                 increment = -increment
             increment = check_bound(increment, value, bound)
@@ -167,7 +199,9 @@ def check_bound(
     return -increment
 
 
-def mutate_color(polygon: Polygon) -> Polygon:
+def mutate_color(
+    polygon: Polygon, step: float = MAX_STEP, color_mode: str = "rgb"
+) -> Polygon:
     """
     Mutate one of the RGBA values of a Polygon object.
 
@@ -185,8 +219,13 @@ def mutate_color(polygon: Polygon) -> Polygon:
         7. Mutation by a random scaled increment
         8. Mutation by a random number in bound
 
+    In "gray" color mode the gray value (all three channels at once) or the
+    alpha is mutated, with equal probability.
+
     Args:
         polygon: Polygon object to mutate.
+        step (float): Largest scaled increment of the color value.
+        color_mode (str): "rgb" or "gray". Defaults to "rgb".
 
     Returns:
         Polygon: Mutated Polygon object.
@@ -198,7 +237,7 @@ def mutate_color(polygon: Polygon) -> Polygon:
         if mode == 0:
             # Mutate by a scaled increment
             logger.debug("small increment")
-            increment = np.random.uniform(0, 0.1)
+            increment = np.random.uniform(0, step)
             if np.random.rand() < 0.5:
                 increment = -increment
             increment = check_bound(increment, value, 1)
@@ -211,7 +250,10 @@ def mutate_color(polygon: Polygon) -> Polygon:
 
     rgba = deepcopy(list(polygon.get_facecolor()))
     old_rgba = deepcopy(rgba)
-    color_idx = np.random.randint(low=0, high=4)
+    if color_mode == "gray":
+        color_idx = 3 * np.random.randint(low=0, high=2)
+    else:
+        color_idx = np.random.randint(low=0, high=4)
     rgba[color_idx] = change_value(rgba[color_idx])
     if color_idx == 3:
         # If alpha is mutated, we need to update the polygon color
@@ -219,7 +261,7 @@ def mutate_color(polygon: Polygon) -> Polygon:
         logger.debug(f"Color mutation (alpha): was {rgba[3]} now {alpha}")
         polygon.set_alpha(alpha)
     else:
-        rgb = tuple(rgba[:3])
+        rgb = (rgba[0],) * 3 if color_mode == "gray" else tuple(rgba[:3])
         logger.debug(
             f"Color mutation: was {list(polygon.get_facecolor())[:3]} now {rgb}"
         )
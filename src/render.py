@@ -0,0 +1,386 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+BACKGROUND = 1.0  # NOTE: matplotlib figures are white
+MIN_BAND_ROWS = 16  # bands thinner than this cost more in overhead than they save
+MASK_CACHE_BYTES = 64 * 2**20
+ENTRY_OVERHEAD = 256  # NOTE: rough size of a cache entry besides its arrays
+
+_pools: dict[int, ThreadPoolExecutor] = {}
+
+
+def get_pool(threads: int) -> ThreadPoolExecutor:
+    """
+    Shared thread pool with the given number of threads
+    """
+    if threads not in _pools:
+        _pools[threads] = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="render"
+        )
+    return _pools[threads]
+
+
+def bands(rows: int, threads: int) -> list[tuple[int, int]]:
+    """
+    Split rows into up to `threads` horizontal bands of similar height
+    """
+    n = max(min(threads, rows // MIN_BAND_ROWS), 1)
+    edges = np.linspace(0, rows, n + 1).astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def coverage(
+    xs: np.ndarray, ys: np.ndarray, px: np.ndarray, py: np.ndarray
+) -> np.ndarray:
+    """
+    Even-odd point in polygon test for a grid of pixel centers.
+
+    Args:
+        xs (np.ndarray): x coordinates of the polygon vertices, in pixels.
+        ys (np.ndarray): y coordinates of the polygon vertices, in pixels.
+        px (np.ndarray): (1, W) x coordinates of the pixel centers.
+        py (np.ndarray): (H, 1) y coordinates of the pixel centers.
+
+    Returns:
+        np.ndarray: (H, W) boolean coverage mask.
+    """
+    inside = np.zeros((py.shape[0], px.shape[1]), dtype=bool)
+    x0, y0 = xs[-1], ys[-1]
+    for x1, y1 in zip(xs, ys):
+        if y0 != y1:
+            crosses = (y0 > py) != (y1 > py)
+            x_cross = x0 + (py - y0) * ((x1 - x0) / (y1 - y0))
+            inside ^= crosses & (px < x_cross)
+        x0, y0 = x1, y1
+    return inside
+
+
+def polygon_mask(
+    gene: np.ndarray,
+    scale: tuple[float, float],
+    out_size: tuple[int, int],
+    rows: tuple[int, int] | None = None,
+) -> tuple[int, int, np.ndarray] | None:
+    """
+    Pixels covered by one genome row, within its bounding box.
+
+    Args:
+        gene (np.ndarray): One genome row.
+        scale (tuple[float, float]): Output pixels per canvas unit in x, y.
+        out_size (tuple[int, int]): (width, height) of the full output.
+        rows (tuple[int, int] | None): Only look at rows [r0, r1). Defaults
+          to every row.
+
+    Returns:
+        tuple[int, int, np.ndarray] | None: First row and column of the
+          bounding box and the boolean mask inside it, or None if the polygon
+          covers no pixel.
+    """
+    out_width, out_height = out_size
+    band_r0, band_r1 = rows if rows is not None else (0, out_height)
+    n = (len(gene) - 4) // 2
+    # data coordinates to pixel coordinates (y axis points down)
+    xs = gene[:n] * scale[0]
+    ys = out_height - gene[n : 2 * n] * scale[1]
+
+    c0 = max(int(np.floor(xs.min())), 0)
+    c1 = min(int(np.ceil(xs.max())), out_width)
+    r0 = max(int(np.floor(ys.min())), band_r0)
+    r1 = min(int(np.ceil(ys.max())), band_r1)
+    if c0 >= c1 or r0 >= r1:
+        return None
+
+    px = np.arange(c0, c1, dtype=np.float32)[None, :] + 0.5
+    py = np.arange(r0, r1, dtype=np.float32)[:, None] + 0.5
+    return r0, c0, coverage(xs, ys, px, py)
+
+
+class MaskCache:
+    """
+    LRU cache of full-size `polygon_mask` results, keyed by the vertices of a
+    genome row (and the output scale and size).
+
+    Color and z-order mutations leave every polygon's geometry unchanged and a
+    vertex mutation changes a single polygon, so nearly every mask an
+    evaluation needs was already rasterized. Entries are evicted least
+    recently used first once their masks take more than `max_bytes`; a cap of
+    0 disables the cache. `hits` and `misses` count the lookups.
+    """
+
+    def __init__(self, max_bytes: int = MASK_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()  # NOTE: bands render on a thread pool
+
+    def reset(self, max_bytes: int | None = None) -> None:
+        """
+        Drop every entry and zero the counters, optionally with a new cap
+        """
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._entries.clear()
+            self.nbytes = self.hits = self.misses = 0
+
+    def resize(self, max_bytes: int) -> None:
+        """
+        Lower or raise the cap, evicting the least recently used entries
+        that no longer fit; the counters are kept
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self.nbytes > self.max_bytes and self._entries:
+                self.nbytes -= _entry_size(*self._entries.popitem(last=False))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def mask(
+        self,
+        gene: np.ndarray,
+        scale: tuple[float, float],
+        out_size: tuple[int, int],
+    ) -> tuple[int, int, np.ndarray] | None:
+        """
+        `polygon_mask(gene, scale, out_size)`, from the cache if possible.
+        The returned mask is read-only.
+        """
+        if self.max_bytes <= 0:
+            return polygon_mask(gene, scale, out_size)
+        n = (len(gene) - 4) // 2
+        key = (gene[: 2 * n].tobytes(), scale, out_size)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        covered = polygon_mask(gene, scale, out_size)
+        if covered is not None:
+            covered[2].flags.writeable = False
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = covered
+                self.nbytes += _entry_size(key, covered)
+                while self.nbytes > self.max_bytes and self._entries:
+                    self.nbytes -= _entry_size(*self._entries.popitem(last=False))
+        return covered
+
+    def band_mask(
+        self,
+        gene: np.ndarray,
+        scale: tuple[float, float],
+        out_size: tuple[int, int],
+        rows: tuple[int, int] | None = None,
+    ) -> tuple[int, int, np.ndarray] | None:
+        """
+        `polygon_mask` with the same arguments, cropped from the cached mask
+        of the whole output
+        """
+        covered = self.mask(gene, scale, out_size)
+        if covered is None or rows is None:
+            return covered
+        r0, c0, mask = covered
+        top, bottom = max(r0, rows[0]), min(r0 + mask.shape[0], rows[1])
+        if top >= bottom:
+            return None
+        return top, c0, mask[top - r0 : bottom - r0]
+
+
+def _entry_size(key: tuple, covered: tuple[int, int, np.ndarray] | None) -> int:
+    size = ENTRY_OVERHEAD + len(key[0])
+    return size if covered is None else size + covered[2].nbytes
+
+
+MASKS = MaskCache()  # NOTE: shared by every rendering in the process
+
+
+def rasterize_band(
+    genome: np.ndarray,
+    scale: tuple[float, float],
+    out_size: tuple[int, int],
+    rows: tuple[int, int],
+    channels: int = 3,
+) -> np.ndarray:
+    """
+    Render rows [r0, r1) of a genome into a float image in [0, 1].
+
+    Args:
+        genome (np.ndarray): (n, 2 * n_vertices + 4) genome array.
+        scale (tuple[float, float]): Output pixels per canvas unit in x, y.
+        out_size (tuple[int, int]): (width, height) of the full output.
+        rows (tuple[int, int]): First and past-the-end row of the band.
+        channels (int): 3 for RGB, 1 for the gray value (the red channel)
+          of gray genomes. Defaults to 3.
+
+    Returns:
+        np.ndarray: (r1 - r0, width, channels) float32 band.
+    """
+    band_r0, band_r1 = rows
+    image = np.full(
+        (band_r1 - band_r0, out_size[0], channels), BACKGROUND, dtype=np.float32
+    )
+
+    for gene in genome:
+        alpha = gene[-1]
+        if alpha <= 0:
+            continue
+        covered = MASKS.band_mask(gene, scale, out_size, rows)
+        if covered is None:
+            continue
+        r0, c0, mask = covered
+        r0 -= band_r0
+        region = image[r0 : r0 + mask.shape[0], c0 : c0 + mask.shape[1]]
+        region[mask] += alpha * (gene[-4 : -4 + channels] - region[mask])
+
+    return image
+
+
+def window_diff(
+    genome: np.ndarray, target: np.ndarray, window: tuple[int, int, int, int]
+) -> np.ndarray:
+    """
+    Per pixel absolute difference (summed over the channels) between a
+    genome's rendering and a target over a window (r0, r1, c0, c1), rows
+    [r0, r1) and columns [c0, c1).
+
+    Pixels are composited exactly as `render_sad` does, so for a genome
+    holding every polygon that covers the window the sum is its share of
+    the full SAD.
+    """
+    r0, r1, c0, c1 = window
+    height, width = target.shape[:2]
+    channels = min(target.shape[2], 3)
+    image = np.full((r1 - r0, c1 - c0, channels), BACKGROUND, dtype=np.float32)
+
+    for gene in genome:
+        alpha = gene[-1]
+        if alpha <= 0:
+            continue
+        covered = MASKS.band_mask(gene, (1.0, 1.0), (width, height), (r0, r1))
+        if covered is None:
+            continue
+        top, left, mask = covered
+        start, end = max(left, c0), min(left + mask.shape[1], c1)
+        if start >= end:
+            continue
+        mask = mask[:, start - left : end - left]
+        region = image[top - r0 : top - r0 + mask.shape[0], start - c0 : end - c0]
+        region[mask] += alpha * (gene[-4 : -4 + channels] - region[mask])
+
+    diff = np.subtract(to_uint8(image), target[r0:r1, c0:c1, :3], dtype=np.int16)
+    return np.abs(diff).sum(axis=2, dtype=np.int32)
+
+
+def to_uint8(image: np.ndarray) -> np.ndarray:
+    return np.rint(image * 255).astype(np.uint8)
+
+
+def rasterize(
+    genome: np.ndarray,
+    width: int,
+    height: int,
+    out_width: int | None = None,
+    out_height: int | None = None,
+    threads: int = 1,
+    channels: int = 3,
+) -> np.ndarray:
+    """
+    Render a genome with NumPy, the same way `Canvas.image()` composites it.
+
+    Polygons are drawn back to front with "over" alpha blending on a white
+    background, in data coordinates with the origin at the bottom left. The
+    result can be rendered at any output size. With `threads` > 1 the image is
+    split into horizontal bands rendered in parallel (NumPy releases the GIL
+    inside its kernels).
+
+    Args:
+        genome (np.ndarray): (n, 2 * n_vertices + 4) genome array.
+        width (int): Width of the canvas the genome lives on.
+        height (int): Height of the canvas the genome lives on.
+        out_width (int | None): Width of the output image. Defaults to width.
+        out_height (int | None): Height of the output image. Defaults to
+          height.
+        threads (int): Number of threads. Defaults to 1.
+        channels (int): 3 for RGB, 1 for gray genomes. Defaults to 3.
+
+    Returns:
+        np.ndarray: (out_height, out_width, channels) uint8 image.
+    """
+    out_width = width if out_width is None else out_width
+    out_height = height if out_height is None else out_height
+    scale = (out_width / width, out_height / height)
+    out_size = (out_width, out_height)
+
+    image = np.empty((out_height, out_width, channels), dtype=np.uint8)
+
+    def render(rows: tuple[int, int]) -> None:
+        image[rows[0] : rows[1]] = to_uint8(
+            rasterize_band(genome, scale, out_size, rows, channels)
+        )
+
+    split = bands(out_height, threads)
+    if len(split) == 1:
+        render(split[0])
+    else:
+        list(get_pool(threads).map(render, split))
+    return image
+
+
+def render_sad(genome: np.ndarray, target: np.ndarray, threads: int = 1) -> int:
+    """
+    Sum of absolute differences between a genome's rendering and a target.
+
+    Each band is rendered and reduced on its own, so the full-size rendering
+    is never materialized; the per-band partial losses are summed at the end.
+    A single channel (gray) target is compared with the gray value only.
+
+    Args:
+        genome (np.ndarray): (n, 2 * n_vertices + 4) genome array.
+        target (np.ndarray): (H, W, 3) or (H, W, 1) target image.
+        threads (int): Number of threads. Defaults to 1.
+
+    Returns:
+        int: SAD over every pixel and channel.
+    """
+    height, width = target.shape[:2]
+    out_size = (width, height)
+    channels = min(target.shape[2], 3)
+
+    def partial(rows: tuple[int, int]) -> int:
+        band = to_uint8(rasterize_band(genome, (1.0, 1.0), out_size, rows, channels))
+        diff = np.subtract(band, target[rows[0] : rows[1], :, :3], dtype=np.int16)
+        return int(np.abs(diff).sum(dtype=np.int64))
+
+    split = bands(height, threads)
+    if len(split) == 1:
+        return partial(split[0])
+    return sum(get_pool(threads).map(partial, split))
+
+
+def render_sad_batch(
+    genomes: list[np.ndarray], target: np.ndarray, threads: int = 1
+) -> list[int]:
+    """
+    SAD of every genome of a batch (e.g. a population) against a target.
+
+    The batch is spread over the thread pool one genome per task, which keeps
+    every thread busy with far less scheduling than splitting each rendering
+    into bands.
+    """
+    if threads == 1 or len(genomes) == 1:
+        return [render_sad(genome, target) for genome in genomes]
+    return list(get_pool(threads).map(lambda g: render_sad(g, target), genomes))
@@ -0,0 +1,197 @@
+import logging
+from argparse import ArgumentParser
+
+import numpy as np
+
+from src.render import BACKGROUND
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+try:
+    import numba
+except ImportError:  # NOTE: optional, the numpy renderer is used instead
+    numba = None
+
+AVAILABLE = numba is not None
+
+
+if AVAILABLE:
+
+    @numba.njit(cache=True, parallel=True)
+    def _render_sad(genome: np.ndarray, target: np.ndarray, channels: int) -> int:
+        height, width = target.shape[0], target.shape[1]
+        count = genome.shape[0]
+        n = (genome.shape[1] - 4) // 2
+
+        # pixel space y (pointing down) and row range of every polygon
+        ys = np.float32(height) - genome[:, n : 2 * n]
+        top = np.empty(count, dtype=np.float32)
+        bottom = np.empty(count, dtype=np.float32)
+        for p in range(count):
+            top[p] = ys[p].min()
+            bottom[p] = ys[p].max()
+
+        total = 0
+        for r in numba.prange(height):
+            # NOTE: the only buffer is one row of the composite
+            row = np.full((width, channels), np.float32(BACKGROUND), dtype=np.float32)
+            crossings = np.empty(n, dtype=np.float32)
+            py = np.float32(r) + np.float32(0.5)
+            for p in range(count):
+                alpha = genome[p, 2 * n + 3]
+                if alpha <= 0 or py < top[p] or py > bottom[p]:
+                    continue
+
+                # even-odd rule: x of every edge crossing the row's centers
+                k = 0
+                x0, y0 = genome[p, n - 1], ys[p, n - 1]
+                for i in range(n):
+                    x1, y1 = genome[p, i], ys[p, i]
+                    if y0 != y1 and (y0 > py) != (y1 > py):
+                        crossings[k] = x0 + (py - y0) * ((x1 - x0) / (y1 - y0))
+                        k += 1
+                    x0, y0 = x1, y1
+                for i in range(1, k):
+                    value, j = crossings[i], i - 1
+                    while j >= 0 and crossings[j] > value:
+                        crossings[j + 1] = crossings[j]
+                        j -= 1
+                    crossings[j + 1] = value
+
+                # a pixel center is inside between crossings 2j and 2j + 1
+                for j in range(0, k - 1, 2):
+                    start, end = crossings[j], crossings[j + 1]
+                    c = max(int(np.floor(start)) - 1, 0)
+                    while c < width and np.float32(c) + np.float32(0.5) < end:
+                        if np.float32(c) + np.float32(0.5) >= start:
+                            for ch in range(channels):
+                                value = row[c, ch]
+                                row[c, ch] = value + alpha * (
+                                    genome[p, 2 * n + ch] - value
+                                )
+                        c += 1
+
+            partial = 0
+            for c in range(width):
+                for ch in range(channels):
+                    value = np.int64(np.rint(row[c, ch] * np.float32(255)))
+                    partial += abs(value - np.int64(target[r, c, ch]))
+            total += partial
+        return total
+
+
+_threads = None
+
+
+def render_sad(genome: np.ndarray, target: np.ndarray, threads: int = 1) -> int:
+    """
+    SAD between a genome's rendering and a target, in one fused pass.
+
+    A drop-in for `src.render.render_sad`: the same rasterization (pixel
+    centers, even-odd rule), "over" blending and rounding, but every row is
+    composited in a single row buffer and reduced right away, so no
+    full-size image, coverage mask or difference array is ever allocated.
+    Rows are spread over `threads` Numba threads.
+
+    Args:
+        genome (np.ndarray): (n, 2 * n_vertices + 4) genome array.
+        target (np.ndarray): (H, W, 3) or (H, W, 1) target image.
+        threads (int): Number of threads. Defaults to 1.
+
+    Returns:
+        int: SAD over every pixel and channel.
+    """
+    global _threads
+    if not AVAILABLE:
+        raise RuntimeError("The numba renderer needs numba, use the numpy renderer")
+    threads = min(threads, numba.config.NUMBA_NUM_THREADS)
+    if threads != _threads:
+        numba.set_num_threads(threads)
+        _threads = threads
+    channels = min(target.shape[2], 3)
+    genome = np.ascontiguousarray(genome, dtype=np.float32)
+    if not len(genome):
+        return int(np.abs(np.rint(BACKGROUND * 255) - target[:, :, :channels]).sum())
+    return int(_render_sad(genome, target, channels))
+
+
+def compare(
+    genome: np.ndarray, target: np.ndarray, threads: int = 1
+) -> dict[str, int]:
+    """
+    Loss of a genome with every backend: the reference `Canvas.image()` /
+    `sad` (matplotlib), the numpy renderer and, if available, this one
+    """
+    from src.genome import genome_to_canvas
+    from src.loss import sad
+    from src.render import render_sad as numpy_render_sad
+
+    height, width, channels = target.shape
+    canvas = genome_to_canvas(genome, width, height)
+    losses = {
+        "agg": int(sad(target, canvas.image()[:, :, :channels])),
+        "numpy": numpy_render_sad(genome, target, threads),
+    }
+    if AVAILABLE:
+        losses["numba"] = render_sad(genome, target, threads)
+    return losses
+
+
+parser = ArgumentParser(
+    description="Check the renderers against matplotlib on random genomes"
+)
+parser.add_argument("image", type=str, help="The path of the target image")
+parser.add_argument(
+    "-n", "--genomes", type=int, default=10, help="Random genomes (default=10)"
+)
+parser.add_argument(
+    "-p", "--polygons", type=int, default=50, help="Polygons per genome (default=50)"
+)
+parser.add_argument(
+    "--tolerance",
+    type=float,
+    default=0.02,
+    help="Largest relative difference to the matplotlib loss (default=0.02)",
+)
+
+
+if __name__ == "__main__":
+    import time
+
+    from src.image_cache import load_image
+
+    args = parser.parse_args()
+    target = load_image(args.image)
+    height, width = target.shape[:2]
+    rng = np.random.default_rng(0)
+    worst = {}
+    elapsed = {}
+    for _ in range(args.genomes):
+        genome = rng.random((args.polygons, 10), dtype=np.float32)
+        genome[:, :3] *= width
+        genome[:, 3:6] *= height
+        losses = compare(genome, target)
+        for name, loss in losses.items():
+            error = abs(loss - losses["agg"]) / losses["agg"]
+            worst[name] = max(worst.get(name, 0.0), error)
+        if "numba" in losses and losses["numba"] != losses["numpy"]:
+            print(f"numba {losses['numba']} != numpy {losses['numpy']}")
+    from src.render import render_sad as numpy_render_sad
+
+    backends = {"numpy": numpy_render_sad}
+    if AVAILABLE:
+        backends["numba"] = render_sad
+    for name, function in backends.items():
+        function(genome, target)
+        start = time.perf_counter()
+        for _ in range(20):
+            function(genome, target)
+        elapsed[name] = (time.perf_counter() - start) / 20
+    for name in backends:
+        print(
+            f"{name}: worst relative difference to agg {worst[name]:.4f}, "
+            f"{elapsed[name] * 1000:.2f} ms per evaluation"
+        )
+    if any(error > args.tolerance for error in worst.values()):
+        raise SystemExit("Renderers disagree beyond the tolerance")
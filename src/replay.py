@@ -0,0 +1,214 @@
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from src.render import rasterize
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+
+class Trajectory:
+    """
+    Keyframes of a simulation run: the genome after every iteration that
+    changed the canvas. Iterations in between are identical to the keyframe
+    before them, so this is enough to rebuild the whole run.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.iterations: list[int] = []
+        # NOTE: keyframes moved to disk by `spill` are not in `genomes`, it
+        # only holds the keyframes from `len(self) - len(self.genomes)` on
+        self.genomes: list[np.ndarray] = []
+        self._chunks: list[tuple[str, int]] = []
+        self._dir: tempfile.TemporaryDirectory | None = None
+        self._last: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.iterations)
+
+    @property
+    def spilled(self) -> bool:
+        return self._dir is not None
+
+    def record(self, t: int, genome: np.ndarray) -> bool:
+        """
+        Add the genome after `t` iterations, if it changed since the last one
+        """
+        last = self._last
+        if last is not None and last.shape == genome.shape:
+            if np.array_equal(last, genome):
+                return False
+        self.iterations.append(t)
+        self.genomes.append(genome)
+        self._last = genome
+        return True
+
+    def spill(self, directory: str | None = None) -> None:
+        """
+        Move the keyframes held in memory to a chunk file on disk
+        """
+        if not self.genomes:
+            return
+        if self._dir is None:
+            self._dir = tempfile.TemporaryDirectory(prefix="trajectory-", dir=directory)
+            logger.info(f"Trajectory spilled to '{self._dir.name}'")
+        path = os.path.join(self._dir.name, f"{len(self._chunks)}.npz")
+        np.savez(
+            path,
+            counts=np.array([len(g) for g in self.genomes], dtype=np.int64),
+            genomes=np.concatenate(self.genomes),
+        )
+        self._chunks.append((path, len(self.genomes)))
+        self.genomes = []
+
+    def _chunk(self, path: str) -> list[np.ndarray]:
+        with np.load(path) as data:
+            return np.split(data["genomes"], np.cumsum(data["counts"])[:-1])
+
+    def index(self, t: int) -> int:
+        """
+        Index of the keyframe showing the canvas after `t` iterations
+        """
+        return max(int(np.searchsorted(self.iterations, t, side="right")) - 1, 0)
+
+    def genome(self, t: int) -> np.ndarray:
+        """
+        Genome of the canvas after `t` iterations
+        """
+        index = self.index(t)
+        for path, count in self._chunks:
+            if index < count:
+                return self._chunk(path)[index]
+            index -= count
+        return self.genomes[index]
+
+    def all_genomes(self) -> list[np.ndarray]:
+        """
+        Every keyframe, including the ones spilled to disk
+        """
+        genomes = []
+        for path, _ in self._chunks:
+            genomes += self._chunk(path)
+        return genomes + self.genomes
+
+    def nbytes(self) -> int:
+        """
+        Approximate bytes held in memory by the keyframes
+        """
+        return sum(g.nbytes for g in self.genomes) + 8 * len(self.iterations)
+
+    def save(self, path: str) -> None:
+        """
+        Write the trajectory to a `.npz` file
+        """
+        genomes = self.all_genomes()
+        np.savez_compressed(
+            path,
+            size=np.array([self.width, self.height]),
+            iterations=np.array(self.iterations, dtype=np.int64),
+            counts=np.array([len(g) for g in genomes], dtype=np.int64),
+            genomes=np.concatenate(genomes),
+        )
+        logger.info(f"Trajectory written to '{path}' ({len(self)} keyframes)")
+
+    @classmethod
+    def load(cls, path: str) -> "Trajectory":
+        """
+        Read a trajectory written by `save`
+        """
+        with np.load(path) as data:
+            trajectory = cls(*(int(v) for v in data["size"]))
+            offsets = np.cumsum(data["counts"])[:-1]
+            trajectory.iterations = data["iterations"].tolist()
+            trajectory.genomes = np.split(data["genomes"], offsets)
+            trajectory._last = trajectory.genomes[-1]
+        return trajectory
+
+
+class Replay:
+    """
+    Render any iteration of a saved run on demand.
+
+    Frames are rendered with the NumPy rasterizer at any output size, and the
+    most recently rendered keyframes are kept in an LRU cache so scrubbing back
+    and forth through a run stays cheap.
+    """
+
+    def __init__(self, trajectory: Trajectory | str, cache_size: int = 32):
+        if isinstance(trajectory, str):
+            trajectory = Trajectory.load(trajectory)
+        self.trajectory = trajectory
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+
+    @property
+    def last_iteration(self) -> int:
+        """Iteration of the final keyframe"""
+        return self.trajectory.iterations[-1]
+
+    def frame(
+        self, t: int, width: int | None = None, height: int | None = None
+    ) -> np.ndarray:
+        """
+        Render the canvas after `t` iterations.
+
+        Args:
+            t (int): Iteration number.
+            width (int | None): Output width. Defaults to the canvas width.
+            height (int | None): Output height. Defaults to keeping the aspect
+              ratio of the canvas.
+
+        Returns:
+            np.ndarray: (height, width, 3) uint8 image (read-only, cached).
+        """
+        trajectory = self.trajectory
+        width = trajectory.width if width is None else width
+        if height is None:
+            height = round(width * trajectory.height / trajectory.width)
+
+        key = (trajectory.index(t), width, height)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        image = rasterize(
+            trajectory.genome(t),
+            trajectory.width,
+            trajectory.height,
+            width,
+            height,
+        )
+        image.flags.writeable = False
+        self._cache[key] = image
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return image
+
+    def frames(
+        self,
+        iterations: Iterable[int],
+        width: int | None = None,
+        height: int | None = None,
+    ) -> Iterator[np.ndarray]:
+        """
+        Render a sequence of iterations, e.g. for an animation
+        """
+        for t in iterations:
+            yield self.frame(t, width, height)
+
+    def save_frame(
+        self, t: int, path: str, width: int | None = None, height: int | None = None
+    ) -> None:
+        """
+        Render the canvas after `t` iterations and write it to an image file
+        """
+        from PIL import Image
+
+        Image.fromarray(self.frame(t, width, height)).save(path)
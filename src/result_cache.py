@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from src.api import ReconstructionResult
+from src.config import RunConfig
+from src.genome_io import from_bytes, to_bytes
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+# Fields that only change what is written or how fast it runs, not the result
+IGNORED_FIELDS = (
+    "save_frames",
+    "min_save",
+    "stats_interval",
+    "threads",
+    "mask_cache",
+    "metrics_file",
+    "metrics_port",
+    "metrics_interval",
+)
+# Fields a warm start has to share with the cached run, they define the loss
+# and the genome layout
+WARM_START_FIELDS = ("n_vertices", "renderer", "color_mode")
+
+
+def image_hash(image: np.ndarray) -> str:
+    """
+    Hash of the decoded pixels (and shape) of a preprocessed image
+    """
+    digest = hashlib.sha1(str(image.shape).encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()[:16]
+
+
+def config_hash(config: RunConfig) -> str:
+    """
+    Hash of the canonical JSON of a config, seed included
+    """
+    data = {k: v for k, v in config.to_dict().items() if k not in IGNORED_FIELDS}
+    text = json.dumps(data, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    Content addressed cache of finished reconstructions on local disk.
+
+    An entry is keyed on the hash of the source pixels and of the run config,
+    and stored as `<image>-<config>.json` (metrics and config) next to
+    `<image>-<config>.bin` (the float32 genome). Reading an entry refreshes its
+    modification time; the least recently used entries are evicted once the
+    cache holds more than `max_entries` entries or `max_bytes` bytes.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_entries: int | None = None,
+        max_bytes: int | None = 1 << 30,
+    ):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, image_key: str, config: RunConfig, extension: str) -> str:
+        return os.path.join(
+            self.cache_dir, f"{image_key}-{config_hash(config)}.{extension}"
+        )
+
+    def _read(self, meta_path: str) -> ReconstructionResult | None:
+        try:
+            with open(meta_path) as file:
+                meta = json.load(file)
+            with open(f"{meta_path[:-len('.json')]}.bin", "rb") as file:
+                genome, width, height = from_bytes(file.read())
+        except (FileNotFoundError, ValueError):
+            # evicted or half written by another process
+            return None
+        # NOTE: touch the entry, eviction removes the least recently used
+        os.utime(meta_path)
+        return ReconstructionResult(
+            config=RunConfig.from_dict(meta["config"]),
+            genome=genome,
+            width=width,
+            height=height,
+            loss=meta["loss"],
+            complete_percent=meta["complete_percent"],
+            iterations=meta["iterations"],
+            elapsed=meta["elapsed"],
+            stop_reason=meta["stop_reason"],
+        )
+
+    def get(self, image: np.ndarray, config: RunConfig) -> ReconstructionResult | None:
+        """
+        Cached result of the same image and config, or None
+        """
+        result = self._read(self._path(image_hash(image), config, "json"))
+        logger.info(f"Result cache {'hit' if result else 'miss'}")
+        return result
+
+    def put(self, image: np.ndarray, result: ReconstructionResult) -> None:
+        """
+        Store a finished result, then evict old entries if over the limits
+        """
+        image_key = image_hash(image)
+        meta_path = self._path(image_key, result.config, "json")
+        meta = {
+            "image": image_key,
+            "config": result.config.to_dict(),
+            "loss": result.loss,
+            "complete_percent": result.complete_percent,
+            "iterations": result.iterations,
+            "elapsed": result.elapsed,
+            "stop_reason": result.stop_reason,
+            "created": time.time(),
+        }
+        genome = to_bytes(result.genome, result.width, result.height, precision=4)
+        # NOTE: the genome goes first and both are renamed into place, so an
+        # entry is visible only once it is complete
+        for path, data in (
+            (f"{meta_path[:-len('.json')]}.bin", genome),
+            (meta_path, json.dumps(meta, indent=2).encode()),
+        ):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        self.evict()
+
+    def nearest(
+        self, image: np.ndarray, config: RunConfig
+    ) -> ReconstructionResult | None:
+        """
+        Best cached result to warm start a run from: the same image and
+        `WARM_START_FIELDS`, at most as many polygons, the most polygons and
+        then the lowest loss
+        """
+        prefix = f"{image_hash(image)}-"
+        best = None
+        for name in os.listdir(self.cache_dir):
+            if not (name.startswith(prefix) and name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.cache_dir, name)) as file:
+                    meta = json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                # evicted or half written by another process, a miss
+                continue
+            cached = RunConfig.from_dict(meta["config"])
+            if any(getattr(cached, f) != getattr(config, f) for f in WARM_START_FIELDS):
+                continue
+            if cached.max_polygons > config.max_polygons:
+                continue
+            rank = (cached.max_polygons, -meta["loss"])
+            if best is None or rank > best[0]:
+                best = (rank, name)
+        if best is None:
+            return None
+        logger.info(f"Warm start from cached result '{best[1]}'")
+        return self._read(os.path.join(self.cache_dir, best[1]))
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries until the cache is within limits
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            meta_path = os.path.join(self.cache_dir, name)
+            bin_path = f"{meta_path[:-len('.json')]}.bin"
+            try:
+                size = os.path.getsize(meta_path) + os.path.getsize(bin_path)
+                entries.append((os.path.getmtime(meta_path), size, meta_path, bin_path))
+            except FileNotFoundError:
+                continue
+        entries.sort()
+
+        total = sum(entry[1] for entry in entries)
+        while entries and (
+            (self.max_entries is not None and len(entries) > self.max_entries)
+            or (self.max_bytes is not None and total > self.max_bytes)
+        ):
+            _, size, meta_path, bin_path = entries.pop(0)
+            for path in (meta_path, bin_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            logger.debug(f"Evicted '{meta_path}'")
@@ -0,0 +1,132 @@
+import logging
+
+import numpy as np
+from src.reconstruction import MAX_STEP
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+# Mutation operators in the order used by `polygon_mutate`
+OPERATORS = ("vertex", "color", "swap")
+
+
+class OperatorScheduler:
+    """
+    Choose mutation operators and step sizes from measured acceptance rates.
+
+    Every trial reports whether the mutation was accepted, how much it lowered
+    the loss and how long it took. With `adaptive` on:
+
+    - operators are picked bandit-style, proportionally to their (decayed)
+      loss improvement per second, with a floor of `explore` so no operator
+      starves;
+    - step sizes follow the 1/5th-success rule: every `window` trials of an
+      operator, its step grows if more than a fifth were accepted and shrinks
+      otherwise.
+
+    Without `adaptive` the choice stays uniform with a fixed step (the paper's
+    behavior), but the statistics are still collected for the logs.
+    """
+
+    def __init__(
+        self,
+        *,
+        adaptive: bool = False,
+        step: float = MAX_STEP,
+        step_bounds: tuple[float, float] = (0.005, 0.5),
+        explore: float = 0.1,
+        decay: float = 0.995,
+        window: int = 20,
+        factor: float = 0.85,
+    ):
+        n = len(OPERATORS)
+        self.adaptive = adaptive
+        self.step_bounds = step_bounds
+        self.explore = explore
+        self.decay = decay
+        self.window = window
+        self.factor = factor
+
+        self.steps = np.full(n, step)
+        self.trials = np.zeros(n, dtype=np.int64)
+        self.accepted = np.zeros(n, dtype=np.int64)
+        self.improvement = np.zeros(n)
+        self.elapsed = np.zeros(n)
+        # decayed estimates used for the bandit
+        self._gain = np.zeros(n)
+        self._time = np.zeros(n)
+        # acceptances inside the current 1/5th rule window
+        self._window_trials = np.zeros(n, dtype=np.int64)
+        self._window_accepted = np.zeros(n, dtype=np.int64)
+
+    @property
+    def probabilities(self) -> np.ndarray:
+        """Current probability of choosing each operator"""
+        n = len(OPERATORS)
+        uniform = np.full(n, 1 / n)
+        if not self.adaptive or np.any(self._time == 0):
+            return uniform
+        rate = self._gain / self._time
+        if rate.sum() <= 0:
+            return uniform
+        return (1 - self.explore) * rate / rate.sum() + self.explore * uniform
+
+    def choose(self) -> int:
+        """
+        Pick the index of the next mutation operator
+        """
+        return int(np.random.choice(len(OPERATORS), p=self.probabilities))
+
+    def step(self, operator: int) -> float:
+        """
+        Relative step size for the scaled increments of an operator
+        """
+        return float(self.steps[operator])
+
+    def report(
+        self, operator: int, accepted: bool, improvement: float, elapsed: float
+    ) -> None:
+        """
+        Record the outcome of one mutation trial
+        """
+        improvement = max(float(improvement), 0.0) if accepted else 0.0
+
+        self.trials[operator] += 1
+        self.accepted[operator] += accepted
+        self.improvement[operator] += improvement
+        self.elapsed[operator] += elapsed
+
+        self._gain[operator] = self.decay * self._gain[operator] + improvement
+        self._time[operator] = self.decay * self._time[operator] + elapsed
+
+        self._window_trials[operator] += 1
+        self._window_accepted[operator] += accepted
+        if self._window_trials[operator] >= self.window:
+            if self.adaptive:
+                self._one_fifth_rule(operator)
+            self._window_trials[operator] = 0
+            self._window_accepted[operator] = 0
+
+    def _one_fifth_rule(self, operator: int) -> None:
+        success = self._window_accepted[operator] / self._window_trials[operator]
+        if success > 0.2:
+            self.steps[operator] /= self.factor
+        elif success < 0.2:
+            self.steps[operator] *= self.factor
+        self.steps[operator] = np.clip(self.steps[operator], *self.step_bounds)
+
+    def summary(self) -> str:
+        """
+        One line of per-operator statistics for the logs
+        """
+        parts = []
+        probabilities = self.probabilities
+        for i, name in enumerate(OPERATORS):
+            rate = self.accepted[i] / self.trials[i] if self.trials[i] else 0.0
+            gain = self.improvement[i] / self.elapsed[i] if self.elapsed[i] else 0.0
+            parts.append(
+                f"{name}: p={probabilities[i]:.2f} step={self.steps[i]:.3f} "
+                f"accept={rate:.3f} ({self.accepted[i]}/{self.trials[i]}) "
+                f"gain/s={gain:.1f}"
+            )
+        return " | ".join(parts)
@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+import re
+import time
+from argparse import ArgumentParser
+from dataclasses import replace
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from src.api import ReconstructionResult
+from src.config import RunConfig
+from src.genome_io import save_genome
+from src.image_cache import convert_color, load_image, prepare_image
+from src.polish import optimal_colors
+from src.render import polygon_mask, rasterize
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def read_frames(path: str) -> Iterator[np.ndarray]:
+    """
+    Frames of a directory of images (in natural order) or of a video file
+    """
+    if os.path.isdir(path):
+        names = [n for n in os.listdir(path) if n.lower().endswith(IMAGE_EXTENSIONS)]
+
+        def natural(name: str) -> list:
+            # NOTE: 'frame_10' comes after 'frame_9'
+            return [int(p) if p.isdigit() else p for p in re.split(r"(\d+)", name)]
+
+        names.sort(key=natural)
+        for name in names:
+            yield load_image(os.path.join(path, name))
+    else:
+        # NOTE: only needed for videos, like in animation.py
+        import imageio
+
+        with imageio.get_reader(path) as reader:
+            for frame in reader:
+                yield prepare_image(np.asarray(frame))
+
+
+def reseed(
+    genome: np.ndarray,
+    previous: np.ndarray,
+    frame: np.ndarray,
+    threshold: float = 0.1,
+    min_changed: float = 0.1,
+) -> tuple[np.ndarray, list[int]]:
+    """
+    Adapt the previous frame's genome to a new frame.
+
+    The energy map of the reconstruction (its absolute difference to the
+    source) is compared between the two frames; a polygon is re-seeded if more
+    than `min_changed` of its pixels got worse by more than `threshold` (as a
+    fraction of the value range). Re-seeded polygons keep their shape and get
+    the closed-form optimal colors for the new frame, everything else is left
+    as it was.
+
+    Args:
+        genome (np.ndarray): Final genome of the previous frame.
+        previous (np.ndarray): Previous (H, W, 3) frame, or (H, W, 1) in gray.
+        frame (np.ndarray): New frame, in the same color mode.
+        threshold (float): Energy increase marking a pixel as changed.
+          Defaults to 0.1.
+        min_changed (float): Fraction of changed pixels that re-seeds a
+          polygon. Defaults to 0.1.
+
+    Returns:
+        tuple[np.ndarray, list[int]]: New genome and the re-seeded rows.
+    """
+    height, width, channels = frame.shape
+    recon = rasterize(genome, width, height, channels=channels).astype(np.int16)
+    energy_before = np.abs(previous.astype(np.int16) - recon).sum(axis=2)
+    energy_after = np.abs(frame.astype(np.int16) - recon).sum(axis=2)
+    changed = (energy_after - energy_before) > threshold * 255 * channels
+
+    rows = []
+    for i, gene in enumerate(genome):
+        covered = polygon_mask(gene, (1.0, 1.0), (width, height))
+        if covered is None:
+            continue
+        r0, c0, mask = covered
+        region = changed[r0 : r0 + mask.shape[0], c0 : c0 + mask.shape[1]]
+        if region[mask].mean() > min_changed:
+            rows.append(i)
+    if rows:
+        genome = optimal_colors(genome, frame, rows)
+    return genome, rows
+
+
+def reconstruct_sequence(
+    frames: Iterable[np.ndarray],
+    config: RunConfig | None = None,
+    output_dir: str | None = None,
+    warm_budget: float = 0.25,
+    threshold: float = 0.1,
+) -> Iterator[ReconstructionResult]:
+    """
+    Reconstruct a sequence of frames, each one warm started from the last.
+
+    The first frame is a regular (cold) run. Every later frame starts from
+    the previous final genome with the polygons of the changed regions
+    re-seeded (see `reseed`), and stops as soon as it matches the previous
+    frame's complete percentage, or after `warm_budget` of the evaluations of
+    a cold run.
+
+    Args:
+        frames (Iterable[np.ndarray]): (H, W, C) frames of one size.
+        config (RunConfig | None): Run parameters. Defaults to `RunConfig()`.
+        output_dir (str | None): Folder receiving every frame's genome
+          ('<k>.bin') and rendering ('<k>.png', animate them with
+          `src.gif_magic`). Defaults to writing nothing.
+        warm_budget (float): Evaluation budget of a warm frame, relative to
+          `config.max_evaluations`. Defaults to 0.25.
+        threshold (float): Energy increase marking a pixel as changed, see
+          `reseed`. Defaults to 0.1.
+
+    Yields:
+        ReconstructionResult: Result of every frame, in order.
+    """
+    from PIL import Image
+
+    from src.simulation import Simulation
+
+    config = config or RunConfig()
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    previous = None
+    for k, frame in enumerate(frames):
+        frame = convert_color(prepare_image(frame), config.color_mode)
+        if previous is None:
+            frame_config, init_genome = config, None
+        else:
+            genome, rows = reseed(previous[1].genome, previous[0], frame, threshold)
+            logger.info(f"Frame {k}: re-seeded {len(rows)}/{len(genome)} polygons")
+            frame_config = replace(
+                config,
+                max_evaluations=max(int(config.max_evaluations * warm_budget), 1),
+                target_percent=(
+                    previous[1].complete_percent
+                    if config.target_percent is None
+                    else config.target_percent
+                ),
+            )
+            init_genome = genome
+
+        simulation = Simulation(
+            config=replace(frame_config, save_frames=False),
+            b_image=frame,
+            init_genome=init_genome,
+        )
+        simulation.run()
+        result = ReconstructionResult.from_simulation(simulation)
+        logger.info(
+            f"Frame {k}: {result.complete_percent:.2f}% in {result.iterations} "
+            f"iterations ({result.stop_reason})"
+        )
+
+        if output_dir is not None:
+            name = os.path.join(output_dir, str(k).zfill(5))
+            save_genome(f"{name}.bin", result.genome, result.width, result.height)
+            Image.fromarray(result.image()).save(f"{name}.png")
+
+        previous = (frame, result)
+        yield result
+
+
+parser = ArgumentParser(description="Reconstruct the frames of a video")
+parser.add_argument("input", type=str, help="A directory of frames or a video file")
+parser.add_argument("output", type=str, help="Output folder")
+parser.add_argument(
+    "-c",
+    "--config",
+    type=str,
+    default="{}",
+    help="RunConfig fields as JSON, the first frame runs with them as is",
+)
+parser.add_argument(
+    "-b",
+    "--warm-budget",
+    type=float,
+    default=0.25,
+    help="Evaluation budget of the later frames, relative to max_evaluations (default=0.25)",
+)
+parser.add_argument(
+    "--threshold",
+    type=float,
+    default=0.1,
+    help="Energy increase (fraction of the value range) marking a pixel as changed (default=0.1)",
+)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    _logger.setLevel("INFO")
+    logger.addHandler(logging.StreamHandler())
+    start = time.perf_counter()
+    summary = [
+        {
+            "frame": k,
+            "loss": result.loss,
+            "complete_percent": result.complete_percent,
+            "iterations": result.iterations,
+            "elapsed": result.elapsed,
+            "stop_reason": result.stop_reason,
+        }
+        for k, result in enumerate(
+            reconstruct_sequence(
+                read_frames(args.input),
+                RunConfig.from_json(args.config),
+                args.output,
+                warm_budget=args.warm_budget,
+                threshold=args.threshold,
+            )
+        )
+    ]
+    with open(os.path.join(args.output, "sequence.json"), "w") as file:
+        json.dump(summary, file, indent=2)
+    logger.info(f"{len(summary)} frames in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,468 @@
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from argparse import ArgumentParser
+
+import numpy as np
+
+from src.config import RunConfig
+from src.image_cache import ImageCache
+from src.loss import percent_of
+from src.output import FolderOutput
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+# A spool directory holds one folder per job state; jobs move between them
+# with os.rename, which is atomic, so any number of workers can share a spool.
+QUEUE = "queue"
+CLAIMED = "claimed"
+DONE = "done"
+FAILED = "failed"
+JOBS = "jobs"  # per job output folders
+STATES = (QUEUE, CLAIMED, DONE, FAILED, JOBS)
+CLAIM_TIMEOUT = 600.0  # seconds without a heartbeat before a claim is stale
+HEARTBEAT_INTERVAL = 30.0  # seconds between the heartbeats of a running job
+
+
+def init_spool(spool: str) -> None:
+    """
+    Create the folders of a spool directory
+    """
+    for state in STATES:
+        os.makedirs(os.path.join(spool, state), exist_ok=True)
+
+
+def write_json(path: str, data: dict) -> None:
+    """
+    Write a JSON file atomically, readers never see a partial file
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(data, file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def submit(
+    spool: str, image: str, config: RunConfig | None = None, job_id: str | None = None
+) -> str:
+    """
+    Queue a reconstruction job.
+
+    Only images on disk can be queued, in-memory images go through
+    `src.api.reconstruct`.
+
+    Args:
+        spool (str): Spool directory.
+        image (str): Path of the source image.
+        config (RunConfig | None): Run parameters. Defaults to `RunConfig()`
+          without per-iteration frames.
+        job_id (str | None): Id of the job. Defaults to a random unique id.
+
+    Returns:
+        str: Id of the job.
+    """
+    init_spool(spool)
+    job_id = job_id or uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "image": os.path.abspath(image),
+        "config": (config or RunConfig(save_frames=False)).to_dict(),
+        "submitted": time.time(),
+    }
+    write_json(os.path.join(spool, QUEUE, f"{job_id}.json"), job)
+    return job_id
+
+
+def status(spool: str, job_id: str) -> dict:
+    """
+    State, progress and (once finished) result of a job
+    """
+    for state in (DONE, FAILED, CLAIMED, QUEUE):
+        path = os.path.join(spool, state, f"{job_id}.json")
+        if os.path.exists(path):
+            with open(path) as file:
+                job = json.load(file)
+            job["state"] = state
+            progress = os.path.join(spool, JOBS, job_id, "status.json")
+            if state == CLAIMED and os.path.exists(progress):
+                with open(progress) as file:
+                    job["progress"] = json.load(file)
+            return job
+    raise KeyError(f"Unknown job '{job_id}'")
+
+
+def claim(spool: str, worker: int = 0) -> dict | None:
+    """
+    Take the oldest queued job, or None if the queue is empty.
+
+    The claim records the host and PID of the worker holding it, see
+    `requeue_stale`.
+    """
+    queue = os.path.join(spool, QUEUE)
+    names = sorted(
+        (n for n in os.listdir(queue) if n.endswith(".json")),
+        key=lambda n: os.stat(os.path.join(queue, n)).st_mtime,
+    )
+    for name in names:
+        claimed = os.path.join(spool, CLAIMED, name)
+        try:
+            os.rename(os.path.join(queue, name), claimed)
+        except FileNotFoundError:
+            # another worker got it first
+            continue
+        with open(claimed) as file:
+            job = json.load(file)
+        job.update(
+            worker=worker,
+            host=socket.gethostname(),
+            pid=os.getpid(),
+            claimed=time.time(),
+        )
+        write_json(claimed, job)
+        return job
+    return None
+
+
+def heartbeat(spool: str, job_id: str) -> None:
+    """
+    Mark a claim as alive
+    """
+    try:
+        os.utime(os.path.join(spool, CLAIMED, f"{job_id}.json"))
+    except FileNotFoundError:
+        logger.warning(f"Job {job_id} is no longer claimed")
+
+
+def requeue_stale(spool: str, timeout: float = CLAIM_TIMEOUT) -> list[str]:
+    """
+    Put claimed jobs whose worker is gone back on the queue.
+
+    A claim made on this host is stale once its worker's PID no longer
+    exists; a running job is never requeued, however slow. A claim from
+    another host (whose PID can't be checked) is stale after `timeout`
+    seconds without a heartbeat, e.g. a worker that died or hangs.
+
+    Returns:
+        list[str]: Ids of the requeued jobs.
+    """
+    claimed = os.path.join(spool, CLAIMED)
+    requeued = []
+    for name in os.listdir(claimed):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(claimed, name)
+        try:
+            # NOTE: the rename of a claim updates the ctime, a heartbeat both
+            stat = os.stat(path)
+            with open(path) as file:
+                job = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+        idle = time.time() - max(stat.st_mtime, stat.st_ctime)
+        if job.get("host") == socket.gethostname() and job.get("pid") is not None:
+            dead = not pid_alive(job["pid"])
+            if not dead:
+                continue
+        else:
+            dead = False
+            if idle < timeout:
+                continue
+        try:
+            os.rename(path, os.path.join(spool, QUEUE, name))
+        except FileNotFoundError:
+            # finished, or another worker requeued it first
+            continue
+        logger.warning(
+            f"Requeued job {job.get('id')} from worker {job.get('worker')} "
+            f"({'dead' if dead else f'idle for {idle:.0f}s'})"
+        )
+        requeued.append(job.get("id"))
+    return requeued
+
+
+def pid_alive(pid: int) -> bool:
+    """
+    Whether a process exists on this host
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobOutput(FolderOutput):
+    """
+    Folder output of a job that also publishes its progress to `status.json`
+    """
+
+    def __init__(
+        self, folder_path: str, num_evals: int, worker: int, spool: str, job_id: str
+    ):
+        super().__init__(folder_path, num_evals)
+        self.worker = worker
+        self.spool = spool
+        self.job_id = job_id
+
+    def progress(self, simulation, t: int, loss: float) -> None:
+        heartbeat(self.spool, self.job_id)
+        blank_loss = float(np.sum(simulation.base_image))
+        write_json(
+            os.path.join(self.folder_path, "status.json"),
+            {
+                "worker": self.worker,
+                "iteration": t,
+                "loss": loss,
+                "complete_percent": percent_of(loss, blank_loss),
+                "polygons": simulation.canvas.how_many(),
+                "elapsed": simulation.stopping.elapsed,
+            },
+        )
+
+
+def keep_alive(spool: str, job_id: str, stop: threading.Event) -> None:
+    """
+    Send a heartbeat every `HEARTBEAT_INTERVAL` seconds until `stop` is set,
+    however long the iterations of the job take
+    """
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        heartbeat(spool, job_id)
+
+
+def owns_claim(spool: str, job: dict) -> bool:
+    """
+    Whether the claim of a job is still the one this worker made
+    """
+    try:
+        with open(os.path.join(spool, CLAIMED, f"{job['id']}.json")) as file:
+            claim_record = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    return all(claim_record.get(k) == job[k] for k in ("host", "pid", "claimed"))
+
+
+def run_job(spool: str, job: dict, cache: ImageCache, worker: int) -> dict:
+    """
+    Run one claimed job and return its result record; a job interrupted
+    before resumes from the genome it saved
+    """
+    # imported here so the service starts fast, workers import it once
+    from src.api import ReconstructionResult
+    from src.simulation import Simulation
+
+    folder = os.path.join(spool, JOBS, job["id"])
+    os.makedirs(folder, exist_ok=True)
+    config = RunConfig.from_dict(job["config"])
+
+    handler = logging.FileHandler(os.path.join(folder, "simulation.log"), mode="w")
+    handler.setFormatter(
+        logging.Formatter(
+            "%(asctime)-8s :: %(module)-.8s :: %(levelname)-.1s :: %(message)s",
+            datefmt="%H:%M:%S",
+        )
+    )
+    _logger.addHandler(handler)
+    stop = threading.Event()
+    threading.Thread(
+        target=keep_alive, args=(spool, job["id"], stop), daemon=True
+    ).start()
+    try:
+        simulation = Simulation(
+            config=config,
+            output=JobOutput(folder, config.max_evaluations, worker, spool, job["id"]),
+            b_image=cache.get(job["image"]),
+            init_genome=job.get("resume"),
+        )
+        simulation.run()
+        simulation.write_results()
+        result = ReconstructionResult.from_simulation(simulation)
+    finally:
+        stop.set()
+        _logger.removeHandler(handler)
+        handler.close()
+
+    return {
+        "loss": result.loss,
+        "complete_percent": result.complete_percent,
+        "iterations": result.iterations,
+        "elapsed": result.elapsed,
+        "stop_reason": result.stop_reason,
+        "output": folder,
+    }
+
+
+def finish(spool: str, job: dict, state: str) -> None:
+    """
+    Write the final record of a claimed job, then drop the claim. If the job
+    was requeued while it ran, the queued copy is dropped too.
+    """
+    path = os.path.join(spool, CLAIMED, f"{job['id']}.json")
+    owned = owns_claim(spool, job)
+    if owned and state == QUEUE:
+        # NOTE: moved back in one rename, no other worker can claim it twice
+        write_json(path, job)
+        os.rename(path, os.path.join(spool, QUEUE, f"{job['id']}.json"))
+        return
+    write_json(os.path.join(spool, state, f"{job['id']}.json"), job)
+    if owned:
+        os.remove(path)
+        return
+    logger.warning(f"Job {job['id']} was requeued while it ran")
+    if state != QUEUE:
+        try:
+            os.remove(os.path.join(spool, QUEUE, f"{job['id']}.json"))
+        except FileNotFoundError:
+            logger.warning(f"Job {job['id']} was claimed again by another worker")
+
+
+def worker_loop(
+    spool: str,
+    worker: int,
+    poll: float = 0.5,
+    once: bool = False,
+    timeout: float = CLAIM_TIMEOUT,
+):
+    """
+    Process jobs from a spool until stopped (or until the queue is empty with
+    `once`). The interpreter, imports and decoded images stay warm between jobs.
+    Before every claim, the jobs of dead workers are put back on the queue.
+    """
+    init_spool(spool)
+    _logger.setLevel("INFO")
+    cache = ImageCache(cache_dir=os.path.join(spool, "cache"))
+    while True:
+        requeue_stale(spool, timeout)
+        job = claim(spool, worker)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll)
+            continue
+
+        logger.info(f"Worker {worker} running job {job['id']}")
+        job["started"] = time.time()
+        try:
+            job["result"] = run_job(spool, job, cache, worker)
+            state = DONE
+        except Exception:
+            job["error"] = traceback.format_exc()
+            state = FAILED
+        job["finished"] = time.time()
+
+        # the simulation turns SIGTERM into a clean stop, the worker stops too
+        interrupted = state == DONE and str(job["result"]["stop_reason"]).startswith(
+            "signal"
+        )
+        if interrupted:
+            # NOTE: queued again, the next run starts from the saved genome
+            state = QUEUE
+            del job["result"], job["finished"]
+            job["interrupted"] = job.get("interrupted", 0) + 1
+            job["resume"] = os.path.join(spool, JOBS, job["id"], "genome.bin")
+
+        finish(spool, job, state)
+        logger.info(f"Worker {worker} finished job {job['id']}: {state}")
+        if interrupted:
+            return
+
+
+class WorkerPool:
+    """
+    Pool of long-lived worker processes serving a spool directory
+    """
+
+    def __init__(
+        self,
+        spool: str,
+        workers: int | None = None,
+        poll: float = 0.5,
+        timeout: float = CLAIM_TIMEOUT,
+    ):
+        init_spool(spool)
+        self.spool = spool
+        self.workers = workers or os.cpu_count() or 1
+        self.poll = poll
+        self.timeout = timeout
+        self.processes: list[multiprocessing.Process] = []
+
+    def start(self, once: bool = False) -> None:
+        for worker in range(self.workers):
+            process = multiprocessing.Process(
+                target=worker_loop,
+                args=(self.spool, worker, self.poll, once, self.timeout),
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+
+    def join(self) -> None:
+        for process in self.processes:
+            process.join()
+
+    def stop(self) -> None:
+        for process in self.processes:
+            process.terminate()
+        self.join()
+
+
+parser = ArgumentParser(description="A local reconstruction job service")
+subparsers = parser.add_subparsers(dest="command", required=True)
+
+serve_parser = subparsers.add_parser("serve", help="Run workers on a spool")
+serve_parser.add_argument("spool", type=str, help="The spool directory")
+serve_parser.add_argument(
+    "-w", "--workers", type=int, default=None, help="Number of workers (default=cores)"
+)
+serve_parser.add_argument(
+    "--once",
+    action="store_true",
+    default=False,
+    help="Exit once the queue is empty (default=False)",
+)
+serve_parser.add_argument(
+    "--claim-timeout",
+    type=float,
+    default=CLAIM_TIMEOUT,
+    help="Requeue claimed jobs without a heartbeat for this many seconds (default=600)",
+)
+
+submit_parser = subparsers.add_parser("submit", help="Queue a job")
+submit_parser.add_argument("spool", type=str, help="The spool directory")
+submit_parser.add_argument("image", type=str, help="The path of the base image")
+submit_parser.add_argument(
+    "-c",
+    "--config",
+    type=str,
+    default="{}",
+    help='RunConfig fields as JSON, "save_frames" defaults to false',
+)
+
+status_parser = subparsers.add_parser("status", help="Show a job")
+status_parser.add_argument("spool", type=str, help="The spool directory")
+status_parser.add_argument("job_id", type=str, help="The job id")
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if args.command == "serve":
+        logger.addHandler(logging.StreamHandler())
+        pool = WorkerPool(args.spool, args.workers, timeout=args.claim_timeout)
+        pool.start(once=args.once)
+        try:
+            pool.join()
+        except KeyboardInterrupt:
+            pool.stop()
+    elif args.command == "submit":
+        config = RunConfig.from_dict({"save_frames": False, **json.loads(args.config)})
+        print(submit(args.spool, args.image, config))
+    else:
+        print(json.dumps(status(args.spool, args.job_id), indent=2))
@@ -1,23 +1,39 @@
-from src.custom_types import Polygon, Vertices, RGBA, Canvas
-from src.reconstruction import polygon_mutate
+from src.custom_types import Polygon, Vertices, Canvas, RGBA
+from src.reconstruction import polygon_mutate, random_color
+from src.scheduler import OperatorScheduler
+from src.stopping import StoppingCriteria
 from src.visualize import add_polygon
-
-import matplotlib.pyplot as mpl
-import matplotlib.patches
-import matplotlib.collections
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_agg import FigureCanvasAgg
+from src.genome import (
+    canvas_to_genome,
+    genome_to_canvas,
+    polygons_to_genome,
+    resize_genome,
+)
+from src.genome_io import load_genome
+from src.render import MASKS, render_sad, window_diff
+from src.replay import Trajectory
+from src.population import PopulationEngine
+from src.polish import optimal_colors
+from src.prune import negligible
+from src.candidates import best_candidate, sample_vertices
+from src.metrics import MetricsPublisher, summary
+from src.memory import GenerationStore, MemoryBudget, describe
+from src.config import RunConfig
+from src.output import FolderOutput
 
 from src.loss import complete_percent, sad
-from PIL import Image
+from src.image_cache import convert_color, load_image, prepare_image
 from copy import deepcopy
 import src.log_trace
 import logging
 from numpy import array
 import numpy as np
+import importlib.util
 import time
 import os
+import signal
 import sys
+import threading
 
 
 _logger = logging.getLogger("__main__")
@@ -26,50 +42,115 @@ logger = _logger.getChild(__name__)
 
 
 class Simulation:
-    def __init__(self, folder_path, **kwargs):
+    def __init__(
+        self,
+        folder_path: str | None = None,
+        config: RunConfig | None = None,
+        output=None,
+        **kwargs,
+    ):
         """
         Init simulation.
+
+        Args:
+            folder_path (str | None): Folder to write frames and results to.
+              Ignored if an `output` is given; with neither, nothing is
+              written.
+            config (RunConfig | None): Run parameters. Defaults to a config
+              built from the legacy keywords below.
+            output: Object receiving frames and results, see `FolderOutput`.
+
         Keywords:
-            - Base image
+            - Base image (path or preprocessed array)
             - Output image
             - Max generations / polygons
             - Stagnation limit
             - Number evaluations
             - Number Verticies
+            - Color mode ("rgb" or "gray")
             - Min save
+            - Adaptive mutation operators
+            - Time limit, target complete percent, plateau window / threshold
+            - Save frames (write a PNG per iteration, the trajectory is always
+              kept)
+            - Initial genome (warm start from a genome array, canvas or saved
+              genome file) and the size of its canvas
         """
-        self.base_image: np.ndarray = np.asarray(
-            Image.open(kwargs.get("b_image", "./img/windows.jpg"))
-        )
-        self.base_image = self.base_image[
-            : self.base_image.shape[0] - 1
-            if self.base_image.shape[0] % 2 == 1
-            else self.base_image.shape[0],
-            : self.base_image.shape[1] - 1
-            if self.base_image.shape[1] % 2 == 1
-            else self.base_image.shape[1],
-            :,
-        ]
+        if config is None:
+            config = RunConfig.from_kwargs(kwargs)
+        self.config = config
+        if config.seed is not None:
+            np.random.seed(config.seed)
+
+        b_image = kwargs.get("b_image", "./img/windows.jpg")
+        if isinstance(b_image, np.ndarray):
+            # NOTE: arrays (e.g. a SharedImage view) are used as is, no copy
+            self.base_image: np.ndarray = prepare_image(b_image)
+        else:
+            self.base_image = load_image(b_image)
+        # NOTE: gray runs work on a single (H, W, 1) luma channel
+        self.color_mode: str = config.color_mode
+        self.base_image = convert_color(self.base_image, self.color_mode)
+        self.channels: int = self.base_image.shape[2]
         self.height, self.width = self.base_image.shape[:2]
 
-        self.max_polygons: int = kwargs.get("m_poly", 10)
-        self.stagnation_limit: int = kwargs.get("stag_lim", 100)
-        self.n_vertices: int = kwargs.get("n_vert", 3)
+        self.max_polygons: int = config.max_polygons
+        self.stagnation_limit: int = config.stagnation_limit
+        self.n_vertices: int = config.n_vertices
         # NOTE: this value is from the paper
         # Derived class variables
-        self.num_evals: int = kwargs.get("n_evals", 50000)
-        self.min_save: bool = kwargs.get("min_save", True)
-        self.height, self.width = self.base_image.shape[:2]
+        self.num_evals: int = config.max_evaluations
+        self.min_save: bool = config.min_save
+        self.save_frames: bool = config.save_frames
+        self.scheduler = OperatorScheduler(adaptive=config.adaptive_mutation)
+        self.stats_interval: int = config.stats_interval
+        self.polish_interval: int | None = config.polish_interval
+        self.prune_interval: int | None = config.prune_interval
+        self.culled: int = 0
+        self.insert_candidates: int = config.insert_candidates
+        self.renderer: str = config.renderer
+        if self.renderer == "numba" and importlib.util.find_spec("numba") is None:
+            logger.warning("numba is not installed, using the numpy renderer")
+            self.renderer = "numpy"
+        self.threads: int = config.threads or os.cpu_count() or 1
+        # NOTE: per pixel diff maps and losses of the last parent and child
+        self.rendered: dict[bytes, tuple[np.ndarray, int]] = {}
+        # NOTE: hit and miss counters are per run
+        MASKS.reset(config.mask_cache)
+        self.stopping = StoppingCriteria(
+            max_evals=self.num_evals,
+            time_limit=config.time_limit,
+            target_percent=config.target_percent,
+            plateau_window=config.plateau_window,
+            plateau_threshold=config.plateau_threshold,
+        )
+        self.stop_reason: str | None = None
+        self._stop_signal: int | None = None
+        self.iterations: int = 0
+        self.loss: float | None = None
+        self.metrics: MetricsPublisher | None = None
+        self.memory: MemoryBudget | None = None
 
         self.canvas = Canvas(
             sequence=list(),
             height=self.base_image.shape[0],
             width=self.base_image.shape[1],
+            renderer=self.renderer,
+            threads=self.threads,
         )
         self.counter = 0
-        self.canvas = self.create_polygon(self.canvas)
+        init_genome = kwargs.get("init_genome")
+        if init_genome is None:
+            self.canvas = self.create_polygon(self.canvas)
+            self.generations = GenerationStore([deepcopy(self.canvas)])
+        else:
+            # warm start, e.g. from a cached run or a run with fewer polygons
+            self.canvas = self.warm_start(init_genome, kwargs.get("init_size"))
 
         self.folder_path = folder_path
+        if output is None and folder_path is not None:
+            output = FolderOutput(folder_path, self.num_evals)
+        self.output = output
         logger.info(f"Initialize simulation")
 
     def update_probabilities(
@@ -103,20 +184,149 @@ class Simulation:
         """
         Evaluate an image to the base_image and return the SAD
         """
-        return sad(self.base_image, image.image())
+        if image.renderer == "numpy":
+            # NOTE: rendered and reduced band by band on the thread pool
+            genome = canvas_to_genome(image, self.n_vertices)
+            return render_sad(genome, self.base_image, image.threads)
+        if image.renderer == "numba":
+            # NOTE: imported here, numba takes longer to load than the rest
+            from src import render_jit
+
+            genome = canvas_to_genome(image, self.n_vertices)
+            return render_jit.render_sad(genome, self.base_image, image.threads)
+        return sad(self.base_image, self.image_of(image))
+
+    def image_of(self, canvas: Canvas) -> np.ndarray:
+        """
+        Render a canvas with the channels of the base image
+        """
+        return canvas.image()[:, :, : self.channels]
+
+    def polish_colors(self, canvas: Canvas, loss: float) -> tuple[Canvas, float]:
+        """
+        Set every polygon's color to its closed-form optimum (see
+        `src.polish.optimal_colors`), keeping the result only if it lowers
+        the loss
+        """
+        genome = optimal_colors(
+            canvas_to_genome(canvas, self.n_vertices), self.base_image
+        )
+        polished = deepcopy(canvas)
+        for polygon, gene in zip(polished.sequence, genome):
+            polygon.set_facecolor(tuple(gene[-4:]))
+        polished_loss = self.eval_loss(polished)
+        logger.info(f"Color polish: loss {loss} -> {polished_loss}")
+        if polished_loss < loss:
+            return polished, polished_loss
+        return canvas, loss
+
+    def prune(self, canvas: Canvas, loss: float) -> tuple[Canvas, float]:
+        """
+        Remove the polygons that don't contribute to the rendering (see
+        `src.prune.negligible`), keeping the result only if the loss doesn't
+        get worse.
+
+        Evaluations then only pay for visible polygons, and the freed slots
+        are refilled with energy map polygons by the progressive addition of
+        the main loop.
+        """
+        genome = canvas_to_genome(canvas, self.n_vertices)
+        culled = negligible(genome, self.width, self.height)
+        rows = sorted(row for causes in culled.values() for row in causes)
+        if not rows or len(rows) == len(genome):
+            return canvas, loss
+
+        pruned = deepcopy(canvas)
+        pruned.remove(rows)
+        pruned_loss = self.eval_loss(pruned)
+        causes = ", ".join(f"{len(v)} {k}" for k, v in culled.items() if v)
+        if pruned_loss > loss:
+            logger.info(
+                f"Prune: kept {len(rows)} polygons ({causes}), "
+                f"loss {loss} -> {pruned_loss}"
+            )
+            return canvas, loss
 
-    def cc_loss(self, parent: Canvas, child: Canvas) -> tuple[float, float]:
+        self.culled += len(rows)
+        logger.info(
+            f"Prune: culled {len(rows)} polygons ({causes}), "
+            f"loss {loss} -> {pruned_loss}"
+        )
+        # NOTE: keep optimizing every remaining polygon uniformly
+        count = pruned.how_many()
+        self.probabilities = [1 / count] * count
+        return pruned, pruned_loss
+
+    def cc_loss(
+        self, parent: Canvas, child: Canvas, changed: int | None = None
+    ) -> tuple[float, float]:
         """
-        Compute and compare loss
+        Compute and compare loss; with the id of the `changed` polygon and the
+        numpy renderer, both come from `dirty_loss`
         """
 
         # compute the loss of the child iteration with the parent
-        l_parent = self.eval_loss(parent)
-        l_child = self.eval_loss(child)
+        if changed is not None and self.renderer == "numpy":
+            l_parent, l_child = self.dirty_loss(parent, child, changed)
+        else:
+            l_parent = self.eval_loss(parent)
+            l_child = self.eval_loss(child)
 
         logger.debug(f"parent: {l_parent} | child: {l_child}")
         return l_parent, l_child
 
+    def diff_map(self, canvas: Canvas) -> tuple[bytes, np.ndarray, int]:
+        """
+        Genome key, per pixel diff map and loss of a canvas, rendered in full
+        unless it is the parent or child of the last `dirty_loss`
+        """
+        genome = canvas_to_genome(canvas, self.n_vertices)
+        key = genome.tobytes()
+        if key not in self.rendered:
+            diff = window_diff(genome, self.base_image, (0, self.height, 0, self.width))
+            self.rendered = {key: (diff, int(diff.sum(dtype=np.int64)))}
+        return key, *self.rendered[key]
+
+    def dirty_loss(
+        self, parent: Canvas, child: Canvas, changed: int
+    ) -> tuple[int, int]:
+        """
+        Losses of a parent and of a child that differs from it in one polygon,
+        or in the order of two: the parent's diff map is reused and only the
+        window around the changed polygons is rendered for the child, with the
+        polygons the spatial index finds overlapping it. Pixels are composited
+        as in `render_sad`, so both equal a full evaluation.
+        """
+        key, diff, l_parent = self.diff_map(parent)
+        touched = [
+            parent.sequence[parent.get_index(changed)],
+            child.sequence[child.get_index(changed)],
+        ]
+        for old, new in zip(parent.sequence, child.sequence):
+            if old.id != new.id:
+                touched += [old, new]
+        boxes = np.array([polygon.bounds() for polygon in touched])
+        x_min, y_min = boxes[:, :2].min(axis=0)
+        x_max, y_max = boxes[:, 2:].max(axis=0)
+
+        # NOTE: pixel rows point down, data y points up
+        c0, c1 = max(int(np.floor(x_min)), 0), min(int(np.ceil(x_max)), self.width)
+        r0 = max(int(np.floor(self.height - y_max)), 0)
+        r1 = min(int(np.ceil(self.height - y_min)), self.height)
+        child_diff = diff
+        if c0 < c1 and r0 < r1:
+            rect = (c0, self.height - r1, c1, self.height - r0)
+            genome = polygons_to_genome(child.overlapping(rect), self.n_vertices)
+            child_diff = diff.copy()
+            child_diff[r0:r1, c0:c1] = window_diff(
+                genome, self.base_image, (r0, r1, c0, c1)
+            )
+        l_child = int(child_diff.sum(dtype=np.int64))
+
+        child_key = canvas_to_genome(child, self.n_vertices).tobytes()
+        self.rendered = {key: (diff, l_parent), child_key: (child_diff, l_child)}
+        return l_parent, l_child
+
     def select(
         self,
     ) -> Polygon:
@@ -138,47 +348,186 @@ class Simulation:
         """
         Create polygon and add it to the canvas
         """
-        picked_verts = vertices_em(
-            self.base_image,
-            self.canvas.image(),
-        )
-        polygon = Polygon(
-            picked_verts,
-            RGBA(
-                np.random.rand(),
-                np.random.rand(),
-                np.random.rand(),
-                np.random.rand(),
-            ),
-            _id=c.how_many(),
-        )
+        polygon = self.energy_polygon(self.image_of(self.canvas), _id=c.how_many())
         c = add_polygon(canvas=c, polygon=polygon)
 
         # self.counter = 0
         self.update_probabilities()
         return c
 
+    def energy_polygon(self, below: np.ndarray, _id: int) -> Polygon:
+        """
+        New polygon from the energy map of the base image and `below`, the
+        rendering it is drawn on. With `insert_candidates` over 1, the best of
+        that many candidates with optimal colors (see
+        `src.candidates.best_candidate`), otherwise one with a random color.
+        """
+        if self.insert_candidates > 1:
+            found = best_candidate(
+                self.base_image,
+                below,
+                get_energy_map(self.base_image, below),
+                self.n_vertices,
+                self.insert_candidates,
+            )
+            if found is not None:
+                gene, n = found[0], self.n_vertices
+                return Polygon(
+                    Vertices(gene[:n], gene[n : 2 * n]), RGBA(*gene[-4:]), _id=_id
+                )
+        return Polygon(
+            vertices_em(self.base_image, below, self.n_vertices),
+            random_color(self.color_mode),
+            _id=_id,
+        )
+
+    def warm_start(
+        self,
+        init: "np.ndarray | Canvas | str",
+        size: tuple[int, int] | None = None,
+    ) -> Canvas:
+        """
+        Start from existing polygons instead of a single new polygon.
+
+        The generations are rebuilt as if the polygons had been added one by
+        one (generation i holds the first i polygons), so a later reinit rolls
+        back to the previous polygon count like in a regular run.
+
+        Args:
+            init (np.ndarray | Canvas | str): Genome array, canvas, or path of
+              a saved genome (see `src.genome_io`).
+            size (tuple[int, int] | None): (width, height) of the canvas a
+              genome array lives on. Defaults to the size of the base image;
+              canvases and files carry their own size.
+
+        Returns:
+            Canvas: Canvas holding the (resized) polygons, at most
+              `max_polygons` of them.
+        """
+        if isinstance(init, str):
+            genome, width, height = load_genome(init)
+        elif isinstance(init, Canvas):
+            genome = canvas_to_genome(init, self.n_vertices)
+            width, height = init.width, init.height
+        else:
+            genome = np.asarray(init, dtype=np.float32)
+            width, height = size or (self.width, self.height)
+        if (width, height) != (self.width, self.height):
+            logger.info(
+                f"Resizing genome from {width}x{height} to {self.width}x{self.height}"
+            )
+            genome = resize_genome(genome, width, height, self.width, self.height)
+        genome = genome[: self.max_polygons]
+        if len(genome) == 0:
+            raise ValueError("Cannot warm start from an empty genome")
+
+        def canvas_of(count: int) -> Canvas:
+            canvas = genome_to_canvas(genome[:count], self.width, self.height)
+            canvas.renderer = self.renderer
+            canvas.threads = self.threads
+            return canvas
+
+        canvas = canvas_of(len(genome))
+        # NOTE: a regular run keeps the first polygon as it was initialized and
+        # then the canvas before every polygon addition
+        self.generations = GenerationStore(
+            [canvas_of(1)] + [canvas_of(i) for i in range(1, len(genome))]
+        )
+        logger.info(f"Warm start from {canvas.how_many()} polygons")
+
+        self.canvas = canvas
+        if canvas.how_many() == self.max_polygons:
+            self.norm_opti_probs()
+        else:
+            self.update_probabilities()
+        return canvas
+
+    def request_stop(self, signum: int, frame=None) -> None:
+        """
+        Signal handler: finish the current iteration, then stop the run
+        """
+        logger.warning(f"Received signal {signum}, stopping after this iteration")
+        self._stop_signal = signum
+
     def run(
         self,
     ):
         """
-        Run the simulation until completion.
+        Run the simulation until one of the stopping criteria is met.
+
+        The optimizer is the paper's (1+1) hill climber, or with
+        `optimizer="es"` a population, see `src.population.PopulationEngine`.
+
+        SIGTERM, SIGINT and SIGUSR1 (sent by SGE ahead of `h_rt`) stop the run
+        cleanly after the current iteration, so results can still be written.
+
+        With `metrics_file` or `metrics_port` set, live metrics are published
+        every `metrics_interval` seconds, see `src.metrics.MetricsPublisher`.
+        With `memory_budget` set, the run spills to disk and then stops
+        cleanly rather than exceed it, see `src.memory.MemoryBudget`.
         """
 
         # initialize vars
         t = 0
+        self.stop_reason = None
+        self._stop_signal = None
+        self.stopping.start()
+        blank_loss = float(np.sum(self.base_image))
 
-        self.generations = [deepcopy(self.canvas)]
+        self.trajectory = Trajectory(self.width, self.height)
+        self.trajectory.record(t, canvas_to_genome(self.canvas, self.n_vertices))
 
-        newer_solution = None
-        older_solution = None
-        is_reinit = False
         # get loss of current solution
         v_k = self.eval_loss(self.canvas)
         # print(self.num_evals)
         logger.info(f"Running Simulation, baseline loss: {v_k}")
 
-        while t <= self.num_evals:
+        if self.config.metrics_file is not None or self.config.metrics_port is not None:
+            self.metrics = MetricsPublisher(
+                path=self.config.metrics_file,
+                port=self.config.metrics_port,
+                interval=self.config.metrics_interval,
+                run=os.path.basename(self.folder_path) if self.folder_path else None,
+            )
+        if self.config.memory_budget is not None:
+            self.memory = MemoryBudget(self.config.memory_budget)
+
+        previous_handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1):
+                previous_handlers[signum] = signal.signal(signum, self.request_stop)
+        try:
+            if self.config.optimizer == "es":
+                PopulationEngine(
+                    self, parents=self.config.parents, offspring=self.config.offspring
+                ).run(t, v_k, blank_loss)
+            else:
+                self._run_loop(t, v_k, blank_loss)
+            if self.metrics is not None:
+                # NOTE: the textfile keeps the final values, the HTTP endpoint
+                # serves them until it is closed below, when the run returns
+                self.metrics.update(self, self.iterations, self.loss, force=True)
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+            if self.metrics is not None:
+                self.metrics.close()
+                self.metrics = None
+
+        logger.info(f"Operator stats: {self.scheduler.summary()}")
+        logger.warning(f"Simulation Complete: {self.stop_reason}")
+        logger.warning(f"Summary: {summary(self)}")
+        logger.warning(f"Memory: {describe(self)}")
+
+    def _run_loop(self, t: int, v_k: float, blank_loss: float):
+        """
+        Main ProHC-EM loop, see `run`
+        """
+        newer_solution = None
+        older_solution = None
+        is_reinit = False
+
+        while True:
             logger.info(
                 f"time:{t}, Polygons: {self.canvas.how_many()}, baseline loss {v_k}"
             )
@@ -187,24 +536,42 @@ class Simulation:
 
                 # use temporary variables to store previous and current solutions
                 older_solution = deepcopy(self.canvas)
-                newer_solution = polygon_mutate(self.canvas, selected_polygon)
+                operator = self.scheduler.choose()
+                start = time.perf_counter()
+                newer_solution = polygon_mutate(
+                    self.canvas,
+                    selected_polygon,
+                    mode=operator,
+                    step=self.scheduler.step(operator),
+                    color_mode=self.color_mode,
+                )
 
                 # compare and compute the child with the parent loss
-                l_parent, l_child = self.cc_loss(older_solution, newer_solution)
+                l_parent, l_child = self.cc_loss(
+                    older_solution, newer_solution, selected_polygon.id
+                )
+                self.scheduler.report(
+                    operator,
+                    l_child < l_parent,
+                    float(l_parent) - float(l_child),
+                    time.perf_counter() - start,
+                )
 
                 # compare loss
                 if l_child < l_parent:
                     self.counter = 0
+                    loss = l_child
                     # pushing the better solution
                     self.canvas = newer_solution
                     if not self.min_save:
-                        self.save_image(t)
+                        self.save_frame(t)
                 else:
                     self.counter += 1
+                    loss = l_parent
                     # keep the old canvas
                     self.canvas = older_solution
                 if self.min_save:
-                    self.save_image(t)
+                    self.save_frame(t)
 
             else:
                 # NOTE: this is the reinit case
@@ -214,19 +581,36 @@ class Simulation:
                 older_solution = deepcopy(self.generations[-1])
                 reinit_solution = self.canvas
                 l_parent, l_reinit = self.cc_loss(older_solution, reinit_solution)
+                loss = l_reinit
 
                 # compare loss
                 if l_reinit < l_parent:
                     self.counter = 0
                     if self.min_save:
-                        self.save_image(t)
+                        self.save_frame(t)
                     is_reinit = False
                 else:
                     self.counter += 1
                 if not self.min_save:
-                    self.save_image(t)
+                    self.save_frame(t)
 
             t += 1
+            if self.polish_interval and t % self.polish_interval == 0:
+                self.canvas, loss = self.polish_colors(self.canvas, loss)
+            if not is_reinit and self.prune_interval and t % self.prune_interval == 0:
+                count = self.canvas.how_many()
+                self.canvas, loss = self.prune(self.canvas, loss)
+                if self.canvas.how_many() < count:
+                    # NOTE: a reinit rolls back to the last generation, which
+                    # must not bring the culled polygons back
+                    self.generations[-1] = deepcopy(self.canvas)
+            self.trajectory.record(t, canvas_to_genome(self.canvas, self.n_vertices))
+            if self.metrics is not None:
+                self.metrics.update(self, t, float(loss))
+            if t % self.stats_interval == 0:
+                logger.info(f"Operator stats: {self.scheduler.summary()}")
+                if self.output is not None:
+                    self.output.progress(self, t, float(loss))
 
             if (self.counter > self.stagnation_limit) and (
                 self.canvas.how_many() < self.max_polygons
@@ -250,21 +634,13 @@ class Simulation:
                     #  This is attempting to perform a rollback
                     is_reinit = True
                     previous_generation = deepcopy(self.generations[-1])
-                    picked_verts = vertices_em(
-                        self.base_image,
-                        previous_generation.image(),
-                    )
 
                     if previous_generation.how_many() == 1:
                         logger.warn("Only one polygon in the canvas.")
-                        reinit_polygon = Polygon(
-                            picked_verts,
-                            RGBA(
-                                np.random.rand(),
-                                np.random.rand(),
-                                np.random.rand(),
-                                np.random.rand(),
-                            ),
+                        # NOTE: the polygon replaces the only one, it is drawn
+                        # on the blank canvas
+                        reinit_polygon = self.energy_polygon(
+                            np.full_like(self.base_image, 255),
                             _id=0,  # Set the id to 0 to replace the only polygon
                         )
                         self.canvas.replace_polygon(reinit_polygon)
@@ -272,14 +648,8 @@ class Simulation:
                     # reinitializing a polygon onto the canvas
 
                     else:
-                        reinit_polygon = Polygon(
-                            picked_verts,
-                            RGBA(
-                                np.random.rand(),
-                                np.random.rand(),
-                                np.random.rand(),
-                                np.random.rand(),
-                            ),
+                        reinit_polygon = self.energy_polygon(
+                            self.image_of(previous_generation),
                             _id=previous_generation.how_many(),
                         )
                         self.canvas = add_polygon(
@@ -298,7 +668,28 @@ class Simulation:
                 # send the rest of our cycles optimizing all polygons
                 self.norm_opti_probs()
 
-        logger.warn("Simulation Complete")
+            if self._stop_signal is not None:
+                self.stop_reason = f"signal {self._stop_signal}"
+            else:
+                self.stop_reason = self.stopping.check(
+                    t,
+                    float(loss),
+                    blank_loss,
+                    optimizing=self.canvas.how_many() == self.max_polygons,
+                )
+            if self.stop_reason is None and self.memory is not None:
+                self.stop_reason = self.memory.check(self, t)
+            if self.stop_reason is not None:
+                self.iterations = t
+                self.loss = float(loss)
+                return
+
+    def save_frame(self, t: int):
+        """
+        Save the frame of iteration t, unless frames are turned off
+        """
+        if self.save_frames and self.output is not None:
+            self.output.frame(t, self.canvas)
 
     def save_image(self, t: int | str, *, data: Canvas | None = None):
         """
@@ -306,24 +697,8 @@ class Simulation:
         """
         if data is None:
             data = self.canvas
-        # NOTE: this is for debugging purposes
-        fig = Figure(figsize=(self.width / 100, self.height / 100), dpi=100)
-        canvas_agg = FigureCanvasAgg(fig)
-
-        ax = fig.add_subplot()
-        ax.axis("off")
-        ax.set_xlim(0, self.width)
-        ax.set_ylim(0, self.height)
-        ax.add_collection(
-            matplotlib.collections.PatchCollection(data.sequence, match_original=True)
-        )
-        canvas_agg.draw()
-        logger.info(
-            f"Writing image to disc, '{self.folder_path}/{str(t).zfill(len(str(self.num_evals)))}.png'"
-        )
-        canvas_agg.print_figure(
-            f"{self.folder_path}/{str(t).zfill(len(str(self.num_evals)))}.png",
-        )
+        if self.output is not None:
+            self.output.save_image(t, data)
 
     def write_results(
         self,
@@ -333,16 +708,8 @@ class Simulation:
         Save the results of the simulation to disk
         if generations is made true, save all the saved generations up to the final result
         """
-        self.save_image(
-            t="output",
-        )
-        # visualize_canvas(self.canvas)
-        logger.debug(f"Include generations: {include_generations}")
-        if include_generations:
-            for num, generation in enumerate(self.generations):
-                self.save_image(t=f"generation_{num}", data=generation)
-
-        return
+        if self.output is not None:
+            self.output.results(self, include_generations)
 
 
 def make_folder_path(
@@ -372,14 +739,17 @@ def get_energy_map(source: np.ndarray, recon: np.ndarray) -> np.ndarray:
         np.ndarray: Supplementary matrix of cumulative energy values of each
         pixel.
     """
+    # NOTE: signed ints, a uint8 difference wraps around below zero
+    pixel_e = np.abs(source.astype(np.int32) - recon.astype(np.int32)).sum(axis=2)
+
     # Compute for total difference
-    cumulative_e = np.sum(np.absolute(source - recon))
+    cumulative_e = pixel_e.sum()
+    if cumulative_e == 0:
+        # a perfect reconstruction has no energy left, sample uniformly
+        pixel_e = np.ones_like(pixel_e)
+        cumulative_e = pixel_e.size
 
     # Compute for pixel-wise probability
-    pixel_e = 0
-    for channel in [0, 1, 2]:
-        pixel_e += np.absolute(source[:, :, channel] - recon[:, :, channel])
-
     prob_matrix = pixel_e / cumulative_e
 
     # Supplementary matrix is the cumulative sum of probabilities
@@ -394,25 +764,15 @@ def vertices_em(source: np.ndarray, recon: np.ndarray, n_vertices: int = 3) -> V
     Args:
         source (np.ndarray): Source image as ndarray.
         recon (np.ndarray): Reconstructed image as ndarray.
-        n_vertices (int): Number of vertices. Defaults to
+        n_vertices (int): Number of vertices. Defaults to 3.
 
     Returns:
         Vertices: A set of vertices chosen based on the energy map.
     """
     matrix = get_energy_map(source, recon)
-    x = []
-    y = []
-    for _ in range(n_vertices):
-        threshold = np.random.rand()
-        raw_index = np.argmax(matrix > threshold)
-
-        # TODO: check if this is relevant in final logs
-        logger.debug(f"Raw Index: {raw_index}")
-        x_new = raw_index // source.shape[0]
-        y_new = raw_index % source.shape[1]
-        x.append(x_new)
-        y.append(y_new)
+    # NOTE: the map is row-major (H, W), vertices are in data coordinates
+    points = sample_vertices(matrix, 1, n_vertices)[0]
     logger.debug("Energy Mapping finished")
-    point = Vertices(np.array(x), np.array(y))
+    point = Vertices(points[:n_vertices], points[n_vertices:])
     logger.debug(point)
     return point
@@ -0,0 +1,112 @@
+from collections import defaultdict
+
+Box = tuple[float, float, float, float]  # (x_min, y_min, x_max, y_max)
+
+CELL_SIZE = 16  # NOTE: in canvas units, about the size of a small triangle
+
+
+def boxes_overlap(a: Box, b: Box) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class GridIndex:
+    """
+    Uniform grid of buckets over a canvas.
+
+    Every bucket lists the keys (polygon ids) whose bounding box touches its
+    cell, so a rectangle query only looks at the polygons near it instead of
+    the whole sequence. Boxes outside of the canvas are clamped to the border
+    cells.
+    """
+
+    def __init__(self, width: int, height: int, cell: int = CELL_SIZE):
+        self.cell = cell
+        self.cols = max(-(-int(width) // cell), 1)
+        self.rows = max(-(-int(height) // cell), 1)
+        self._cells: defaultdict[tuple[int, int], set[int]] = defaultdict(set)
+        self._boxes: dict[int, Box] = {}
+        self._spans: dict[int, tuple[int, int, int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def __deepcopy__(self, memo) -> "GridIndex":
+        # NOTE: boxes and spans are tuples, only the buckets need new sets;
+        # canvases (and their index) are copied on every iteration
+        copy = GridIndex.__new__(GridIndex)
+        copy.cell, copy.cols, copy.rows = self.cell, self.cols, self.rows
+        copy._cells = defaultdict(set, {k: set(v) for k, v in self._cells.items()})
+        copy._boxes = dict(self._boxes)
+        copy._spans = dict(self._spans)
+        memo[id(self)] = copy
+        return copy
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._boxes
+
+    def _span(self, box: Box) -> tuple[int, int, int, int]:
+        """
+        First and last column / row of the cells touched by a box
+        """
+
+        def clamp(value: float, last: int) -> int:
+            return min(max(int(value // self.cell), 0), last)
+
+        return (
+            clamp(box[0], self.cols - 1),
+            clamp(box[1], self.rows - 1),
+            clamp(box[2], self.cols - 1),
+            clamp(box[3], self.rows - 1),
+        )
+
+    def _cells_of(self, span: tuple[int, int, int, int]):
+        c0, r0, c1, r1 = span
+        for col in range(c0, c1 + 1):
+            for row in range(r0, r1 + 1):
+                yield (col, row)
+
+    def insert(self, key: int, box: Box) -> None:
+        span = self._span(box)
+        for cell in self._cells_of(span):
+            self._cells[cell].add(key)
+        self._boxes[key] = box
+        self._spans[key] = span
+
+    def remove(self, key: int) -> None:
+        for cell in self._cells_of(self._spans.pop(key)):
+            bucket = self._cells[cell]
+            bucket.discard(key)
+            if not bucket:
+                del self._cells[cell]
+        del self._boxes[key]
+
+    def update(self, key: int, box: Box) -> None:
+        """
+        Move a key to a new box, only touching the buckets that changed
+        """
+        if key not in self._boxes:
+            self.insert(key, box)
+            return
+        span = self._span(box)
+        old_span = self._spans[key]
+        if span != old_span:
+            old_cells = set(self._cells_of(old_span))
+            new_cells = set(self._cells_of(span))
+            for cell in old_cells - new_cells:
+                bucket = self._cells[cell]
+                bucket.discard(key)
+                if not bucket:
+                    del self._cells[cell]
+            for cell in new_cells - old_cells:
+                self._cells[cell].add(key)
+            self._spans[key] = span
+        self._boxes[key] = box
+
+    def query(self, box: Box) -> set[int]:
+        """
+        Keys whose bounding box overlaps a box
+        """
+        found = set()
+        for cell in self._cells_of(self._span(box)):
+            found.update(self._cells.get(cell, ()))
+        return {key for key in found if boxes_overlap(self._boxes[key], box)}
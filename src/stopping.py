@@ -0,0 +1,98 @@
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from src.loss import percent_of
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+
+def parse_duration(value: str) -> float:
+    """
+    Parse a duration given in seconds or as `HH:MM:SS` (like SGE's `h_rt`)
+
+    Args:
+        value (str): Duration such as "3600", "90.5" or "12:00:00".
+
+    Returns:
+        float: Duration in seconds.
+    """
+    seconds = 0.0
+    for part in value.split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+@dataclass
+class StoppingCriteria:
+    """
+    Budgets that end a simulation run, whichever is hit first.
+
+    - `max_evals`: global iteration limit (the paper's only criterion)
+    - `time_limit`: wall-clock budget in seconds
+    - `target_percent`: stop once `complete_percent` reaches this value
+    - `plateau_window` / `plateau_threshold`: once all polygons are placed,
+      stop if the loss improved by less than `plateau_threshold` percent of
+      the blank canvas loss over the last `plateau_window` iterations
+    """
+
+    max_evals: int = 50000
+    time_limit: float | None = None
+    target_percent: float | None = None
+    plateau_window: int | None = None
+    plateau_threshold: float = 0.01
+
+    _start: float = field(default=0.0, init=False, repr=False)
+    _history: deque = field(default_factory=deque, init=False, repr=False)
+
+    def start(self) -> None:
+        """
+        Reset the clock and loss history at the start of a run
+        """
+        self._start = time.monotonic()
+        self._history.clear()
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since `start()`"""
+        return time.monotonic() - self._start
+
+    def check(
+        self, t: int, loss: float, blank_loss: float, optimizing: bool = True
+    ) -> str | None:
+        """
+        Check the budgets after an iteration.
+
+        Args:
+            t (int): Number of completed global iterations.
+            loss (float): Loss of the current solution.
+            blank_loss (float): Loss of a blank canvas, used to express the
+              loss as a complete percentage.
+            optimizing (bool): Whether the max number of polygons is reached,
+              which enables the plateau check.
+
+        Returns:
+            str | None: Reason to stop, or None to keep running.
+        """
+        if t > self.max_evals:
+            return f"max evaluations ({self.max_evals}) reached"
+
+        if self.time_limit is not None and self.elapsed >= self.time_limit:
+            return f"time limit ({self.time_limit:.0f}s) reached"
+
+        percent = percent_of(loss, blank_loss)
+        if self.target_percent is not None and percent >= self.target_percent:
+            return f"target complete percent ({self.target_percent}%) reached"
+
+        if self.plateau_window and optimizing:
+            self._history.append(percent)
+            if len(self._history) > self.plateau_window:
+                gain = percent - self._history.popleft()
+                if gain < self.plateau_threshold:
+                    return (
+                        f"plateau: {gain:.4f}% gained over the last "
+                        f"{self.plateau_window} iterations"
+                    )
+        return None
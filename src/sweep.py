@@ -0,0 +1,356 @@
+import csv
+import itertools
+import json
+import logging
+import math
+import os
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+from src.config import RunConfig
+from src.image_cache import ImageCache, SharedImage, convert_color
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+# NOTE: a stop for any other reason (target reached, plateau, ...) finishes a
+# trial early, it is not resumed at the next rung
+BUDGET_STOP = "max evaluations"
+
+# shared images this worker process is attached to, by name
+_attached: dict[str, SharedImage] = {}
+
+
+@dataclass
+class Trial:
+    """
+    One point of the search space and its progress through the rungs
+    """
+
+    id: int
+    params: dict
+    config: RunConfig
+    # per image: genome to resume from, loss and complete percentage
+    genomes: dict = field(default_factory=dict)
+    losses: dict = field(default_factory=dict)
+    percents: dict = field(default_factory=dict)
+    evaluations: int = 0
+    rung: int = 0
+    finished: bool = False
+
+    @property
+    def score(self) -> float:
+        """Mean complete percentage over the images, higher is better"""
+        return float(np.mean(list(self.percents.values()))) if self.percents else -math.inf
+
+
+def grid(space: dict) -> list[dict]:
+    """
+    Every combination of a grid space, `{"max_polygons": [50, 100], ...}`
+    """
+    names = sorted(space)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(space[n] for n in names))
+    ]
+
+
+def sample(space: dict, samples: int, rng: np.random.Generator) -> list[dict]:
+    """
+    Random points of a space: a list is a set of choices, `{"low": .., "high":
+    .., "log": bool}` a (log-)uniform range, integer if both bounds are
+    """
+
+    def draw(spec):
+        if isinstance(spec, list):
+            return spec[rng.integers(len(spec))]
+        low, high = spec["low"], spec["high"]
+        if spec.get("log", False):
+            value = math.exp(rng.uniform(math.log(low), math.log(high)))
+        else:
+            value = rng.uniform(low, high)
+        return round(value) if isinstance(low, int) and isinstance(high, int) else value
+
+    return [{name: draw(spec) for name, spec in sorted(space.items())} for _ in range(samples)]
+
+
+def share_images(
+    images: list[str], color_modes: set[str]
+) -> dict[tuple[str, str], SharedImage]:
+    """
+    Decode every image once and put it in shared memory, converted to every
+    color mode the trials use
+    """
+    cache = ImageCache()
+    return {
+        (image, mode): SharedImage.create(convert_color(cache.get(image), mode))
+        for image in images
+        for mode in sorted(color_modes)
+    }
+
+
+def run_segment(
+    image: tuple, config: dict, evaluations: int, genome: np.ndarray | None
+) -> tuple[np.ndarray, float, float, int, str | None]:
+    """
+    Run (or resume from `genome`) one trial on one image for `evaluations`
+    more evaluations (run in a worker process).
+
+    The image is the handle of a `SharedImage`, already converted to the
+    trial's color mode. A worker attaches to it once and keeps the mapping
+    for the next segments, so no worker holds a copy of the pixels.
+
+    NOTE: a segment is a new `Simulation` warm started from the genome, so
+    its stagnation counter, the baseline loss of the last polygon addition and
+    the operator scheduler start over at every rung: a trial's
+    `stagnation_limit` only acts within a segment. The seed is offset by the
+    evaluations already done, see `successive_halving`.
+
+    Returns the genome, loss, complete percentage, iterations and stop reason.
+    """
+    from src.api import ReconstructionResult
+    from src.simulation import Simulation
+
+    if image[0] not in _attached:
+        _attached[image[0]] = SharedImage.attach(image)
+    simulation = Simulation(
+        config=replace(
+            RunConfig.from_dict(config), max_evaluations=evaluations, save_frames=False
+        ),
+        b_image=_attached[image[0]].array,
+        init_genome=genome,
+    )
+    simulation.run()
+    result = ReconstructionResult.from_simulation(simulation)
+    return (
+        result.genome,
+        result.loss,
+        result.complete_percent,
+        result.iterations,
+        result.stop_reason,
+    )
+
+
+def successive_halving(
+    images: list[str],
+    points: list[dict],
+    config: RunConfig | None = None,
+    min_evaluations: int = 1000,
+    eta: int = 3,
+    workers: int | None = None,
+) -> list[Trial]:
+    """
+    Successive halving over a set of run parameters.
+
+    Every trial (`config` with one point's fields replaced) is run on every
+    image up to the budget of the first rung, `min_evaluations`. Only the best
+    `1 / eta` of the trials (by mean complete percentage) go on to the next
+    rung, with `eta` times the budget; a promoted trial resumes from its
+    genomes (see `Simulation.warm_start`) instead of starting over, in a new
+    simulation whose stagnation counter and operator scheduler start over
+    (see `run_segment`) and whose seed is offset by the evaluations already
+    done, so a segment doesn't replay the random stream of the last. This
+    repeats until one trial is left or every survivor used its own
+    `max_evaluations`. All runs of a rung go through one process pool, and
+    every image is decoded once into shared memory the workers attach to
+    (see `share_images`).
+
+    Args:
+        images (list[str]): Paths of the images every trial is scored on.
+        points (list[dict]): RunConfig fields of every trial, see `grid` and
+          `sample`.
+        config (RunConfig | None): Fields shared by every trial. Defaults to
+          `RunConfig()`.
+        min_evaluations (int): Evaluation budget of the first rung. Defaults
+          to 1000.
+        eta (int): Reduction factor between rungs. Defaults to 3.
+        workers (int | None): Worker processes. Defaults to the CPU count.
+
+    Returns:
+        list[Trial]: Every trial, ranked best first: by the rung reached, then
+          by score.
+    """
+    config = config or RunConfig()
+    trials = [
+        Trial(id=i, params=point, config=replace(config, **point))
+        for i, point in enumerate(points)
+    ]
+    alive = list(trials)
+    budget = min_evaluations
+    shared = share_images(images, {trial.config.color_mode for trial in trials})
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for rung in itertools.count():
+            start = time.perf_counter()
+            jobs = {}
+            for trial in alive:
+                target = min(budget, trial.config.max_evaluations)
+                if trial.finished or trial.evaluations >= target:
+                    continue
+                segment = trial.config.to_dict()
+                if trial.config.seed is not None:
+                    segment["seed"] = trial.config.seed + trial.evaluations
+                for image in images:
+                    jobs[(trial.id, image)] = pool.submit(
+                        run_segment,
+                        shared[(image, trial.config.color_mode)].handle,
+                        segment,
+                        target - trial.evaluations,
+                        trial.genomes.get(image),
+                    )
+                trial.evaluations = target
+
+            for (trial_id, image), job in jobs.items():
+                trial = trials[trial_id]
+                genome, loss, percent, _, reason = job.result()
+                trial.genomes[image] = genome
+                trial.losses[image] = loss
+                trial.percents[image] = percent
+                if reason is None or not reason.startswith(BUDGET_STOP):
+                    trial.finished = True
+            for trial in alive:
+                trial.rung = rung
+                trial.finished |= trial.evaluations >= trial.config.max_evaluations
+
+            alive.sort(key=lambda trial: trial.score, reverse=True)
+            logger.info(
+                f"Rung {rung}: {len(alive)} trials at {budget} evaluations "
+                f"({time.perf_counter() - start:.1f}s), best {alive[0].score:.2f}% "
+                f"{alive[0].params}"
+            )
+            if len(alive) == 1 or all(trial.finished for trial in alive):
+                break
+            alive = alive[: max(len(alive) // eta, 1)]
+            budget *= eta
+    finally:
+        # NOTE: the workers' mappings go away with them, then the blocks can
+        # be freed
+        pool.shutdown()
+        for image in shared.values():
+            image.close()
+
+    return sorted(trials, key=lambda trial: (-trial.rung, -trial.score))
+
+
+def write_table(trials: list[Trial], path: str) -> None:
+    """
+    Write the ranked trials as a CSV table
+    """
+    names = sorted({name for trial in trials for name in trial.params})
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(
+            ["rank", "trial", *names, "rung", "evaluations", "complete_percent", "loss"]
+        )
+        for rank, trial in enumerate(trials, start=1):
+            writer.writerow(
+                [
+                    rank,
+                    trial.id,
+                    *(trial.params.get(name) for name in names),
+                    trial.rung,
+                    trial.evaluations,
+                    round(trial.score, 4),
+                    round(float(np.mean(list(trial.losses.values()))), 1),
+                ]
+            )
+    logger.info(f"Results written to '{path}'")
+
+
+parser = ArgumentParser(
+    description="Tune run parameters with successive halving over a process pool"
+)
+parser.add_argument("output", type=str, help="Output folder")
+parser.add_argument("images", type=str, nargs="+", help="Images every trial is run on")
+parser.add_argument(
+    "-s",
+    "--space",
+    type=str,
+    required=True,
+    help='Search space as JSON: lists of values (a grid), or with --samples also {"low": .., "high": .., "log": bool} ranges, e.g. \'{"max_polygons": [50, 100], "stagnation_limit": [50, 100, 200]}\'',
+)
+parser.add_argument(
+    "-n",
+    "--samples",
+    type=int,
+    default=None,
+    help="Draw this many random points of the space instead of the whole grid (default=None)",
+)
+parser.add_argument(
+    "-c",
+    "--config",
+    type=str,
+    default="{}",
+    help="RunConfig fields shared by every trial as JSON",
+)
+parser.add_argument(
+    "-m",
+    "--min-evaluations",
+    type=int,
+    default=1000,
+    help="Evaluation budget of the first rung (default=1000)",
+)
+parser.add_argument(
+    "--eta",
+    type=int,
+    default=3,
+    help="Keep the best 1/eta of the trials at every rung, with eta times the budget (default=3)",
+)
+parser.add_argument(
+    "-w", "--workers", type=int, default=None, help="Worker processes (default=cores)"
+)
+parser.add_argument(
+    "--seed",
+    type=int,
+    default=None,
+    help="Seed of the random points (default=None)",
+)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    _logger.setLevel("INFO")
+    logger.addHandler(logging.StreamHandler())
+    os.makedirs(args.output, exist_ok=True)
+    space = json.loads(args.space)
+    if args.samples is None:
+        points = grid(space)
+    else:
+        points = sample(space, args.samples, np.random.default_rng(args.seed))
+    logger.info(f"Sweeping {len(points)} trials over {len(args.images)} images")
+
+    start = time.perf_counter()
+    trials = successive_halving(
+        args.images,
+        points,
+        RunConfig.from_json(args.config),
+        min_evaluations=args.min_evaluations,
+        eta=args.eta,
+        workers=args.workers,
+    )
+    write_table(trials, os.path.join(args.output, "results.csv"))
+    with open(os.path.join(args.output, "results.json"), "w") as file:
+        json.dump(
+            [
+                {
+                    "trial": trial.id,
+                    "params": trial.params,
+                    "rung": trial.rung,
+                    "evaluations": trial.evaluations,
+                    "complete_percent": trial.score,
+                    "percents": trial.percents,
+                }
+                for trial in trials
+            ],
+            file,
+            indent=2,
+        )
+    total = sum(trial.evaluations for trial in trials) * len(args.images)
+    logger.info(
+        f"{len(trials)} trials, {total} evaluations in {time.perf_counter() - start:.1f}s"
+    )
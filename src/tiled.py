@@ -0,0 +1,336 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+
+import numpy as np
+
+from src.api import ReconstructionResult
+from src.config import RunConfig
+from src.image_cache import ImageCache, convert_color
+from src.loss import percent_of
+from src.polish import optimal_colors
+from src.render import polygon_mask, rasterize_band
+
+_logger = logging.getLogger("__main__")
+logger = _logger.getChild(__name__)
+
+Tile = tuple[int, int, int, int]  # (x0, y0, x1, y1) in pixels, y pointing down
+
+STRIP_ROWS = 256  # rows of the source resident at once when scoring
+
+
+def tile_grid(width: int, height: int, tile: int, overlap: int) -> list[Tile]:
+    """
+    Overlapping tiles covering an image, in row major order
+    """
+
+    def starts(size: int) -> list[int]:
+        if size <= tile:
+            return [0]
+        stride = tile - overlap
+        count = -(-(size - overlap) // stride)
+        # NOTE: spread the tiles evenly, the last one ends at the border
+        return np.linspace(0, size - tile, count).round().astype(int).tolist()
+
+    return [
+        (x0, y0, min(x0 + tile, width), min(y0 + tile, height))
+        for y0 in starts(height)
+        for x0 in starts(width)
+    ]
+
+
+def cuts(tiles: list[Tile]) -> tuple[list[float], list[float]]:
+    """
+    Seams between neighboring tile columns (x) and rows (y): the middle of
+    their overlap
+    """
+
+    def middles(starts: set[int], ends: set[int]) -> list[float]:
+        starts, ends = sorted(starts), sorted(ends)
+        return [(start + end) / 2 for start, end in zip(starts[1:], ends[:-1])]
+
+    return (
+        middles({t[0] for t in tiles}, {t[2] for t in tiles}),
+        middles({t[1] for t in tiles}, {t[3] for t in tiles}),
+    )
+
+
+def cores(tiles: list[Tile], width: int, height: int) -> list[Tile]:
+    """
+    Part of the image each tile owns, the tiles cut at the seams
+    """
+    x_cuts, y_cuts = cuts(tiles)
+    x_edges = [0, *x_cuts, width]
+    y_edges = [0, *y_cuts, height]
+    x_index = {x0: i for i, x0 in enumerate(sorted({t[0] for t in tiles}))}
+    y_index = {y0: i for i, y0 in enumerate(sorted({t[1] for t in tiles}))}
+    return [
+        (
+            x_edges[x_index[t[0]]],
+            y_edges[y_index[t[1]]],
+            x_edges[x_index[t[0]] + 1],
+            y_edges[y_index[t[1]] + 1],
+        )
+        for t in tiles
+    ]
+
+
+def reconstruct_tile(
+    source: str, tile: Tile, config: dict
+) -> tuple[np.ndarray, int]:
+    """
+    Reconstruct one tile of a memory-mapped source (run in a worker process).
+
+    Only the tile is read from the `.npy` source. Returns the genome, in the
+    data coordinates of the whole image (origin at the bottom left), and the
+    number of iterations.
+    """
+    from src.simulation import Simulation
+
+    image = np.load(source, mmap_mode="r")
+    x0, y0, x1, y1 = tile
+    # NOTE: the tile is copied out of the map, only it is resident
+    simulation = Simulation(
+        config=RunConfig.from_dict(config),
+        b_image=np.array(image[y0:y1, x0:x1]),
+    )
+    simulation.run()
+    result = ReconstructionResult.from_simulation(simulation)
+
+    genome = result.genome.copy()
+    n = (genome.shape[1] - 4) // 2
+    # tiles are cropped to even sizes, offsets keep the tile's top left corner
+    genome[:, :n] += x0
+    genome[:, n : 2 * n] += image.shape[0] - (y0 + result.height)
+    return genome, result.iterations
+
+
+def stitch(
+    genomes: list[np.ndarray], tiles: list[Tile], width: int, height: int
+) -> np.ndarray:
+    """
+    Merge tile genomes into one genome.
+
+    Each polygon is kept by the tile whose core (see `cores`) holds its
+    centroid, so every part of the image is drawn by exactly one tile while
+    polygons can still reach across the seams.
+    """
+    kept = []
+    for genome, core in zip(genomes, cores(tiles, width, height)):
+        if not len(genome):
+            continue
+        n = (genome.shape[1] - 4) // 2
+        # NOTE: centroids can fall outside of the image, clamp to the border
+        cx = np.clip(genome[:, :n].mean(axis=1), 0, width - 0.5)
+        cy = np.clip(height - genome[:, n : 2 * n].mean(axis=1), 0, height - 0.5)
+        x0, y0, x1, y1 = core
+        own = (cx >= x0) & (cx < x1) & (cy >= y0) & (cy < y1)
+        kept.append(genome[own])
+    return np.concatenate(kept)
+
+
+def blend_seams(
+    genome: np.ndarray,
+    source: np.ndarray,
+    tiles: list[Tile],
+    color_mode: str = "rgb",
+) -> np.ndarray:
+    """
+    Re-fit the colors of the polygons crossing tile seams.
+
+    Those polygons were fit to one tile only; here their closed-form optimal
+    colors (`src.polish.optimal_colors`) are computed against the source
+    around each seam, together with every polygon overlapping it, so the two
+    sides blend. Only a window around each seam is read from the source.
+    """
+    height, width = source.shape[:2]
+    out_size = (width, height)
+    x_cuts, y_cuts = cuts(tiles)
+    masks = [polygon_mask(gene, (1.0, 1.0), out_size) for gene in genome]
+
+    def box(i: int) -> Tile:
+        r0, c0, mask = masks[i]
+        return (c0, r0, c0 + mask.shape[1], r0 + mask.shape[0])
+
+    boxes = {i: box(i) for i, covered in enumerate(masks) if covered is not None}
+    for axis, center in [("x", c) for c in x_cuts] + [("y", c) for c in y_cuts]:
+        low, high = (0, 2) if axis == "x" else (1, 3)
+        crossing = [i for i, b in boxes.items() if b[low] < center < b[high]]
+        if not crossing:
+            continue
+        x0 = min(boxes[i][0] for i in crossing)
+        y0 = min(boxes[i][1] for i in crossing)
+        x1 = max(boxes[i][2] for i in crossing)
+        y1 = max(boxes[i][3] for i in crossing)
+
+        # every polygon touching the window, in window coordinates
+        context = [
+            i
+            for i, b in boxes.items()
+            if b[0] < x1 and b[2] > x0 and b[1] < y1 and b[3] > y0
+        ]
+        n = (genome.shape[1] - 4) // 2
+        window = genome[context].copy()
+        window[:, :n] -= x0
+        window[:, n : 2 * n] -= height - y1
+        position_of = {i: row for row, i in enumerate(context)}
+        rows = [position_of[i] for i in crossing]
+        target = convert_color(np.asarray(source[y0:y1, x0:x1]), color_mode)
+        fitted = optimal_colors(window, target, rows)
+        genome[context, -4:-1] = fitted[:, -4:-1]
+        logger.debug(f"Seam {axis}={center}: {len(crossing)} polygons re-fit")
+    return genome
+
+
+def strip_sad(
+    genome: np.ndarray, source: np.ndarray, color_mode: str = "rgb"
+) -> tuple[int, int]:
+    """
+    SAD of a genome against a (memory-mapped) source, and of a blank canvas,
+    a strip at a time
+    """
+    height, width = source.shape[:2]
+    loss = blank_loss = 0
+    for r0 in range(0, height, STRIP_ROWS):
+        rows = (r0, min(r0 + STRIP_ROWS, height))
+        target = np.asarray(source[rows[0] : rows[1], :, :3])
+        target = convert_color(target, color_mode)
+        channels = target.shape[2]
+        band = rasterize_band(genome, (1.0, 1.0), (width, height), rows, channels)
+        band = np.rint(band * 255)
+        loss += int(np.abs(band - target.astype(np.float32)).sum())
+        blank_loss += int(np.sum(target, dtype=np.int64))
+    return loss, blank_loss
+
+
+def reconstruct_tiled(
+    path: str,
+    config: RunConfig | None = None,
+    tile: int = 256,
+    overlap: int = 32,
+    workers: int | None = None,
+    cache_dir: str | None = None,
+    seams: bool = True,
+) -> ReconstructionResult:
+    """
+    Reconstruct a large image tile by tile in parallel worker processes.
+
+    The source is decoded once into a `.npy` file that every worker maps
+    instead of loading, and each tile is an independent run with
+    `config.max_polygons` polygons. The tile genomes are stitched into one
+    genome of the whole image and the polygons crossing the seams get their
+    colors re-fit across them.
+
+    Args:
+        path (str): Path of the source image.
+        config (RunConfig | None): Parameters of every tile's run. Defaults
+          to `RunConfig()`.
+        tile (int): Tile size in pixels. Defaults to 256.
+        overlap (int): Overlap of neighboring tiles in pixels. Defaults to 32.
+        workers (int | None): Worker processes. Defaults to the CPU count.
+        cache_dir (str | None): Where to keep the decoded source. Defaults to
+          a temporary directory.
+        seams (bool): Re-fit the colors along the seams. Defaults to True.
+
+    Returns:
+        ReconstructionResult: Stitched genome and metrics of the whole image.
+    """
+    config = config or RunConfig()
+    # NOTE: workers have no folder output, the tile frames would be useless
+    tile_config = replace(config, save_frames=False)
+    start = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = ImageCache(cache_dir or tmp_dir).get(path)
+        height, width = source.shape[:2]
+        tiles = tile_grid(width, height, tile, overlap)
+        logger.info(f"Reconstructing {width}x{height} as {len(tiles)} tiles")
+
+        jobs = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for i, box in enumerate(tiles):
+                data = tile_config.to_dict()
+                if config.seed is not None:
+                    data["seed"] = config.seed + i
+                jobs.append(pool.submit(reconstruct_tile, source.filename, box, data))
+            outcomes = [job.result() for job in jobs]
+
+        genome = stitch([g for g, _ in outcomes], tiles, width, height)
+        if seams:
+            genome = blend_seams(genome, source, tiles, config.color_mode)
+        loss, blank_loss = strip_sad(genome, source, config.color_mode)
+
+    return ReconstructionResult(
+        config=config,
+        genome=genome,
+        width=width,
+        height=height,
+        loss=float(loss),
+        complete_percent=percent_of(loss, blank_loss),
+        iterations=sum(t for _, t in outcomes),
+        elapsed=time.perf_counter() - start,
+        stop_reason="tiles complete",
+    )
+
+
+parser = ArgumentParser(description="Reconstruct a large image tile by tile")
+parser.add_argument("image", type=str, help="The path of the base image")
+parser.add_argument("output", type=str, help="Output folder")
+parser.add_argument(
+    "-t", "--tile", type=int, default=256, help="Tile size in pixels (default=256)"
+)
+parser.add_argument(
+    "-v",
+    "--overlap",
+    type=int,
+    default=32,
+    help="Overlap of neighboring tiles in pixels (default=32)",
+)
+parser.add_argument(
+    "-w", "--workers", type=int, default=None, help="Worker processes (default=cores)"
+)
+parser.add_argument(
+    "-c",
+    "--config",
+    type=str,
+    default="{}",
+    help="RunConfig fields of every tile as JSON",
+)
+parser.add_argument(
+    "--cache-dir",
+    type=str,
+    default=None,
+    help="Keep the decoded source here for later runs (default=temporary)",
+)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    _logger.setLevel("INFO")
+    logger.addHandler(logging.StreamHandler())
+    os.makedirs(args.output, exist_ok=True)
+    result = reconstruct_tiled(
+        args.image,
+        RunConfig.from_json(args.config),
+        tile=args.tile,
+        overlap=args.overlap,
+        workers=args.workers,
+        cache_dir=args.cache_dir,
+    )
+    for name in ("genome.bin", "output.svg"):
+        result.save(os.path.join(args.output, name))
+    print(
+        json.dumps(
+            {
+                "polygons": len(result.genome),
+                "loss": result.loss,
+                "complete_percent": result.complete_percent,
+                "elapsed": result.elapsed,
+            }
+        )
+    )
@@ -1,6 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.collections import PatchCollection
 from src.custom_types import Canvas, Polygon, Vertices, RGBA
 
 DIMS = (64, 64)
@@ -10,7 +8,12 @@ def visualize_canvas(canvas: Canvas) -> None:
     """
     Draw polygons on canvas
     """
-    polygons = PatchCollection(canvas.sequence, match_original=True)
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PatchCollection
+
+    polygons = PatchCollection(
+        [polygon.to_patch() for polygon in canvas.sequence], match_original=True
+    )
     _, ax = plt.subplots()
     # Add the polygon patch to the axis
     ax.add_collection(polygons)
@@ -25,7 +28,7 @@ def add_polygon(canvas: Canvas, polygon: Polygon) -> Canvas:
     """
     Add a polygon to the canvas
     """
-    canvas.sequence.append(polygon)
+    canvas.append(polygon)
     return canvas
 
 
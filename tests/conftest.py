@@ -0,0 +1,40 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# NOTE: the suite forks process pools after running parallel numba kernels,
+# and the TBB threading layer hangs the interpreter's exit after a fork
+os.environ.setdefault("NUMBA_THREADING_LAYER", "workqueue")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# NOTE: the modules import each other as `src.*`, from the repository root
+sys.path.insert(0, ROOT)
+
+
+def random_genome(
+    rng: np.random.Generator,
+    polygons: int,
+    width: int,
+    height: int,
+    n_vertices: int = 3,
+) -> np.ndarray:
+    """
+    Random genome with vertices anywhere on the canvas
+    """
+    genome = rng.random((polygons, 2 * n_vertices + 4), dtype=np.float32)
+    genome[:, :n_vertices] *= width
+    genome[:, n_vertices : 2 * n_vertices] *= height
+    return genome
+
+
+@pytest.fixture
+def rng() -> np.random.Generator:
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def target(rng) -> np.ndarray:
+    """Small (H, W, 3) uint8 target image"""
+    return rng.integers(0, 256, (24, 32, 3), dtype=np.uint8)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from conftest import random_genome
+
+from src.genome_io import from_bytes, load_genome, save_genome, to_bytes
+
+
+@pytest.mark.parametrize("n_vertices", [3, 4])
+@pytest.mark.parametrize(
+    "name, rtol, atol",
+    [
+        ("genome.bin", 1e-3, 1e-3),  # float16 fractions of the canvas
+        ("genome.json", 1e-6, 1e-5),
+        ("genome.svg", 1e-5, 0.5 / 255),  # 8 bit colors
+    ],
+)
+def test_round_trip(tmp_path, rng, n_vertices, name, rtol, atol):
+    genome = random_genome(rng, 20, 64, 48, n_vertices)
+    path = str(tmp_path / name)
+    save_genome(path, genome, 64, 48)
+
+    loaded, width, height = load_genome(path)
+    assert (width, height) == (64, 48)
+    assert loaded.dtype == np.float32
+    np.testing.assert_allclose(loaded, genome, rtol=rtol, atol=atol)
+
+
+def test_binary_precision(rng):
+    genome = random_genome(rng, 200, 640, 480)
+    data = to_bytes(genome, 640, 480, precision=4)
+    loaded, _, _ = from_bytes(data)
+    np.testing.assert_allclose(loaded, genome, rtol=1e-6, atol=1e-4)
+
+    # NOTE: float16 keeps a 200 triangle genome around 4 KB
+    assert len(to_bytes(genome, 640, 480)) < 4200
+    with pytest.raises(ValueError):
+        to_bytes(genome, 640, 480, precision=8)
+    with pytest.raises(ValueError):
+        from_bytes(b"NOPE" + data[4:])
+
+
+def test_empty_genome(tmp_path):
+    genome = np.empty((0, 10), dtype=np.float32)
+    for name in ("genome.bin", "genome.json", "genome.svg"):
+        save_genome(str(tmp_path / name), genome, 8, 8)
+        loaded, width, height = load_genome(str(tmp_path / name))
+        assert loaded.shape == (0, 10) and (width, height) == (8, 8)
@@ -0,0 +1,48 @@
+import numpy as np
+from PIL import Image, ImageSequence
+
+from src.gif_magic import list_frames, sample_frames, write_gif
+
+
+def make_frames() -> list[np.ndarray]:
+    frames = [np.full((24, 32, 3), 255, dtype=np.uint8)]
+    for color, rows, cols in (
+        ((255, 0, 0), slice(2, 8), slice(3, 9)),
+        ((0, 0, 255), slice(10, 20), slice(0, 32)),
+        (None, None, None),  # an unchanged frame
+        ((0, 128, 0), slice(0, 24), slice(30, 32)),
+    ):
+        frame = frames[-1].copy()
+        if color is not None:
+            frame[rows, cols] = color
+        frames.append(frame)
+    return frames
+
+
+def test_write_gif(tmp_path):
+    frames = make_frames()
+    path = str(tmp_path / "out.gif")
+    assert write_gif(frames, path, duration=50, palette=frames[-1]) == 4
+
+    with Image.open(path) as gif:
+        decoded = [np.asarray(f.convert("RGB")) for f in ImageSequence.Iterator(gif)]
+        gif.seek(2)
+        # NOTE: the unchanged frame extends the delay of the one before it
+        assert gif.info["duration"] == 100
+    expected = [frames[i] for i in (0, 1, 2, 4)]
+    assert len(decoded) == len(expected)
+    for frame, image in zip(decoded, expected):
+        np.testing.assert_array_equal(frame, image)
+
+
+def test_list_and_sample_frames(tmp_path):
+    for iteration in (0, 5, 12):
+        Image.new("RGB", (4, 4)).save(tmp_path / f"{iteration}.png")
+    Image.new("RGB", (4, 4)).save(tmp_path / "output.png")
+    (tmp_path / "notes.txt").write_text("not a frame")
+
+    frames = list_frames(str(tmp_path))
+    assert [it for it, _ in frames] == [0, 5, 12, 13]
+    assert frames[-1][1].endswith("output.png")
+    # evenly spaced in iterations, latest frame at or before each sample
+    assert sample_frames([0, 5, 12, 13], 5) == [0, 0, 1, 1, 3]
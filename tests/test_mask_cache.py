@@ -0,0 +1,58 @@
+import numpy as np
+from conftest import random_genome
+
+from src.render import MASK_CACHE_BYTES, MASKS, MaskCache, polygon_mask, rasterize
+
+
+def test_hits_and_misses(rng):
+    cache = MaskCache()
+    genome = random_genome(rng, 5, 32, 24)
+    for gene in genome:
+        cache.mask(gene, (1.0, 1.0), (32, 24))
+    assert (cache.hits, cache.misses, len(cache)) == (0, 5, 5)
+
+    # NOTE: a new color is the same geometry, a new scale is not
+    recolored = genome.copy()
+    recolored[:, -4:] = rng.random((5, 4))
+    for gene in recolored:
+        r0, c0, mask = cache.mask(gene, (1.0, 1.0), (32, 24))
+        expected = polygon_mask(gene, (1.0, 1.0), (32, 24))
+        assert (r0, c0) == expected[:2]
+        np.testing.assert_array_equal(mask, expected[2])
+        assert not mask.flags.writeable
+    cache.mask(genome[0], (2.0, 2.0), (64, 48))
+    assert (cache.hits, cache.misses) == (5, 6)
+    assert cache.hit_rate == 5 / 11
+
+    cache.reset()
+    assert (cache.hits, cache.misses, len(cache), cache.nbytes) == (0, 0, 0, 0)
+
+
+def test_least_recently_used_eviction():
+    # NOTE: shifted copies of one triangle, every mask takes the same bytes
+    genome = np.zeros((4, 10), dtype=np.float32)
+    genome[:, :6] = [2, 10, 6, 2, 2, 10]
+    genome[:, :3] += np.arange(4)[:, None] * 4
+    cache = MaskCache()
+    cache.mask(genome[0], (1.0, 1.0), (32, 24))
+    cache.reset(max_bytes=2 * cache.nbytes)
+
+    for row in (0, 1, 0, 2):  # the second is the least recently used
+        cache.mask(genome[row], (1.0, 1.0), (32, 24))
+    assert len(cache) == 2 and cache.nbytes <= cache.max_bytes
+    cache.hits = cache.misses = 0
+    for row in (0, 2, 1):
+        cache.mask(genome[row], (1.0, 1.0), (32, 24))
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_disabled_cache_renders_the_same(rng):
+    genome = random_genome(rng, 30, 32, 24)
+    cached = rasterize(genome, 32, 24, threads=4)
+    MASKS.reset(0)
+    try:
+        uncached = rasterize(genome, 32, 24, threads=4)
+        assert len(MASKS) == 0
+    finally:
+        MASKS.reset(MASK_CACHE_BYTES)
+    np.testing.assert_array_equal(cached, uncached)
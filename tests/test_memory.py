@@ -0,0 +1,82 @@
+import pytest
+from conftest import random_genome
+
+from src.config import RunConfig
+from src.genome import canvas_to_genome, genome_to_canvas
+from src.memory import (
+    MASK_CACHE_FLOOR,
+    GenerationStore,
+    MemoryBudget,
+    account,
+    parse_size,
+)
+from src.render import MASK_CACHE_BYTES, MASKS
+from src.replay import Trajectory
+from src.simulation import Simulation
+
+
+@pytest.mark.parametrize(
+    "value, size",
+    [
+        ("0", 0),
+        ("4096", 4096),
+        ("512K", 512 << 10),
+        ("512M", 512 << 20),
+        ("8g", 8 << 30),
+        ("1.5GB", 3 << 29),
+        ("2GiB", 2 << 30),
+        (" 1 T ", 1 << 40),
+        ("64B", 64),
+        (".5K", 512),
+    ],
+)
+def test_parse_size(value, size):
+    assert parse_size(value) == size
+
+
+@pytest.mark.parametrize("value", ["", "M", "-1M", "1.2.3G", "12X", "1MM", "512i", "."])
+def test_parse_size_rejects(value):
+    with pytest.raises(ValueError, match="Invalid memory size"):
+        parse_size(value)
+
+
+def test_generation_store_replaces_canvases(tmp_path, rng):
+    canvases = [
+        genome_to_canvas(random_genome(rng, polygons, 32, 24), 32, 24)
+        for polygons in (1, 2, 3, 4)
+    ]
+    store = GenerationStore(canvases[:2])
+    store[-1] = canvases[2]
+    assert store[1] is canvases[2]
+
+    store.spill(str(tmp_path))
+    store.append(canvases[3])
+    store[0] = canvases[3]
+    store[-1] = canvases[0]
+    # NOTE: only the last canvas stays in memory once spilled
+    assert store._canvases[:-1] == [None, None]
+    assert [c.how_many() for c in store] == [4, 3, 1]
+    genome = canvas_to_genome(store[0], 3)
+    assert (genome == canvas_to_genome(canvases[3], 3)).all()
+
+
+def test_budget_shrinks_the_mask_cache_before_spilling(tmp_path, rng, target):
+    simulation = Simulation(
+        config=RunConfig(renderer="numpy", save_frames=False), b_image=target
+    )
+    simulation.trajectory = Trajectory(32, 24)  # NOTE: made by `run`
+    try:
+        MASKS.max_bytes = 64 * MASK_CACHE_FLOOR
+        for gene in random_genome(rng, 50, 32, 24):
+            MASKS.mask(gene, (1.0, 1.0), (32, 24))
+        assert account(simulation)["mask_cache"] == MASKS.nbytes > 0
+
+        # NOTE: any process is over a 1 byte budget
+        budget = MemoryBudget(1, interval=1, spill_dir=str(tmp_path))
+        assert budget.check(simulation, 0).startswith("memory budget")
+        assert MASKS.max_bytes == MASK_CACHE_FLOOR
+        assert not simulation.generations.spilled
+        budget.check(simulation, 1)
+        assert simulation.generations.spilled
+    finally:
+        MASKS.reset(MASK_CACHE_BYTES)
@@ -0,0 +1,55 @@
+import numpy as np
+from conftest import random_genome
+
+from src.polish import optimal_colors, weighted_median
+from src.render import render_sad
+
+
+def square(x0: float, y0: float, x1: float, y1: float, color, alpha: float):
+    return np.array([x0, x1, x1, x0, y0, y0, y1, y1, *color, alpha], dtype=np.float32)
+
+
+def test_weighted_median():
+    values = np.array([[1.0, 5.0], [2.0, 4.0], [10.0, 3.0]])
+    np.testing.assert_array_equal(weighted_median(values, np.ones(3)), [2.0, 4.0])
+    np.testing.assert_array_equal(
+        weighted_median(values, np.array([1.0, 1.0, 5.0])), [10.0, 3.0]
+    )
+
+
+def test_recovers_the_color_under_a_translucent_polygon():
+    target = np.full((24, 32, 3), 255, dtype=np.uint8)
+    target[4:20, 4:28] = (200, 40, 90)
+    genome = np.stack(
+        [
+            # opaque polygon over the colored block (y up), any start color
+            square(4, 4, 28, 20, (0.0, 1.0, 0.0), 1.0),
+            # translucent polygon above a corner of it
+            square(20, 12, 28, 20, (0.0, 0.0, 0.0), 0.5),
+        ]
+    )
+    polished = optimal_colors(genome, target, rows=[0])
+    np.testing.assert_allclose(polished[0, -4:-1] * 255, (200, 40, 90), atol=0.5)
+    np.testing.assert_array_equal(polished[1], genome[1])
+    assert genome[0, -4] == 0.0  # the input is left alone
+
+
+def test_lowers_the_loss(rng, target):
+    height, width = target.shape[:2]
+    for _ in range(5):
+        genome = random_genome(rng, 15, width, height)
+        polished = optimal_colors(genome, target)
+        assert render_sad(polished, target) <= render_sad(genome, target)
+        # NOTE: only colors change
+        np.testing.assert_array_equal(polished[:, :6], genome[:, :6])
+        np.testing.assert_array_equal(polished[:, -1], genome[:, -1])
+
+
+def test_gray_fills_all_three_color_columns(rng, target):
+    height, width = target.shape[:2]
+    gray = target[:, :, :1]
+    genome = random_genome(rng, 10, width, height)
+    polished = optimal_colors(genome, gray)
+    np.testing.assert_array_equal(polished[:, -4], polished[:, -3])
+    np.testing.assert_array_equal(polished[:, -4], polished[:, -2])
+    assert render_sad(polished, gray) <= render_sad(genome, gray)
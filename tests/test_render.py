@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pytest
+from conftest import ROOT, random_genome
+
+from src.genome import genome_to_canvas
+from src.image_cache import load_image
+from src.loss import sad
+from src.render import bands, rasterize, render_sad, render_sad_batch
+
+
+@pytest.fixture
+def tall_target(rng) -> np.ndarray:
+    """Target tall enough to be split into several bands"""
+    return rng.integers(0, 256, (80, 48, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+@pytest.mark.parametrize("n_vertices", [3, 4])
+def test_banded_render_sad_matches_canvas_image(rng, tall_target, threads, n_vertices):
+    height, width = tall_target.shape[:2]
+    assert (len(bands(height, threads)) > 1) == (threads > 1)
+    for polygons in (0, 1, 25):
+        genome = random_genome(rng, polygons, width, height, n_vertices)
+        canvas = genome_to_canvas(genome, width, height)
+        canvas.renderer = "numpy"
+        canvas.threads = threads
+        image = canvas.image()
+        # NOTE: the partial losses of the bands add up to the single band one
+        np.testing.assert_array_equal(image, rasterize(genome, width, height))
+        expected = sad(tall_target, image)
+        assert render_sad(genome, tall_target, threads) == expected
+
+
+def test_render_sad_matches_matplotlib(rng):
+    target = load_image(os.path.join(ROOT, "img", "husky.jpg"))
+    height, width = target.shape[:2]
+    assert len(bands(height, 4)) == 4
+    for _ in range(3):
+        genome = random_genome(rng, 50, width, height)
+        canvas = genome_to_canvas(genome, width, height)
+        # NOTE: only the anti-aliased edges of the agg rendering differ
+        expected = sad(target, canvas.image()[:, :, :3])
+        assert render_sad(genome, target, 4) == pytest.approx(expected, rel=0.02)
+
+
+def test_render_sad_gray_and_batch(rng, tall_target):
+    height, width = tall_target.shape[:2]
+    gray = tall_target[:, :, :1]
+    genomes = [random_genome(rng, 10, width, height) for _ in range(5)]
+    for genome in genomes:
+        genome[:, -3:-1] = genome[:, -4:-3]  # gray polygons
+        image = rasterize(genome, width, height, channels=1)
+        assert render_sad(genome, gray, 4) == sad(gray, image)
+    assert render_sad_batch(genomes, tall_target, 4) == [
+        render_sad(genome, tall_target) for genome in genomes
+    ]
+
+
+def test_sad_does_not_wrap_around():
+    black = np.zeros((2, 2, 3), dtype=np.uint8)
+    white = np.full((2, 2, 3), 255, dtype=np.uint8)
+    assert sad(black, white) == sad(white, black) == 12 * 255
@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+import pytest
+from conftest import ROOT, random_genome
+
+from src import render, render_jit
+from src.image_cache import load_image
+
+pytest.importorskip("numba")
+
+
+@pytest.mark.parametrize("n_vertices", [3, 4])
+@pytest.mark.parametrize("channels", [3, 1])
+def test_render_sad_matches_numpy(rng, target, n_vertices, channels):
+    target = target[:, :, :channels]
+    height, width = target.shape[:2]
+    for polygons in (0, 1, 10, 50):
+        genome = random_genome(rng, polygons, width, height, n_vertices)
+        # NOTE: some polygons partly or fully off the canvas
+        genome[: polygons // 5, : 2 * n_vertices] *= 1.5
+        expected = render.render_sad(genome, target, 1)
+        assert render_jit.render_sad(genome, target, 1) == expected
+        assert render_jit.render_sad(genome, target, 4) == expected
+
+
+def test_renderers_match_matplotlib(rng):
+    target = load_image(os.path.join(ROOT, "img", "husky.jpg"))
+    height, width = target.shape[:2]
+    for _ in range(5):
+        genome = random_genome(rng, 50, width, height)
+        losses = render_jit.compare(genome, target, threads=4)
+        assert set(losses) == {"agg", "numpy", "numba"}
+        for name in ("numpy", "numba"):
+            # NOTE: only anti-aliased edges differ
+            assert losses[name] == pytest.approx(losses["agg"], rel=0.02)
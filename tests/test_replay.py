@@ -0,0 +1,40 @@
+import numpy as np
+
+from src.config import RunConfig
+from src.genome import canvas_to_genome
+from src.render import rasterize
+from src.replay import Replay, Trajectory
+from src.simulation import Simulation
+
+
+def test_trajectory_round_trip_keeps_every_vertex(tmp_path, target):
+    simulation = Simulation(
+        config=RunConfig(
+            max_polygons=4,
+            stagnation_limit=10,
+            max_evaluations=200,
+            n_vertices=4,
+            renderer="numpy",
+            save_frames=False,
+            seed=1,
+        ),
+        b_image=target,
+    )
+    simulation.run()
+    path = str(tmp_path / "trajectory.npz")
+    simulation.trajectory.save(path)
+
+    trajectory = Trajectory.load(path)
+    final = canvas_to_genome(simulation.canvas, 4)
+    assert trajectory.iterations == simulation.trajectory.iterations
+    assert all(genome.shape[1] == 2 * 4 + 4 for genome in trajectory.all_genomes())
+    np.testing.assert_array_equal(trajectory.genome(simulation.iterations), final)
+
+    replay = Replay(path)
+    height, width = target.shape[:2]
+    np.testing.assert_array_equal(
+        replay.frame(replay.last_iteration), rasterize(final, width, height)
+    )
+    np.testing.assert_array_equal(
+        replay.frame(replay.last_iteration), simulation.canvas.image()[:, :, :3]
+    )
@@ -0,0 +1,65 @@
+from dataclasses import replace
+
+import numpy as np
+from conftest import random_genome
+
+from src.api import ReconstructionResult
+from src.config import RunConfig
+from src.result_cache import ResultCache
+
+
+def make_result(rng, config: RunConfig, loss: float) -> ReconstructionResult:
+    return ReconstructionResult(
+        config=config,
+        genome=random_genome(rng, config.max_polygons, 32, 24),
+        width=32,
+        height=24,
+        loss=loss,
+        complete_percent=50.0,
+        iterations=10,
+        elapsed=1.0,
+        stop_reason="max_evals",
+    )
+
+
+def test_get_hits_only_the_same_image_and_config(tmp_path, rng, target):
+    cache = ResultCache(str(tmp_path))
+    config = RunConfig(max_polygons=5, seed=1)
+    assert cache.get(target, config) is None
+
+    result = make_result(rng, config, 100.0)
+    cache.put(target, result)
+    hit = cache.get(target, config)
+    assert hit is not None
+    assert hit.loss == 100.0
+    np.testing.assert_allclose(hit.genome, result.genome, atol=1e-3)
+
+    # output and speed settings do not change the result
+    assert cache.get(target, replace(config, save_frames=False, threads=4))
+    assert cache.get(target, replace(config, seed=2)) is None
+    assert cache.get(255 - target, config) is None
+
+
+def test_nearest_warm_start(tmp_path, rng, target):
+    cache = ResultCache(str(tmp_path))
+    for polygons, loss in ((5, 300.0), (10, 200.0), (10, 150.0), (40, 50.0)):
+        config = RunConfig(max_polygons=polygons, seed=int(loss))
+        cache.put(target, make_result(rng, config, loss))
+    gray = RunConfig(max_polygons=10, color_mode="gray")
+    cache.put(target, make_result(rng, gray, 10.0))
+
+    # the most polygons up to the run's, then the lowest loss, same layout
+    nearest = cache.nearest(target, RunConfig(max_polygons=20))
+    assert (nearest.config.max_polygons, nearest.loss) == (10, 150.0)
+    assert cache.nearest(target, RunConfig(max_polygons=4)) is None
+    assert cache.nearest(target, RunConfig(max_polygons=20, n_vertices=4)) is None
+
+
+def test_nearest_skips_broken_entries(tmp_path, rng, target):
+    cache = ResultCache(str(tmp_path))
+    config = RunConfig(max_polygons=5)
+    cache.put(target, make_result(rng, config, 100.0))
+    (meta_path,) = tmp_path.glob("*.json")
+    (tmp_path / meta_path.name.replace("-", "-0", 1)).write_text('{"config": ')
+
+    assert cache.nearest(target, RunConfig(max_polygons=10)).loss == 100.0
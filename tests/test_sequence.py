@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+from conftest import ROOT
+
+from src.config import RunConfig
+from src.image_cache import load_image
+from src.render import rasterize
+from src.sequence import reconstruct_sequence, reseed
+
+
+def two_squares() -> np.ndarray:
+    """Opaque red square on the left half, blue one on the right (y up)"""
+    return np.array(
+        [
+            [0, 16, 16, 0, 0, 0, 24, 24, 1.0, 0.0, 0.0, 1.0],
+            [16, 32, 32, 16, 0, 0, 24, 24, 0.0, 0.0, 1.0, 1.0],
+        ],
+        dtype=np.float32,
+    )
+
+
+def test_reseed_keeps_an_unchanged_frame():
+    genome = two_squares()
+    frame = rasterize(genome, 32, 24)
+    new, rows = reseed(genome, frame, frame.copy())
+    assert rows == []
+    np.testing.assert_array_equal(new, genome)
+
+
+def test_reseed_recolors_the_polygons_of_a_changed_region():
+    genome = two_squares()
+    previous = rasterize(genome, 32, 24)
+    frame = previous.copy()
+    frame[:, 16:] = (0, 200, 0)  # the right square turns green
+
+    new, rows = reseed(genome, previous, frame)
+    assert rows == [1]
+    np.testing.assert_array_equal(new[0], genome[0])
+    np.testing.assert_array_equal(new[1, :-4], genome[1, :-4])
+    np.testing.assert_allclose(new[1, -4:-1] * 255, (0, 200, 0), atol=0.5)
+
+
+def test_warm_frame_stops_at_the_previous_complete_percent():
+    first = load_image(os.path.join(ROOT, "img", "1.png"))
+    second = first.copy()
+    second[10:16, 10:16] = 255 - second[10:16, 10:16]
+    config = RunConfig(
+        renderer="numpy",
+        max_polygons=4,
+        max_evaluations=400,
+        stagnation_limit=30,
+        save_frames=False,
+        seed=3,
+    )
+
+    cold, warm = reconstruct_sequence([first, second], config, warm_budget=0.25)
+    assert cold.iterations > 100
+    assert warm.stop_reason.startswith("target complete percent")
+    assert warm.complete_percent >= cold.complete_percent
+    assert warm.iterations <= 100
+    assert warm.config.target_percent == cold.complete_percent
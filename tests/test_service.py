@@ -0,0 +1,95 @@
+import json
+import os
+import subprocess
+import sys
+
+from src import service
+
+
+def test_submit_defaults_to_no_frames(tmp_path):
+    spool = str(tmp_path)
+    job_id = service.submit(spool, "img/1.png")
+    assert service.status(spool, job_id)["config"]["save_frames"] is False
+
+
+def test_requeue_claim_of_dead_worker(tmp_path):
+    spool = str(tmp_path)
+    job_id = service.submit(spool, "img/1.png")
+    job = service.claim(spool, worker=3)
+    assert job["id"] == job_id and job["pid"] == os.getpid()
+
+    # a live worker keeps its claim
+    assert service.requeue_stale(spool) == []
+
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    path = os.path.join(spool, service.CLAIMED, f"{job_id}.json")
+    service.write_json(path, {**job, "pid": dead.pid})
+    assert service.requeue_stale(spool) == [job_id]
+    assert service.status(spool, job_id)["state"] == service.QUEUE
+
+
+def test_requeue_claim_without_heartbeat(tmp_path):
+    spool = str(tmp_path)
+    job_id = service.submit(spool, "img/1.png")
+    job = service.claim(spool)
+    path = os.path.join(spool, service.CLAIMED, f"{job_id}.json")
+    with open(path, "w") as file:
+        json.dump({**job, "host": "elsewhere"}, file)
+
+    assert service.requeue_stale(spool, timeout=60) == []
+    assert service.requeue_stale(spool, timeout=0) == [job_id]
+    assert service.claim(spool)["id"] == job_id
+
+
+def test_slow_local_job_keeps_its_claim(tmp_path):
+    spool = str(tmp_path)
+    service.submit(spool, "img/1.png")
+    service.claim(spool)
+    # NOTE: a live PID on this host is never timed out
+    assert service.requeue_stale(spool, timeout=0) == []
+
+
+def test_finish_drops_the_queued_duplicate(tmp_path):
+    spool = str(tmp_path)
+    job_id = service.submit(spool, "img/1.png")
+    job = service.claim(spool)
+    claimed = os.path.join(spool, service.CLAIMED, f"{job_id}.json")
+    os.rename(claimed, os.path.join(spool, service.QUEUE, f"{job_id}.json"))
+
+    service.finish(spool, job, service.DONE)
+    assert service.status(spool, job_id)["state"] == service.DONE
+    assert os.listdir(os.path.join(spool, service.QUEUE)) == []
+
+
+def test_finish_leaves_another_workers_claim(tmp_path):
+    spool = str(tmp_path)
+    job_id = service.submit(spool, "img/1.png")
+    job = service.claim(spool)
+    claimed = os.path.join(spool, service.CLAIMED, f"{job_id}.json")
+    service.write_json(claimed, {**job, "worker": 1, "claimed": job["claimed"] + 1})
+
+    service.finish(spool, job, service.DONE)
+    assert os.path.exists(claimed)
+
+
+def test_interrupted_job_is_queued_again(tmp_path, monkeypatch):
+    spool = str(tmp_path)
+    job_id = service.submit(spool, "img/1.png")
+    runs = []
+
+    def run_job(spool, job, cache, worker):
+        runs.append(job.get("resume"))
+        reason = "signal 15" if len(runs) == 1 else "max evaluations (10) reached"
+        return {"stop_reason": reason}
+
+    monkeypatch.setattr(service, "run_job", run_job)
+    service.worker_loop(spool, 0, once=True)
+    job = service.status(spool, job_id)
+    assert job["state"] == service.QUEUE and job["interrupted"] == 1
+    assert "result" not in job
+
+    # the next worker resumes from the genome the first run saved
+    service.worker_loop(spool, 0, once=True)
+    assert runs == [None, os.path.join(spool, service.JOBS, job_id, "genome.bin")]
+    assert service.status(spool, job_id)["state"] == service.DONE
@@ -0,0 +1,52 @@
+from copy import deepcopy
+
+import numpy as np
+import pytest
+from conftest import random_genome
+
+from src.config import RunConfig
+from src.genome import genome_to_canvas
+from src.reconstruction import polygon_mutate
+from src.simulation import Simulation
+from src.spatial import boxes_overlap
+
+
+def brute_force(canvas, rect):
+    return [p.id for p in canvas.sequence if boxes_overlap(p.bounds(), rect)]
+
+
+def test_overlapping_follows_mutations(rng):
+    np.random.seed(0)
+    canvas = genome_to_canvas(random_genome(rng, 40, 64, 48), 64, 48)
+    rects = [(0, 0, 64, 48), (10, 5, 20, 15), (50, 30, 70, 60), (-5, -5, 0, 0)]
+    for _ in range(200):
+        polygon = canvas.sequence[np.random.randint(canvas.how_many())]
+        canvas = polygon_mutate(canvas, polygon)
+        for rect in rects:
+            assert [p.id for p in canvas.overlapping(rect)] == brute_force(canvas, rect)
+
+    canvas.remove([0, 5, 6])
+    for rect in rects:
+        assert [p.id for p in canvas.overlapping(rect)] == brute_force(canvas, rect)
+
+
+@pytest.mark.parametrize("color_mode", ["rgb", "gray"])
+def test_dirty_loss_matches_full_evaluation(target, color_mode):
+    simulation = Simulation(
+        config=RunConfig(
+            renderer="numpy", color_mode=color_mode, save_frames=False, seed=2
+        ),
+        b_image=target,
+    )
+    height, width = target.shape[:2]
+    rng = np.random.default_rng(1)
+    parent = genome_to_canvas(random_genome(rng, 30, width, height), width, height)
+    parent.renderer = "numpy"
+    for _ in range(300):
+        polygon = parent.sequence[np.random.randint(parent.how_many())]
+        child = polygon_mutate(deepcopy(parent), polygon, color_mode=color_mode)
+        l_parent, l_child = simulation.dirty_loss(parent, child, polygon.id)
+        assert l_parent == simulation.eval_loss(parent)
+        assert l_child == simulation.eval_loss(child)
+        if np.random.rand() < 0.5:
+            parent = child
@@ -0,0 +1,36 @@
+import numpy as np
+
+from src.api import reconstruct
+from src.config import RunConfig
+from src.loss import percent_of
+from src.stopping import StoppingCriteria
+
+
+def test_percent_of():
+    assert percent_of(25, 100) == 75.0
+    assert percent_of(150, 100) == -50.0
+    # a black target: the blank canvas is already complete
+    assert percent_of(0, 0) == 100.0
+    assert percent_of(10, 0) == 0.0
+
+
+def test_target_percent_on_a_black_image():
+    stopping = StoppingCriteria(max_evals=100, target_percent=99.0, plateau_window=2)
+    assert stopping.check(1, 10, 0) is None
+    assert stopping.check(2, 0, 0).startswith("target complete percent")
+
+
+def test_reconstruct_a_black_image(tmp_path):
+    metrics_file = str(tmp_path / "run.prom")
+    config = RunConfig(
+        max_polygons=2,
+        max_evaluations=60,
+        renderer="numpy",
+        seed=0,
+        save_frames=False,
+        metrics_file=metrics_file,
+    )
+    result = reconstruct(np.zeros((16, 20, 3), dtype=np.uint8), config)
+    assert result.complete_percent == percent_of(result.loss, 0)
+    with open(metrics_file) as file:
+        assert "complete_percent" in file.read()
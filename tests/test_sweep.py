@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src import sweep
+from src.config import RunConfig
+
+
+def test_grid():
+    points = sweep.grid({"max_polygons": [50, 100], "stagnation_limit": [1, 2, 3]})
+    assert len(points) == 6
+    assert points[0] == {"max_polygons": 50, "stagnation_limit": 1}
+    assert points[-1] == {"max_polygons": 100, "stagnation_limit": 3}
+
+
+def test_sample(rng):
+    space = {
+        "renderer": ["numpy", "numba"],
+        "stagnation_limit": {"low": 10, "high": 1000, "log": True},
+        "plateau_threshold": {"low": 0.0, "high": 0.5},
+    }
+    points = sweep.sample(space, 200, rng)
+    assert len(points) == 200
+    assert {p["renderer"] for p in points} == {"numpy", "numba"}
+    limits = [p["stagnation_limit"] for p in points]
+    assert all(isinstance(v, int) and 10 <= v <= 1000 for v in limits)
+    # NOTE: log-uniform, about as many draws below 100 as above
+    assert 60 < sum(v < 100 for v in limits) < 140
+    assert all(0.0 <= p["plateau_threshold"] <= 0.5 for p in points)
+
+
+class FakeImage:
+    def __init__(self, name: str):
+        self.handle = (name,)
+
+    def close(self):
+        pass
+
+
+def test_successive_halving_promotes_the_best(monkeypatch):
+    calls = []
+
+    def run_segment(image, config, evaluations, genome):
+        # NOTE: the "genome" counts the evaluations the trial has run so far
+        done = 0 if genome is None else int(genome[0])
+        calls.append((config["stagnation_limit"], image[0], done, config["seed"]))
+        percent = config["stagnation_limit"] + done / 1000
+        reason = f"max evaluations ({evaluations}) reached"
+        return np.array([done + evaluations]), 100 - percent, percent, evaluations, reason
+
+    monkeypatch.setattr(sweep, "run_segment", run_segment)
+    monkeypatch.setattr(sweep, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(
+        sweep,
+        "share_images",
+        lambda images, modes: {(i, m): FakeImage(i) for i in images for m in modes},
+    )
+
+    points = sweep.grid({"stagnation_limit": list(range(1, 10))})
+    trials = sweep.successive_halving(
+        ["a.png", "b.png"],
+        points,
+        RunConfig(max_evaluations=900, seed=7),
+        min_evaluations=100,
+        eta=3,
+        workers=2,
+    )
+
+    ranked = [t.params["stagnation_limit"] for t in trials]
+    assert ranked == [9, 8, 7, 6, 5, 4, 3, 2, 1]
+    assert [t.evaluations for t in trials] == [900, 300, 300] + [100] * 6
+    assert [t.rung for t in trials] == [2, 1, 1] + [0] * 6
+    # every segment resumes the last one, with the seed moved on
+    assert sorted(c for c in calls if c[0] == 9) == [
+        (9, "a.png", 0, 7),
+        (9, "a.png", 100, 107),
+        (9, "a.png", 300, 307),
+        (9, "b.png", 0, 7),
+        (9, "b.png", 100, 107),
+        (9, "b.png", 300, 307),
+    ]
+    assert len(calls) == 2 * (9 + 3 + 1)
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pytest
+from conftest import ROOT, random_genome
+
+from src.tiled import cores, stitch, tile_grid
+
+SIZES = [(64, 48, 64, 8), (300, 200, 64, 16), (1000, 130, 256, 32), (97, 513, 50, 10)]
+
+
+def coverage(tiles, width: int, height: int) -> np.ndarray:
+    counts = np.zeros((height, width), dtype=int)
+    for x0, y0, x1, y1 in tiles:
+        counts[int(y0) : int(np.ceil(y1)), int(x0) : int(np.ceil(x1))] += 1
+    return counts
+
+
+@pytest.mark.parametrize("width, height, tile, overlap", SIZES)
+def test_tiles_cover_the_image(width, height, tile, overlap):
+    tiles = tile_grid(width, height, tile, overlap)
+    assert coverage(tiles, width, height).min() >= 1
+    for x0, y0, x1, y1 in tiles:
+        assert 0 <= x0 < x1 <= width and 0 <= y0 < y1 <= height
+        assert x1 - x0 <= tile and y1 - y0 <= tile
+    # neighbors share at least `overlap` pixels
+    for axis in (0, 1):
+        starts = sorted({t[axis] for t in tiles})
+        ends = sorted({t[axis + 2] for t in tiles})
+        for start, end in zip(starts[1:], ends[:-1]):
+            assert end - start >= overlap
+
+
+@pytest.mark.parametrize("width, height, tile, overlap", SIZES)
+def test_cores_partition_the_image(width, height, tile, overlap):
+    tiles = tile_grid(width, height, tile, overlap)
+    owned = cores(tiles, width, height)
+    area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in owned)
+    assert area == width * height
+    for (tx0, ty0, tx1, ty1), (x0, y0, x1, y1) in zip(tiles, owned):
+        assert tx0 <= x0 < x1 <= tx1 and ty0 <= y0 < y1 <= ty1
+
+
+@pytest.mark.parametrize("width, height, tile, overlap", SIZES)
+def test_stitch_keeps_every_polygon_once(rng, width, height, tile, overlap):
+    tiles = tile_grid(width, height, tile, overlap)
+    genome = random_genome(rng, 200, width, height)
+    # NOTE: some centroids off the image, corners included
+    genome[:20, :6] = genome[:20, :6] * 3 - np.array([width] * 3 + [height] * 3)
+
+    stitched = stitch([genome] * len(tiles), tiles, width, height)
+    assert len(stitched) == len(genome)
+    assert {row.tobytes() for row in stitched} == {row.tobytes() for row in genome}
+
+
+def test_reconstruct_tiled_loss_matches_the_whole_image(tmp_path):
+    from PIL import Image
+
+    from src.config import RunConfig
+    from src.image_cache import load_image
+    from src.render import render_sad
+    from src.tiled import reconstruct_tiled
+
+    path = str(tmp_path / "odd.png")
+    Image.open(os.path.join(ROOT, "img", "1.png")).convert("RGB").crop(
+        (3, 5, 48, 42)
+    ).save(path)
+    config = RunConfig(max_polygons=3, max_evaluations=150, renderer="numpy", seed=0)
+
+    result = reconstruct_tiled(path, config, tile=19, overlap=5, workers=2)
+    image = load_image(path)
+    assert image.shape[:2] == (result.height, result.width)
+    assert len(tile_grid(result.width, result.height, 19, 5)) > 4
+    assert result.loss == render_sad(result.genome, image)